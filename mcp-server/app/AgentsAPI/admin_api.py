@@ -0,0 +1,70 @@
+# app/AgentsAPI/admin_api.py
+# ------------------------------------------------------------
+# Admin endpoints (operators only).
+#
+# Every request must send the X-Admin-Token header matching ADMIN_TOKEN;
+# without ADMIN_TOKEN configured the endpoints are disabled (403).
+#
+#     POST /admin/profile?seconds=N[&route=/context-analyser/predict]
+#     POST /admin/profile?route=/context-analyser/predict&requests=K
+#         Sampling profile of this worker (see profiler.py), returned as
+#         collapsed stacks:  curl ... > profile.folded; flamegraph.pl profile.folded
+# ------------------------------------------------------------
+import os
+import secrets
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+from starlette.routing import Match
+
+from AgentsAPI.profiler import PROFILER, PROFILER_INTERVAL_MS, PROFILER_MAX_SECONDS, ProfileSession
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+# ------------------------------------------------------------
+# Sampling profiler
+# ------------------------------------------------------------
+@router.post("/profile", response_class=PlainTextResponse)
+def profile(request: Request, seconds: Optional[float] = None, route: Optional[str] = None,
+            requests: Optional[int] = None, interval_ms: float = PROFILER_INTERVAL_MS):
+    """
+    Profile this worker for `seconds`, or for the next `requests` requests
+    to `route`. Blocks until done and returns collapsed stacks.
+    """
+    if (seconds is None) == (requests is None):
+        raise HTTPException(status_code=400, detail="Pass either seconds or requests")
+    if seconds is not None and not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be in (0, {PROFILER_MAX_SECONDS}]")
+    if requests is not None and (requests < 1 or route is None):
+        raise HTTPException(status_code=400, detail="requests needs a route and must be >= 1")
+
+    if route is not None:
+        scope = {"type": "http", "path": route, "root_path": "", "method": "POST", "app": request.app}
+        if all(r.matches(scope)[0] == Match.NONE for r in request.app.routes):
+            raise HTTPException(status_code=404, detail=f"Unknown route {route}")
+
+    session = ProfileSession(seconds=seconds, route=route, requests=requests, interval_ms=interval_ms)
+    try:
+        collapsed = PROFILER.profile(session)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    summary = session.summary()
+    print(f"Profiling session finished: {summary}")
+    return PlainTextResponse(collapsed, headers={
+        "X-Profile-Samples": str(summary["samples"]),
+        "X-Profile-Requests": str(summary["completed_requests"]),
+        "X-Profile-Seconds": str(summary["elapsed_seconds"]),
+    })
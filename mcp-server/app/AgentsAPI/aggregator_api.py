@@ -6,7 +6,15 @@
 from fastapi import FastAPI
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+import numpy as np
+import os
+import time
+
+from AgentsAPI.metrics import AGENT_SCORES, CACHE_REQUESTS, observe_scoring
+from AgentsAPI.model_watcher import ModelSlot
+from AgentsAPI.stacker_explainer import build_explainer, explain_rows
+from AgentsAPI.warmup import WARMUP_BATCH_SIZE
 
 
 router = APIRouter()
@@ -16,6 +24,14 @@ router = APIRouter()
 # ------------------------------------------------------------
 DEFAULT_WEIGHTS = [0.4, 0.3, 0.3]
 
+# ------------------------------------------------------------
+# Configuration (learned stacker, optional)
+# ------------------------------------------------------------
+AGENT_PREFIX = "agents/aggregator/"
+
+# SHAP explanations are only computed at or above this final score
+EXPLAIN_THRESHOLD = float(os.getenv("AGGREGATOR_EXPLAIN_THRESHOLD", "0.5"))
+
 # ------------------------------------------------------------
 # Request Schema
 # ------------------------------------------------------------
@@ -25,6 +41,46 @@ class ScoresInput(BaseModel):
         None, description="Optional custom weights for the agents (must match 3 scores)."
     )
 
+# ------------------------------------------------------------
+# Stacker Loader Utilities
+# ------------------------------------------------------------
+def get_explainer(active):
+    """Build the SHAP explainer once per stacker, on the first request that needs it."""
+    explainer = active.cache.get("explainer")
+    CACHE_REQUESTS.inc("explainer", "miss" if explainer is None else "hit")
+    if explainer is None:
+        explainer = build_explainer(active.model)
+        active.cache["explainer"] = explainer
+    return explainer
+
+def warm_stacker(candidate):
+    """Exercise the stacker (batch 1 and N) and its explainer before it is swapped in."""
+    report = {}
+    model = candidate.model["model"]
+    X = np.asarray([[0.5, 0.5, 0.5]], dtype=np.float64)
+
+    start = time.perf_counter()
+    model.predict_proba(X)
+    report["batch_1_seconds"] = round(time.perf_counter() - start, 4)
+
+    if WARMUP_BATCH_SIZE > 0:
+        batch = np.random.default_rng(0).random((WARMUP_BATCH_SIZE, 3))
+        start = time.perf_counter()
+        model.predict_proba(batch)
+        report[f"batch_{WARMUP_BATCH_SIZE}_seconds"] = round(time.perf_counter() - start, 4)
+
+    # The explainer is otherwise built by the first risky request
+    start = time.perf_counter()
+    explain_rows(get_explainer(candidate), X)
+    report["explainer_seconds"] = round(time.perf_counter() - start, 4)
+    return report
+
+# ------------------------------------------------------------
+# Stacker slot: loaded at app startup, hot-reloaded in the background.
+# Optional: falls back to the weighted ensemble until a stacker is available.
+# ------------------------------------------------------------
+slot = ModelSlot(AGENT_PREFIX, warmup=warm_stacker, required=False)
+
 # ------------------------------------------------------------
 # Test endpoint
 # ------------------------------------------------------------
@@ -59,6 +115,30 @@ def aggregate(input: ScoresInput):
             "example": {"weights": [0.4, 0.3, 0.3]}
         }
 
+    # Learned stacker (only when the caller did not ask for custom weights)
+    active = slot.current
+    if active is not None and not input.weights:
+        stacker = active.model
+        X = np.asarray([scores], dtype=np.float64)
+        start = time.perf_counter()
+        final_score = float(stacker["model"].predict_proba(X)[0][1])
+        observe_scoring("aggregator", time.perf_counter() - start, [final_score])
+
+        # Real SHAP contributions, computed lazily for risky transactions only
+        if final_score >= EXPLAIN_THRESHOLD:
+            explanation = explain_rows(get_explainer(active), X)[0]
+            explanation.update(method="shap", final_score=final_score)
+        else:
+            explanation = {"method": "none", "final_score": final_score}
+
+        return {
+            "aggregator": f"Stacking Ensemble ({stacker['model_type']})",
+            "model_key": active.key,
+            "inputs": {"scores": scores},
+            "final_score": final_score,
+            "explanation": explanation
+        }
+
     # Normalize weights if they don’t sum to 1
     weight_sum = sum(weights)
     if weight_sum != 1.0:
@@ -66,6 +146,7 @@ def aggregate(input: ScoresInput):
 
     # Compute weighted ensemble score
     final_score = sum(w * s for w, s in zip(weights, scores))
+    AGENT_SCORES.observe(final_score, "aggregator")
 
     # SHAP-style explainability (relative agent contributions)
     explanation = {
@@ -82,3 +163,65 @@ def aggregate(input: ScoresInput):
         "final_score": final_score,
         "explanation": explanation
     }
+
+class ScoresBatchInput(BaseModel):
+    scores: List[List[float]] = Field(..., description="Agent 1, 2 and 3 scores, one row per transaction.")
+
+
+@router.post("/aggregate-batch")
+def aggregate_batch(input: ScoresBatchInput):
+    """
+    Aggregate a batch of agent score rows in one stacker call. Returns the
+    final scores as one column, with one explanation per row.
+    """
+    X = np.asarray(input.scores, dtype=np.float64)
+    if X.ndim != 2 or X.shape[1] != 3 or len(X) == 0:
+        raise HTTPException(status_code=422, detail="Expected rows of 3 scores from agents 1, 2, and 3.")
+
+    active = slot.current
+    if active is not None:
+        stacker = active.model
+        start = time.perf_counter()
+        final_scores = stacker["model"].predict_proba(X)[:, 1]
+        observe_scoring("aggregator", time.perf_counter() - start, final_scores)
+
+        # SHAP contributions for the risky rows only, in one explainer call
+        explanations = [{"method": "none", "final_score": float(score)} for score in final_scores]
+        risky = np.flatnonzero(final_scores >= EXPLAIN_THRESHOLD)
+        if len(risky):
+            for row, explanation in zip(risky, explain_rows(get_explainer(active), X[risky])):
+                explanation.update(method="shap", final_score=float(final_scores[row]))
+                explanations[row] = explanation
+        return {
+            "aggregator": f"Stacking Ensemble ({stacker['model_type']})",
+            "model_key": active.key,
+            "final_score": final_scores.tolist(),
+            "explanation": explanations,
+        }
+
+    weights = np.asarray(DEFAULT_WEIGHTS) / sum(DEFAULT_WEIGHTS)
+    contributions = X * weights
+    final_scores = contributions.sum(axis=1)
+    AGENT_SCORES.observe_many(final_scores, "aggregator")
+    return {
+        "aggregator": "Weighted Ensemble (3 Agents)",
+        "final_score": final_scores.tolist(),
+        "explanation": [
+            {
+                "agent_1_contribution": float(row[0]),
+                "agent_2_contribution": float(row[1]),
+                "agent_3_contribution": float(row[2]),
+                "weights": weights.tolist(),
+                "final_score": float(score),
+            }
+            for row, score in zip(contributions, final_scores)
+        ],
+    }
+
+# ------------------------------------------------------------
+# Model Status Endpoint
+# ------------------------------------------------------------
+@router.get("/status")
+def status():
+    """Active stacker key (if any), load timings and hot-reload state."""
+    return slot.status()
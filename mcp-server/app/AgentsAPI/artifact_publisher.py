@@ -0,0 +1,126 @@
+# app/AgentsAPI/artifact_publisher.py
+# ------------------------------------------------------------
+# Artifact Publisher: verified model uploads for the training jobs.
+#
+#     1. Hash the local artifact (SHA-256) and upload it with concurrent
+#        multipart transfer and S3 additional checksums (SHA-256 per part,
+#        validated by S3 on receipt); the file hash travels as metadata.
+#     2. Confirm the stored content: HEAD the object and compare its size
+#        and the checksum S3 computed with the one recomputed locally
+#        (same part size). Stores without additional checksums fall back
+#        to the ETag, which is a content MD5 except under SSE-KMS.
+#     3. Only then point the agent's manifest at it, recording agent,
+#        timestamp, size, hash and training metrics.
+#
+# upload_file returns once S3 has acknowledged every part, so the job can
+# exit as soon as publish_artifact returns. Failures raise instead of
+# being swallowed. S3_ENDPOINT_URL points the client at a local stand-in
+# (MinIO, moto server, ...).
+# ------------------------------------------------------------
+import os
+import base64
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from boto3.s3.transfer import TransferConfig
+
+from AgentsAPI.model_registry import BUCKET_NAME, compute_etag, file_sha256, get_s3, write_manifest
+
+# ------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------
+UPLOAD_CHUNK_SIZE = int(float(os.getenv("ARTIFACT_UPLOAD_CHUNK_MB", "16")) * 1024 * 1024)
+UPLOAD_CONCURRENCY = int(os.getenv("ARTIFACT_UPLOAD_CONCURRENCY", "8"))
+
+SHA256_METADATA_KEY = "sha256"
+
+
+def upload_config():
+    """Multipart transfer settings: parts of UPLOAD_CHUNK_SIZE, sent concurrently."""
+    return TransferConfig(
+        multipart_threshold=UPLOAD_CHUNK_SIZE,
+        multipart_chunksize=UPLOAD_CHUNK_SIZE,
+        max_concurrency=UPLOAD_CONCURRENCY,
+        use_threads=True,
+    )
+
+
+def expected_etag(local_path: str, size: int):
+    """ETag S3 assigns to `local_path` when uploaded with upload_config()."""
+    if size < UPLOAD_CHUNK_SIZE:
+        return compute_etag(local_path)
+    parts = -(-size // UPLOAD_CHUNK_SIZE)
+    return compute_etag(local_path, parts, part_size=UPLOAD_CHUNK_SIZE)
+
+
+def expected_checksum(local_path: str, size: int):
+    """
+    ChecksumSHA256 S3 stores for `local_path` uploaded with upload_config():
+    the file's SHA-256, or the SHA-256 of its part digests (multipart), base64.
+    """
+    if size < UPLOAD_CHUNK_SIZE:
+        return base64.b64encode(bytes.fromhex(file_sha256(local_path))).decode()
+    digests = []
+    with open(local_path, "rb") as f:
+        for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+            digests.append(hashlib.sha256(chunk).digest())
+    return base64.b64encode(hashlib.sha256(b"".join(digests)).digest()).decode()
+
+
+def verify_upload(s3_key: str, size: int, checksum: str, etag: str):
+    """Raise unless the stored object's content matches the local artifact."""
+    head = get_s3().head_object(Bucket=BUCKET_NAME, Key=s3_key, ChecksumMode="ENABLED")
+    location = f"s3://{BUCKET_NAME}/{s3_key}"
+    if head["ContentLength"] != size:
+        raise RuntimeError(f"Upload size mismatch for {location}: {head['ContentLength']} != {size}")
+
+    stored = head.get("ChecksumSHA256")
+    if stored is not None:
+        # Multipart objects report a composite checksum as "<base64>-<parts>"
+        if stored.split("-")[0] != checksum:
+            raise RuntimeError(f"Upload checksum mismatch for {location}: {stored} != {checksum}")
+        return head
+
+    # No additional checksum stored: the ETag is the content MD5, except under SSE-KMS
+    if head.get("ServerSideEncryption") == "aws:kms":
+        print(f"{location} is SSE-KMS encrypted without a stored checksum; verified by size only.")
+        return head
+    if head["ETag"].strip('"') != etag:
+        raise RuntimeError(f"Upload ETag mismatch for {location}: {head['ETag']} != {etag}")
+    return head
+
+
+def publish_artifact(local_path: str, s3_key: str, agent: str = None, timestamp: str = None, metrics: dict = None,
+                     **metadata):
+    """
+    Upload a model artifact, confirm it landed intact, then update the
+    agent's manifest. Extra `metadata` (training watermark, parent
+    artifact, ...) is recorded in the manifest. Returns the manifest;
+    raises on any failure.
+    """
+    agent_prefix = os.path.dirname(s3_key) + "/"
+    agent = agent or os.path.basename(os.path.dirname(s3_key))
+    timestamp = timestamp or datetime.now(timezone.utc).isoformat()
+
+    size = os.path.getsize(local_path)
+    sha256 = file_sha256(local_path)
+    etag = expected_etag(local_path, size)
+    checksum = expected_checksum(local_path, size)
+
+    start = time.perf_counter()
+    get_s3().upload_file(
+        local_path, BUCKET_NAME, s3_key,
+        ExtraArgs={"Metadata": {SHA256_METADATA_KEY: sha256}, "ChecksumAlgorithm": "SHA256"},
+        Config=upload_config(),
+    )
+    verify_upload(s3_key, size, checksum, etag)
+    elapsed = time.perf_counter() - start
+    print(f" Uploaded {s3_key} to S3 bucket {BUCKET_NAME} "
+          f"({size / 1e6:.1f} MB in {elapsed:.2f}s, sha256 {sha256[:12]}…, verified).")
+
+    # The manifest only ever points at a confirmed upload
+    return write_manifest(
+        agent_prefix, s3_key, sha256=sha256,
+        agent=agent, timestamp=timestamp, size=size, metrics=metrics or {}, **metadata,
+    )
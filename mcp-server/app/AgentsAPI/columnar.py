@@ -0,0 +1,118 @@
+# app/AgentsAPI/columnar.py
+# ------------------------------------------------------------
+# Batch transport between the orchestrator and the agents.
+#
+# Batch endpoints (/<agent>/predict-batch, /orchestrator/fraud-check-batch)
+# take N records in either encoding, chosen by Content-Type:
+#     application/json                      {"records": [{...}, ...]}   (default)
+#     application/vnd.apache.arrow.stream   one Arrow IPC stream, a column per field
+# An Arrow body is read straight into typed columns and handed to the
+# agent as a pandas frame: no per-record dicts or pydantic models. Its
+# columns are checked and cast against the agent's request schema (extra
+# columns are ignored, like extra JSON fields). JSON records are
+# validated one by one, as on the single-record endpoints.
+#
+# The orchestrator slices one table per agent (a column selection, no
+# copy) and sends it in AGENT_BATCH_FORMAT=json|arrow. Agents answer
+# with columnar JSON: {"model_key": ..., "<score field>": [...]}.
+# ------------------------------------------------------------
+import os
+import json
+from functools import lru_cache
+
+import pandas as pd
+import pyarrow as pa
+from fastapi import HTTPException, Request
+
+from models.schema_dtypes import ARROW_TYPES, field_annotations
+
+AGENT_BATCH_FORMAT = os.getenv("AGENT_BATCH_FORMAT", "json")
+
+JSON = "application/json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+class BatchDecodeError(ValueError):
+    """The batch body does not match the request schema (answered with 422)."""
+
+
+@lru_cache(maxsize=None)
+def arrow_schema(schema):
+    """Arrow schema with one column per field of a pydantic request schema."""
+    return pa.schema([(name, ARROW_TYPES.get(annotation, pa.string()))
+                      for name, annotation in field_annotations(schema).items()])
+
+
+def as_frame(txs):
+    """A batch of schema records, or a frame of their columns, as a DataFrame."""
+    if isinstance(txs, pd.DataFrame):
+        return txs
+    return pd.DataFrame([tx.dict() for tx in txs])
+
+
+def batch_content_type(request: Request):
+    """The request's batch encoding; 415 for anything else."""
+    media_type = request.headers.get("content-type", JSON).split(";")[0].strip().lower()
+    if media_type not in (JSON, ARROW_STREAM):
+        raise HTTPException(status_code=415, detail=f"Batch bodies are {JSON} or {ARROW_STREAM}")
+    return media_type
+
+
+# ------------------------------------------------------------
+# Decoding
+# ------------------------------------------------------------
+def _arrow_table(body: bytes, target: pa.Schema):
+    try:
+        table = pa.ipc.open_stream(body).read_all()
+    except (pa.ArrowInvalid, OSError) as e:
+        raise BatchDecodeError(f"Invalid Arrow stream: {e}")
+    missing = [name for name in target.names if name not in table.column_names]
+    if missing:
+        raise BatchDecodeError(f"Missing columns: {missing}")
+    table = table.select(target.names)
+    nulls = [name for name in target.names if table.column(name).null_count]
+    if nulls:
+        raise BatchDecodeError(f"Null values in columns: {nulls}")
+    try:
+        return table.cast(target)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise BatchDecodeError(f"Column types do not match the schema: {e}")
+
+
+def _json_table(body: bytes, schema, target: pa.Schema):
+    try:
+        records = [schema(**record).dict() for record in json.loads(body)["records"]]
+    except (ValueError, KeyError, TypeError) as e:
+        # pydantic's ValidationError is a ValueError
+        raise BatchDecodeError(f"Invalid JSON batch: {e}")
+    return pa.Table.from_pylist(records, schema=target)
+
+
+def decode_table(content_type: str, body: bytes, schema):
+    """A batch body as an Arrow table with exactly the schema's columns. Raises BatchDecodeError."""
+    target = arrow_schema(schema)
+    if content_type == ARROW_STREAM:
+        table = _arrow_table(body, target)
+    else:
+        table = _json_table(body, schema, target)
+    if table.num_rows == 0:
+        raise BatchDecodeError("Empty batch")
+    return table
+
+
+def decode_batch(content_type: str, body: bytes, schema):
+    """A batch body as a DataFrame of the schema's columns. Raises BatchDecodeError."""
+    return decode_table(content_type, body, schema).to_pandas()
+
+
+# ------------------------------------------------------------
+# Encoding (orchestrator -> agents)
+# ------------------------------------------------------------
+def encode_batch(table: pa.Table, fmt: str = AGENT_BATCH_FORMAT):
+    """(content type, body) for sending `table` to a batch endpoint."""
+    if fmt == "arrow":
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return ARROW_STREAM, sink.getvalue().to_pybytes()
+    return JSON, json.dumps({"records": table.to_pylist()}).encode()
@@ -5,14 +5,18 @@
 # Uses all fields from DeviceIPLog as model input.
 # Model loaded from S3 and exposed via FastAPI.
 # ------------------------------------------------------------
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from fastapi import FastAPI
-import boto3
-import joblib
-import tempfile
-import os
 import pandas as pd
+import time
+
+from AgentsAPI.columnar import BatchDecodeError, as_frame, batch_content_type, decode_batch
+from AgentsAPI.inference_pool import INFERENCE_POOL, active_model
+from AgentsAPI.metrics import observe_scoring
+from AgentsAPI.model_watcher import ModelSlot
+from AgentsAPI.shadow import ShadowScorer
+from AgentsAPI.warmup import make_warmup
 
 
 router = APIRouter()
@@ -20,18 +24,8 @@ router = APIRouter()
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
-REGION = "ca-central-1"
-BUCKET_NAME = os.getenv("MODEL_BUCKET", "dav-fraud-detection-models")
-LOCAL_MODEL_DIR = "models"
 AGENT_PREFIX = "agents/agent1/"
 
-os.makedirs(LOCAL_MODEL_DIR, exist_ok=True)
-
-# ------------------------------------------------------------
-# S3 Client
-# ------------------------------------------------------------
-s3 = boto3.client("s3", region_name=REGION)
-
 # ------------------------------------------------------------
 # Input Schema Data Model
 # ------------------------------------------------------------
@@ -49,68 +43,138 @@ class DeviceIPLog(BaseModel):
     isFlaggedFraud: int
 
 # ------------------------------------------------------------
-# Model Loader Utilities
+# Scoring
 # ------------------------------------------------------------
-def get_latest_model_key(agent_prefix: str):
-    """Retrieve the latest model file for a given agent prefix from S3."""
-    response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=agent_prefix)
-    if "Contents" not in response:
-        print(f"No models found for prefix {agent_prefix}")
-        return None
-    latest = sorted(response["Contents"], key=lambda x: x["LastModified"], reverse=True)[0]
-    return latest["Key"]
-
-def download_model(s3_key: str):
-    """Download model from S3 to local directory."""
-    local_path = os.path.join(LOCAL_MODEL_DIR, os.path.basename(s3_key))
-    s3.download_file(BUCKET_NAME, s3_key, local_path)
-    print(f"Downloaded model: s3://{BUCKET_NAME}/{s3_key} → {local_path}")
-    return local_path
-
-def load_latest_model():
-    """Load the latest model from S3 at startup."""
-    print("Searching for the latest model in S3...")
-    key = get_latest_model_key(AGENT_PREFIX)
-    if not key:
-        raise RuntimeError(f"No model found for prefix {AGENT_PREFIX}")
-
-    local_path = download_model(key)
-    print(f"Loading model from {local_path}")
-    model = joblib.load(local_path)
-    print("Model loaded successfully.")
-    return model, key
+def batch_scores(active, txs):
+    """Anomaly scores (an array) for a batch of transaction logs, or a frame of their columns."""
+    model = active.model
+    df = as_frame(txs)
+    df_encoded = pd.get_dummies(df)
+
+    # Add missing columns in batch
+    missing_cols = [c for c in model.feature_names_in_ if c not in df_encoded.columns]
+    if missing_cols:
+        df_encoded = pd.concat(
+            [df_encoded, pd.DataFrame(0, index=df_encoded.index, columns=missing_cols)], axis=1
+        )
+    df_encoded = df_encoded[model.feature_names_in_]
+
+    return model.predict_proba(df_encoded)[:, 1]
+
+def score_batch(active, txs):
+    """Score a batch of transaction logs with a loaded model snapshot."""
+    scores = batch_scores(active, txs)
+    return [
+        {
+            "agent_id": 1,
+            "model_key": active.key,
+            "model_name": "RandomForestClassifier",
+            "anomaly_score": float(score),
+        }
+        for score in scores
+    ]
+
+def score_transaction(active, tx: DeviceIPLog):
+    """Score one transaction log with a loaded model snapshot."""
+    return score_batch(active, [tx])[0]
+
+# Sample used to warm a freshly loaded model before it is swapped in
+WARMUP_SAMPLE = DeviceIPLog(
+    step=5, type="PAYMENT", amount=1200.50, nameOrig="C123456789",
+    oldbalanceOrg=3000.0, newbalanceOrig=1800.0, nameDest="M987654321",
+    oldbalanceDest=5000.0, newbalanceDest=6200.0, isFraud=0, isFlaggedFraud=0,
+)
+
+# Realistic values for synthetic records (warm-up, benchmarks)
+WARMUP_CHOICES = {
+    "type": ["PAYMENT", "TRANSFER", "CASH_OUT", "CASH_IN", "DEBIT"], "isFraud": [0, 1], "isFlaggedFraud": [0, 1],
+}
 
 # ------------------------------------------------------------
-# Load model on startup
+# Model slot: loaded at app startup, hot-reloaded in the background
 # ------------------------------------------------------------
-model, model_key = load_latest_model()
+warmup = make_warmup(score_batch, DeviceIPLog, WARMUP_SAMPLE, choices=WARMUP_CHOICES)
+slot = ModelSlot(AGENT_PREFIX, warmup=warmup)
+
+# Optional shadow candidate, scored on a sample of requests off the response path
+shadow = ShadowScorer("agent1", score_batch, "anomaly_score", warmup=warmup)
 
 # ------------------------------------------------------------
 # Prediction Endpoint
 # ------------------------------------------------------------
+def predict_record(tx: DeviceIPLog):
+    """Score one record on the active model; runs on the inference pool. Returns (result, seconds)."""
+    active = active_model(slot)
+    start = time.perf_counter()
+    result = score_transaction(active, tx)
+    return result, time.perf_counter() - start
+
 @router.post("/predict")
-def predict(tx: DeviceIPLog):
+async def predict(tx: DeviceIPLog):
     """
     Evaluate a transaction log using the Isolation Forest model.
     """
+    # Scoring runs on the inference pool; a full pool answers 429 with Retry-After
+    if slot.current is None:
+        raise HTTPException(status_code=503, detail="Model is still loading")
     try:
-        df = pd.DataFrame([tx.dict()])
-        df_encoded = pd.get_dummies(df)
-
-        # Add missing columns in batch
-        missing_cols = [c for c in model.feature_names_in_ if c not in df_encoded.columns]
-        if missing_cols:
-            df_encoded = pd.concat(
-                [df_encoded, pd.DataFrame(0, index=df_encoded.index, columns=missing_cols)], axis=1
-            )
-        df_encoded = df_encoded[model.feature_names_in_]
-
-        score = model.predict_proba(df_encoded)[0][1]
-        return {
-            "agent_id": 1,
-            "model_key": model_key,
-            "model_name": "RandomForestClassifier",
-            "anomaly_score": float(score),
-        }
+        result, elapsed = await INFERENCE_POOL.run(predict_record, tx)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    observe_scoring("agent1", elapsed, [result["anomaly_score"]])
+    # Compared against the snapshot that scored (a hot swap may land in between)
+    shadow.submit(result["model_key"], [tx], [result["anomaly_score"]], elapsed)
+    return result
+
+def predict_batch_body(content_type: str, body: bytes):
+    """Decode and score one batch on the active model; runs on the inference pool. Returns (result, frame, seconds)."""
+    df = decode_batch(content_type, body, DeviceIPLog)
+    active = active_model(slot)
+    start = time.perf_counter()
+    scores = batch_scores(active, df)
+    elapsed = time.perf_counter() - start
+    result = {
+        "agent_id": 1,
+        "model_key": active.key,
+        "model_name": "RandomForestClassifier",
+        "anomaly_score": scores.tolist(),
+    }
+    return result, df, elapsed
+
+@router.post("/predict-batch")
+async def predict_batch(request: Request):
+    """
+    Score a batch of transaction logs: JSON {"records": [...]} or an Arrow IPC
+    stream (see columnar.py). Returns the scores as one column, in order.
+    """
+    content_type = batch_content_type(request)
+    if slot.current is None:
+        raise HTTPException(status_code=503, detail="Model is still loading")
+    body = await request.body()
+    try:
+        result, df, elapsed = await INFERENCE_POOL.run(predict_batch_body, content_type, body)
+    except BatchDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    observe_scoring("agent1", elapsed, result["anomaly_score"])
+    # Compared against the snapshot that scored (a hot swap may land in between)
+    shadow.submit(result["model_key"], df, result["anomaly_score"], elapsed)
+    return result
+
+# ------------------------------------------------------------
+# Model Status Endpoint
+# ------------------------------------------------------------
+@router.get("/status")
+def status():
+    """Active model key, load timings and hot-reload state."""
+    return slot.status()
+
+@router.get("/shadow")
+def shadow_status():
+    """Shadow candidate, sampling counters and score / latency comparison with the active model."""
+    return shadow.status()
@@ -3,35 +3,29 @@
 # Agent 3: Fraud Pattern Matcher (BERT + XGBoost, Full Features)
 # ------------------------------------------------------------
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from fastapi import FastAPI
 from pydantic import BaseModel
 from transformers import BertTokenizer, BertModel
 import torch
 import pandas as pd
+import time
 import numpy as np
-import boto3
-import tempfile
-import joblib
-import os
+
+from AgentsAPI.columnar import BatchDecodeError, batch_content_type, decode_batch
+from AgentsAPI.inference_pool import INFERENCE_POOL, active_model
+from AgentsAPI.metrics import observe_scoring
+from AgentsAPI.model_watcher import ModelSlot
+from AgentsAPI.shadow import ShadowScorer
+from AgentsAPI.warmup import make_warmup
 
 router = APIRouter()
 
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
-REGION = "ca-central-1"
-BUCKET_NAME = os.getenv("MODEL_BUCKET", "dav-fraud-detection-models")
-LOCAL_MODEL_DIR = "models"
 AGENT_PREFIX = "agents/agent3/"
 
-os.makedirs(LOCAL_MODEL_DIR, exist_ok=True)
-
-# ------------------------------------------------------------
-# S3 Client
-# ------------------------------------------------------------
-s3 = boto3.client("s3", region_name=REGION)
-
 # ------------------------------------------------------------
 # Full Data Model
 # ------------------------------------------------------------
@@ -43,66 +37,140 @@ class MetadataText(BaseModel):
     metadata: str
 
 # ------------------------------------------------------------
-# Utility Functions
+# Scoring
 # ------------------------------------------------------------
-def get_latest_model_key(agent_prefix: str):
-    """Retrieve the latest model file for a given agent prefix from S3."""
-    response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=agent_prefix)
-    if "Contents" not in response:
-        print(f"No models found for prefix {agent_prefix}")
-        return None
-    latest = sorted(response["Contents"], key=lambda x: x["LastModified"], reverse=True)[0]
-    return latest["Key"]
-
-def download_model(s3_key: str):
-    """Download model from S3 to local directory."""
-    local_path = os.path.join(LOCAL_MODEL_DIR, os.path.basename(s3_key))
-    s3.download_file(BUCKET_NAME, s3_key, local_path)
-    print(f"Downloaded model: s3://{BUCKET_NAME}/{s3_key} → {local_path}")
-    return local_path
-
-def load_latest_model():
-    """Load latest model from S3 at startup."""
-    print("Searching for the latest model in S3...")
-    key = get_latest_model_key(AGENT_PREFIX)
-    if not key:
-        raise RuntimeError(f"No model found for Agent 3.")
-
-    local_path = download_model(key)
-    print(f"Loading model from {local_path}")
-    model_bundle = joblib.load(local_path)
-    print("Model loaded successfully.")
-    return model_bundle, key
+def batch_scores(active, txs):
+    """Fraud probabilities (an array) for a batch of metadata records, or a frame of their columns."""
+    vectorizer = active.model["vectorizer"]
+    model = active.model["model"]
+
+    # Vectorize metadata text
+    texts = txs["metadata"] if isinstance(txs, pd.DataFrame) else [tx.metadata for tx in txs]
+    X_tx = vectorizer.transform(texts)
+
+    # Predict fraud probability
+    return model.predict_proba(X_tx)[:, 1]
+
+def score_batch(active, txs):
+    """Score a batch of metadata records with a loaded model snapshot."""
+    scores = batch_scores(active, txs)
+    return [
+        {
+            "agent_id": 3,
+            "model_key": active.key,
+            "model_name": "TF-IDF + Logistic Regression",
+            "fraud_probability": float(score)
+        }
+        for score in scores
+    ]
+
+def score_transaction(active, tx: MetadataText):
+    """Score one metadata record with a loaded model snapshot."""
+    return score_batch(active, [tx])[0]
+
+# Sample used to warm a freshly loaded model before it is swapped in
+WARMUP_SAMPLE = MetadataText(
+    ip_address="172.16.5.21",
+    user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64)",
+    merchant="eBay",
+    product_category="Gift Cards",
+    metadata="172.16.5.21 Mozilla/5.0 (Windows NT 10.0; Win64; x64) eBay Gift Cards",
+)
+
+# Realistic values for synthetic records (warm-up, benchmarks)
+WARMUP_CHOICES = {"metadata": [
+    "172.16.5.21 Mozilla/5.0 (Windows NT 10.0; Win64; x64) eBay Gift Cards",
+    "10.0.0.7 Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) Amazon Electronics",
+    "192.168.1.10 curl/8.4.0 Walmart Grocery",
+    "203.0.113.9 Mozilla/5.0 (X11; Linux x86_64) BestBuy Laptops",
+]}
 
 # ------------------------------------------------------------
-# Load Model and BERT Components
+# Model slot: loaded at app startup, hot-reloaded in the background
 # ------------------------------------------------------------
-model_bundle, model_key = load_latest_model()
-vectorizer = model_bundle["vectorizer"]
-model = model_bundle["model"]
+warmup = make_warmup(score_batch, MetadataText, WARMUP_SAMPLE, choices=WARMUP_CHOICES)
+slot = ModelSlot(AGENT_PREFIX, warmup=warmup)
+
+# Optional shadow candidate, scored on a sample of requests off the response path
+shadow = ShadowScorer("agent3", score_batch, "fraud_probability", warmup=warmup)
 
 # ------------------------------------------------------------
 # Prediction Endpoint
 # ------------------------------------------------------------
+def predict_record(tx: MetadataText):
+    """Score one record on the active model; runs on the inference pool. Returns (result, seconds)."""
+    active = active_model(slot)
+    start = time.perf_counter()
+    result = score_transaction(active, tx)
+    return result, time.perf_counter() - start
+
 @router.post("/predict")
-def predict(tx: MetadataText):
+async def predict(tx: MetadataText):
     """
     Evaluate a metadata record using TF-IDF + Logistic Regression.
     Returns fraud probability.
     """
+    # Scoring runs on the inference pool; a full pool answers 429 with Retry-After
+    if slot.current is None:
+        raise HTTPException(status_code=503, detail="Model is still loading")
     try:
-        # Vectorize metadata text
-        X_tx = vectorizer.transform([tx.metadata])
-
-        # Predict fraud probability
-        score = float(model.predict_proba(X_tx)[0][1])
+        result, elapsed = await INFERENCE_POOL.run(predict_record, tx)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    observe_scoring("agent3", elapsed, [result["fraud_probability"]])
+    # Compared against the snapshot that scored (a hot swap may land in between)
+    shadow.submit(result["model_key"], [tx], [result["fraud_probability"]], elapsed)
+    return result
 
-        return {
-            "agent_id": 3,
-            "model_key": model_key,
-            "model_name": "TF-IDF + Logistic Regression",
-            "fraud_probability": score
-        }
+def predict_batch_body(content_type: str, body: bytes):
+    """Decode and score one batch on the active model; runs on the inference pool. Returns (result, frame, seconds)."""
+    df = decode_batch(content_type, body, MetadataText)
+    active = active_model(slot)
+    start = time.perf_counter()
+    scores = batch_scores(active, df)
+    elapsed = time.perf_counter() - start
+    result = {
+        "agent_id": 3,
+        "model_key": active.key,
+        "model_name": "TF-IDF + Logistic Regression",
+        "fraud_probability": scores.tolist(),
+    }
+    return result, df, elapsed
 
+@router.post("/predict-batch")
+async def predict_batch(request: Request):
+    """
+    Score a batch of metadata records: JSON {"records": [...]} or an Arrow IPC
+    stream (see columnar.py). Returns the scores as one column, in order.
+    """
+    content_type = batch_content_type(request)
+    if slot.current is None:
+        raise HTTPException(status_code=503, detail="Model is still loading")
+    body = await request.body()
+    try:
+        result, df, elapsed = await INFERENCE_POOL.run(predict_batch_body, content_type, body)
+    except BatchDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+    observe_scoring("agent3", elapsed, result["fraud_probability"])
+    # Compared against the snapshot that scored (a hot swap may land in between)
+    shadow.submit(result["model_key"], df, result["fraud_probability"], elapsed)
+    return result
+
+# ------------------------------------------------------------
+# Model Status Endpoint
+# ------------------------------------------------------------
+@router.get("/status")
+def status():
+    """Active model key, load timings and hot-reload state."""
+    return slot.status()
+
+@router.get("/shadow")
+def shadow_status():
+    """Shadow candidate, sampling counters and score / latency comparison with the active model."""
+    return shadow.status()
@@ -0,0 +1,193 @@
+# app/AgentsAPI/inference_pool.py
+# ------------------------------------------------------------
+# Execution layer for agent scoring: a sized pool with a bounded
+# admission queue, so overload is rejected fast instead of queueing
+# without limit in Starlette's shared thread pool.
+#
+# - The async handlers `await INFERENCE_POOL.run(fn, *args)`. At most
+#   INFERENCE_WORKERS calls run at once and INFERENCE_QUEUE_SIZE more
+#   wait; past that the request is rejected immediately with
+#   INFERENCE_REJECT_STATUS (429) and a Retry-After header.
+# - A call that waited longer than INFERENCE_MAX_WAIT_MS by the time a
+#   worker picks it up is dropped with 503 + Retry-After: its caller has
+#   most likely timed out already.
+#       INFERENCE_POOL=thread    threads in this process (default)
+#       INFERENCE_POOL=process   worker processes for GIL-bound scoring;
+#                                each loads its own model snapshots
+#                                (active_model) and hot-reloads them
+# - Queue depth, in-flight calls, queue wait and rejections are exported
+#   to /metrics and reported in /ready.
+#
+# Configuration (env):
+#     INFERENCE_POOL=thread  INFERENCE_WORKERS=<cpu count>  INFERENCE_QUEUE_SIZE=128
+#     INFERENCE_MAX_WAIT_MS=0 (off)  INFERENCE_REJECT_STATUS=429  INFERENCE_RETRY_AFTER_SECONDS=1
+# ------------------------------------------------------------
+import os
+import asyncio
+import contextvars
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from AgentsAPI.metrics import Counter, GaugeFunction, Histogram
+from AgentsAPI.profiler import current_session
+
+INFERENCE_POOL_MODE = os.getenv("INFERENCE_POOL", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(os.cpu_count() or 4)))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "128"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "0"))
+INFERENCE_REJECT_STATUS = int(os.getenv("INFERENCE_REJECT_STATUS", "429"))
+INFERENCE_RETRY_AFTER_SECONDS = int(os.getenv("INFERENCE_RETRY_AFTER_SECONDS", "1"))
+
+QUEUE_WAIT = Histogram("inference_queue_wait_seconds", "Time scoring calls waited for a pool worker.", ["pool"])
+REJECTED = Counter("inference_rejected_total", "Scoring calls rejected by the inference pool.", ["pool", "reason"])
+
+# Set in pool worker processes: models are loaded there on first use
+_IN_WORKER_PROCESS = False
+_worker_load_lock = threading.Lock()
+_worker_slots = set()
+
+
+class Overloaded(HTTPException):
+    """The pool is full (or the call waited too long): retry later."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int = INFERENCE_RETRY_AFTER_SECONDS):
+        super().__init__(status_code=status_code, detail=detail, headers={"Retry-After": str(retry_after)})
+
+
+class QueueTimeout(Exception):
+    pass
+
+
+def _init_worker_process():
+    global _IN_WORKER_PROCESS
+    _IN_WORKER_PROCESS = True
+
+
+def active_model(slot):
+    """
+    The slot's loaded model (None for a missing optional model). In a pool
+    worker process the slot is loaded, and its watcher started, on first
+    use; a missing required model is a 503.
+    """
+    if _IN_WORKER_PROCESS and slot.agent_prefix not in _worker_slots:
+        with _worker_load_lock:
+            if slot.agent_prefix not in _worker_slots:
+                _worker_slots.add(slot.agent_prefix)
+                try:
+                    slot.load()
+                except Exception as e:
+                    # The watcher keeps looking for it
+                    slot.last_error = str(e)
+                slot.start_watcher()
+    active = slot.current
+    if active is None and slot.required:
+        raise HTTPException(status_code=503, detail="Model is still loading")
+    return active
+
+
+def _timed_call(fn, args, enqueued_at: float, max_wait: float):
+    """Runs on the pool worker: enforce the wait deadline, then call fn. Returns (result, wait seconds)."""
+    waited = time.time() - enqueued_at
+    if max_wait and waited > max_wait:
+        raise QueueTimeout(waited)
+    session = current_session()
+    if session is None:
+        return fn(*args), waited
+    # A profiling session is tracking this request: sample this thread too
+    session.work_started()
+    try:
+        return fn(*args), waited
+    finally:
+        session.work_finished()
+
+
+class InferencePool:
+    def __init__(self, name: str = "agents", mode: str = INFERENCE_POOL_MODE, workers: int = INFERENCE_WORKERS,
+                 queue_size: int = INFERENCE_QUEUE_SIZE, max_wait_ms: float = INFERENCE_MAX_WAIT_MS):
+        self.name = name
+        self.mode = mode
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self.max_wait = max_wait_ms / 1000
+        # Admitted calls (running or queued); only changed on the event loop
+        self.in_flight = 0
+        self.completed = 0
+        self.wait_seconds_total = 0.0
+        self.rejected = {"full": 0, "timeout": 0}
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def queued(self):
+        return max(0, self.in_flight - self.workers)
+
+    def executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    if self.mode == "process":
+                        # spawn: forking a threaded server process is unsafe
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                            initializer=_init_worker_process,
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        return self._executor
+
+    def _reject(self, reason: str, status_code: int, detail: str):
+        self.rejected[reason] += 1
+        REJECTED.inc(self.name, reason)
+        raise Overloaded(status_code, detail)
+
+    async def run(self, fn, *args):
+        """Run fn(*args) on the pool. Raises Overloaded when the admission queue is full."""
+        if self.in_flight >= self.capacity:
+            self._reject("full", INFERENCE_REJECT_STATUS,
+                         f"Inference queue is full ({self.queued} waiting, {self.workers} workers)")
+        self.in_flight += 1
+        try:
+            call = (_timed_call, fn, args, time.time(), self.max_wait)
+            if self.mode != "process":
+                # Threads keep the request's context (trace span, profiling session)
+                call = (contextvars.copy_context().run,) + call
+            try:
+                result, waited = await asyncio.get_running_loop().run_in_executor(self.executor(), *call)
+            except QueueTimeout as e:
+                QUEUE_WAIT.observe(e.args[0], self.name)
+                self._reject("timeout", 503, f"Request waited {e.args[0] * 1000:.0f}ms for an inference worker")
+        finally:
+            self.in_flight -= 1
+        QUEUE_WAIT.observe(waited, self.name)
+        self.completed += 1
+        self.wait_seconds_total += waited
+        return result
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def status(self):
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "completed": self.completed,
+            "mean_wait_ms": round(self.wait_seconds_total / self.completed * 1000, 3) if self.completed else None,
+            "rejected": dict(self.rejected),
+        }
+
+
+INFERENCE_POOL = InferencePool()
+
+GaugeFunction("inference_in_flight", "Scoring calls admitted to the pool (running or queued).", ["pool"],
+              lambda: {(INFERENCE_POOL.name,): INFERENCE_POOL.in_flight})
+GaugeFunction("inference_queue_depth", "Scoring calls waiting for a pool worker.", ["pool"],
+              lambda: {(INFERENCE_POOL.name,): INFERENCE_POOL.queued})
@@ -0,0 +1,385 @@
+# app/AgentsAPI/load_generator.py
+# ------------------------------------------------------------
+# Local end-to-end load generator for /orchestrator/fraud-check.
+#
+# Starts the AgentsAPI app (uvicorn, LOADTEST_WORKERS workers) with
+# models chosen by LOADTEST_MODELS, then drives open-loop traffic at each
+# target rate in LOADTEST_QPS for LOADTEST_STAGE_SECONDS:
+#     stub      stub models with injected latency / errors per agent
+#               (LOADTEST_STUB_LATENCY_MS, _JITTER_MS, _ERROR_RATE); the
+#               aggregator uses its weighted-ensemble fallback
+#     local     small models trained on synthetic data (run from app/,
+#               uses benchmark_inference.py)
+#     registry  the normal startup path (models from S3)
+# Set LOADTEST_URL to load an already running deployment instead.
+#
+# Open loop: requests are sent on a fixed schedule (Poisson or uniform
+# arrivals) whether or not earlier ones have completed, and latency is
+# measured from the scheduled send time, so a backed-up server shows up
+# as latency instead of silently lowering the offered load.
+#
+# Payloads come from a JSON-lines file (LOADTEST_INPUT: one FraudInput
+# object per line, or {"body": {...}}) or are generated from the
+# FraudInput schema.
+#
+# Per stage: offered and achieved rate, status / error counts, latency percentiles
+# and a latency histogram. The saturation point is the first rate whose
+# achieved throughput falls below 95% of the offered rate, whose p99 exceeds
+# LOADTEST_SLO_P99_MS or whose error rate exceeds LOADTEST_MAX_ERROR_RATE.
+#
+# Usage (from app/):
+#     LOADTEST_QPS=5,10,20,50 python -m AgentsAPI.load_generator
+#
+# Configuration (env):
+#     LOADTEST_URL=""  LOADTEST_PORT=8089  LOADTEST_WORKERS=1  LOADTEST_MODELS=stub
+#     LOADTEST_STUB_LATENCY_MS="5" or "agent1=5,agent2=20,agent3=10"
+#     LOADTEST_STUB_JITTER_MS=0  LOADTEST_STUB_ERROR_RATE=0
+#     LOADTEST_PATH=/orchestrator/fraud-check  LOADTEST_INPUT=""  LOADTEST_SYNTHETIC=1000
+#     LOADTEST_QPS="5,10,20,50,100"  LOADTEST_STAGE_SECONDS=10  LOADTEST_ARRIVALS=poisson
+#     LOADTEST_MAX_IN_FLIGHT=256  LOADTEST_TIMEOUT_SECONDS=30
+#     LOADTEST_SLO_P99_MS=1000  LOADTEST_MAX_ERROR_RATE=0.01
+#     LOADTEST_OUTPUT=loadtest_results.json
+# ------------------------------------------------------------
+import os
+import sys
+import json
+import time
+import random
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import requests
+
+# ------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------
+LOADTEST_URL = os.getenv("LOADTEST_URL", "").rstrip("/")
+LOADTEST_PORT = int(os.getenv("LOADTEST_PORT", "8089"))
+LOADTEST_WORKERS = int(os.getenv("LOADTEST_WORKERS", "1"))
+LOADTEST_MODELS = os.getenv("LOADTEST_MODELS", "stub")
+LOADTEST_STUB_LATENCY_MS = os.getenv("LOADTEST_STUB_LATENCY_MS", "5")
+LOADTEST_STUB_JITTER_MS = float(os.getenv("LOADTEST_STUB_JITTER_MS", "0"))
+LOADTEST_STUB_ERROR_RATE = float(os.getenv("LOADTEST_STUB_ERROR_RATE", "0"))
+LOADTEST_PATH = os.getenv("LOADTEST_PATH", "/orchestrator/fraud-check")
+LOADTEST_INPUT = os.getenv("LOADTEST_INPUT", "")
+LOADTEST_SYNTHETIC = int(os.getenv("LOADTEST_SYNTHETIC", "1000"))
+LOADTEST_QPS = [float(q) for q in os.getenv("LOADTEST_QPS", "5,10,20,50,100").split(",") if q.strip()]
+LOADTEST_STAGE_SECONDS = float(os.getenv("LOADTEST_STAGE_SECONDS", "10"))
+LOADTEST_ARRIVALS = os.getenv("LOADTEST_ARRIVALS", "poisson")
+LOADTEST_MAX_IN_FLIGHT = int(os.getenv("LOADTEST_MAX_IN_FLIGHT", "256"))
+LOADTEST_TIMEOUT_SECONDS = float(os.getenv("LOADTEST_TIMEOUT_SECONDS", "30"))
+LOADTEST_SLO_P99_MS = float(os.getenv("LOADTEST_SLO_P99_MS", "1000"))
+LOADTEST_MAX_ERROR_RATE = float(os.getenv("LOADTEST_MAX_ERROR_RATE", "0.01"))
+LOADTEST_OUTPUT = os.getenv("LOADTEST_OUTPUT", "loadtest_results.json")
+
+# Upper bounds (ms) of the latency histogram buckets
+HISTOGRAM_BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000]
+
+# Seconds to wait for the local server to report ready
+SERVER_START_TIMEOUT = 180
+
+LOADTEST_SEED = 0
+
+
+# ------------------------------------------------------------
+# Stub models (server side)
+# ------------------------------------------------------------
+def stub_latencies(spec: str = LOADTEST_STUB_LATENCY_MS):
+    """Per-agent injected latency (ms): "5" for all agents or "agent1=5,agent2=20,..."."""
+    agents = ["agent1", "agent2", "agent3"]
+    if "=" not in spec:
+        return {agent: float(spec or 0) for agent in agents}
+    latencies = {agent: 0.0 for agent in agents}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, value = item.split("=")
+        latencies[name.strip()] = float(value)
+    return latencies
+
+
+class StubModel:
+    """
+    Stands in for every model object the routers call (predict_proba,
+    transform): sleeps for the injected latency, optionally fails, and
+    returns fixed-shape outputs. The routers' own pre/post-processing runs.
+    """
+
+    def __init__(self, latency_ms: float, jitter_ms: float = 0.0, error_rate: float = 0.0, score: float = 0.3):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.score = score
+        # Agent 1 aligns its one-hot columns to these
+        self.feature_names_in_ = ["step", "amount", "oldbalanceOrg", "newbalanceOrig"]
+
+    def _work(self):
+        delay = self.latency_ms + (random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if self.error_rate and random.random() < self.error_rate:
+            raise RuntimeError("Injected stub failure")
+
+    def predict_proba(self, X):
+        self._work()
+        return np.tile([1 - self.score, self.score], (X.shape[0], 1))
+
+    def transform(self, X):
+        if isinstance(X, list):
+            # Text input (Agent 3 vectorizer): no extra latency, just a feature matrix
+            return np.zeros((len(X), 1))
+        self._work()
+        return np.ones((X.shape[0], 3))
+
+
+def stub_models():
+    """Model objects for the three agent slots, as their routers expect them."""
+    latency = stub_latencies()
+    stub = lambda agent: StubModel(latency[agent], LOADTEST_STUB_JITTER_MS, LOADTEST_STUB_ERROR_RATE)
+    return {
+        "agent1": stub("agent1"),
+        "agent2": {"prophet": None, "kmeans": stub("agent2"), "scaler": None},
+        "agent3": {"vectorizer": StubModel(0.0), "model": stub("agent3")},
+    }
+
+def local_models(workdir: str):
+    """Small locally trained models (synthetic data), including a logistic stacker."""
+    import benchmark_inference
+    from agents import aggregator
+    from AgentsAPI import context_analyser_api, fraud_pattern_matcher_api, transaction_history_profiler_api
+
+    rng = np.random.default_rng(LOADTEST_SEED)
+    X = rng.random((2000, 3))
+    stacker = aggregator.make_stacker("logistic").fit(X, (X.sum(axis=1) > 1.5).astype(int))
+    return {
+        "agent1": benchmark_inference.build_agent1(context_analyser_api, workdir),
+        "agent2": benchmark_inference.build_agent2(transaction_history_profiler_api, workdir),
+        "agent3": benchmark_inference.build_agent3(fraud_pattern_matcher_api, workdir),
+        "aggregator": {"model": stacker, "model_type": "logistic", "background": X[:100],
+                       "feature_names": aggregator.SCORE_COLUMNS, "metrics": {}},
+    }
+
+def create_app():
+    """
+    ASGI app factory for the load test server: the AgentsAPI app with
+    LOADTEST_MODELS installed in its model slots instead of the S3 startup.
+    """
+    import tempfile
+    from AgentsAPI import main
+    from AgentsAPI.model_watcher import LoadedModel
+
+    if LOADTEST_MODELS == "registry":
+        return main.app
+
+    models = stub_models() if LOADTEST_MODELS == "stub" else local_models(tempfile.mkdtemp(prefix="loadtest-"))
+    slots = dict(zip(["agent1", "agent2", "agent3", "aggregator"], main.MODEL_SLOTS))
+    for agent, model in models.items():
+        slots[agent].current = LoadedModel(model, {"key": f"{LOADTEST_MODELS}/{agent}", "etag": LOADTEST_MODELS},
+                                           0.0, 0.0, 0.0)
+    main.app.router.on_startup.remove(main.start_model_loading)
+    main.STARTUP.update(started_at=time.time(), finished=True, load_seconds=0.0)
+    print(f"Load test server: {LOADTEST_MODELS} models installed ({', '.join(models)})")
+    return main.app
+
+
+# ------------------------------------------------------------
+# Local server
+# ------------------------------------------------------------
+def start_server(port: int = LOADTEST_PORT, workers: int = LOADTEST_WORKERS):
+    """Start the app with uvicorn in a subprocess and wait for /ready."""
+    base_url = f"http://127.0.0.1:{port}"
+    env = {
+        **os.environ,
+        # The orchestrator calls the agents on this same server
+        "AGENTS_BASE_URL": base_url,
+        "MODEL_POLL_INTERVAL_SECONDS": "0",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "AgentsAPI.load_generator:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env,
+    )
+    deadline = time.time() + SERVER_START_TIMEOUT
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Load test server exited with status {process.returncode}")
+        try:
+            if requests.get(f"{base_url}/ready", timeout=2).status_code == 200:
+                print(f"Load test server ready at {base_url} ({workers} worker(s), {LOADTEST_MODELS} models)")
+                return process, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f"Load test server not ready after {SERVER_START_TIMEOUT}s")
+
+
+# ------------------------------------------------------------
+# Payloads
+# ------------------------------------------------------------
+def load_payloads(path: str = LOADTEST_INPUT, synthetic: int = LOADTEST_SYNTHETIC):
+    """Request bodies from a JSON-lines file, or synthetic FraudInput records."""
+    if path:
+        payloads = []
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    payloads.append(record.get("body", record))
+        print(f"Loaded {len(payloads)} payloads from {path}")
+        return payloads
+
+    from AgentsAPI import context_analyser_api, transaction_history_profiler_api
+    from AgentsAPI.orchestrator_api import FraudInput
+    from AgentsAPI.warmup import synthetic_records
+
+    choices = {
+        **context_analyser_api.WARMUP_CHOICES,
+        **transaction_history_profiler_api.WARMUP_CHOICES,
+        "user_agent": ["Mozilla/5.0 (Windows NT 10.0; Win64; x64)", "curl/8.4.0",
+                       "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X)"],
+    }
+    payloads = []
+    for record in synthetic_records(FraudInput, synthetic, choices, seed=LOADTEST_SEED):
+        payload = record.dict()
+        payload["metadata"] = " ".join(
+            str(payload[k]) for k in ("ip_address", "user_agent", "merchant", "product_category"))
+        payloads.append(payload)
+    print(f"Generated {len(payloads)} synthetic FraudInput payloads")
+    return payloads
+
+
+# ------------------------------------------------------------
+# Open-loop driver
+# ------------------------------------------------------------
+_local = threading.local()
+
+def _session():
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+def _send(url: str, payload: dict, scheduled: float):
+    """POST one request; latency counts from its scheduled send time."""
+    try:
+        status = _session().post(url, json=payload, timeout=LOADTEST_TIMEOUT_SECONDS).status_code
+        error = None if status < 400 else f"HTTP {status}"
+    except requests.Timeout:
+        error = "timeout"
+    except requests.RequestException as e:
+        error = type(e).__name__
+    done = time.perf_counter()
+    return done - scheduled, done, error
+
+def arrival_offsets(qps: float, seconds: float, arrivals: str = LOADTEST_ARRIVALS, seed: int = LOADTEST_SEED):
+    """Send times (seconds from stage start) at `qps` for `seconds`."""
+    n = max(1, int(qps * seconds))
+    if arrivals == "uniform":
+        return np.arange(n) / qps
+    gaps = np.random.default_rng(seed).exponential(1.0 / qps, n)
+    return np.cumsum(gaps) - gaps[0]
+
+def histogram(latencies_ms):
+    counts = np.histogram(latencies_ms, bins=[0] + HISTOGRAM_BUCKETS_MS + [np.inf])[0]
+    labels = [f"<={b}ms" for b in HISTOGRAM_BUCKETS_MS] + [f">{HISTOGRAM_BUCKETS_MS[-1]}ms"]
+    return dict(zip(labels, counts.tolist()))
+
+def run_stage(url: str, payloads, qps: float, seconds: float, pool):
+    offsets = arrival_offsets(qps, seconds)
+    futures = []
+    start = time.perf_counter() + 0.05
+    for i, offset in enumerate(offsets):
+        scheduled = start + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        futures.append(pool.submit(_send, url, payloads[i % len(payloads)], scheduled))
+    results = [f.result() for f in futures]
+
+    # Rates over the span of the sends / of the completions: if the server
+    # keeps up, responses arrive spread like the requests were sent.
+    n = len(results)
+    scale = n / (n - 1) if n > 1 else 1.0
+    send_span = max(offsets[-1] * scale, 1.0 / qps)
+    done = sorted(d for _, d, _ in results)
+    done_span = max((done[-1] - done[0]) * scale, 1.0 / qps)
+
+    latencies_ms = np.asarray([latency * 1000 for latency, _, error in results if error is None])
+    errors = {}
+    for _, _, error in results:
+        if error is not None:
+            errors[error] = errors.get(error, 0) + 1
+    sent, failed = len(results), sum(errors.values())
+    p50, p90, p99 = np.percentile(latencies_ms, [50, 90, 99]) if len(latencies_ms) else (None, None, None)
+    return {
+        "target_qps": qps,
+        "sent": sent,
+        "ok": sent - failed,
+        "offered_qps": round(sent / send_span, 2),
+        "achieved_qps": round((sent - failed) / done_span, 2),
+        "error_rate": round(failed / sent, 4),
+        "errors": errors,
+        "latency_ms": None if p50 is None else {
+            "p50": round(float(p50), 2), "p90": round(float(p90), 2), "p99": round(float(p99), 2),
+            "max": round(float(latencies_ms.max()), 2),
+        },
+        "histogram": histogram(latencies_ms),
+    }
+
+def saturated(stage: dict):
+    """Why a stage counts as saturated, or None."""
+    if stage["achieved_qps"] < 0.95 * stage["offered_qps"]:
+        return "throughput"
+    if stage["error_rate"] > LOADTEST_MAX_ERROR_RATE:
+        return "errors"
+    if stage["latency_ms"] and stage["latency_ms"]["p99"] > LOADTEST_SLO_P99_MS:
+        return "latency"
+    return None
+
+
+def main():
+    payloads = load_payloads()
+    process, base_url = (None, LOADTEST_URL) if LOADTEST_URL else start_server()
+    url = f"{base_url}{LOADTEST_PATH}"
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "url": url,
+        "models": None if LOADTEST_URL else LOADTEST_MODELS,
+        "stub_latency_ms": stub_latencies() if not LOADTEST_URL and LOADTEST_MODELS == "stub" else None,
+        "arrivals": LOADTEST_ARRIVALS,
+        "stage_seconds": LOADTEST_STAGE_SECONDS,
+        "stages": [],
+        "saturation": None,
+    }
+    try:
+        with ThreadPoolExecutor(max_workers=LOADTEST_MAX_IN_FLIGHT, thread_name_prefix="load") as pool:
+            print(f"\n{'target':>8} {'offered':>8} {'achieved':>9} {'errors':>7} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+            for qps in sorted(LOADTEST_QPS):
+                stage = run_stage(url, payloads, qps, LOADTEST_STAGE_SECONDS, pool)
+                report["stages"].append(stage)
+                lat = stage["latency_ms"] or {}
+                print(f"{qps:>8.1f} {stage['offered_qps']:>8.2f} {stage['achieved_qps']:>9.2f} {stage['error_rate']:>7.2%} "
+                      f"{lat.get('p50', float('nan')):>9.1f} {lat.get('p90', float('nan')):>9.1f} "
+                      f"{lat.get('p99', float('nan')):>9.1f} {lat.get('max', float('nan')):>9.1f}"
+                      + (f"  {stage['errors']}" if stage["errors"] else ""))
+                reason = saturated(stage)
+                if reason:
+                    previous = report["stages"][-2]["target_qps"] if len(report["stages"]) > 1 else None
+                    report["saturation"] = {"qps": qps, "reason": reason, "max_sustained_qps": previous}
+                    print(f"Saturated at {qps} QPS ({reason}); last sustained rate: {previous}")
+                    break
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=30)
+
+    if report["saturation"] is None:
+        print(f"No saturation up to {max(LOADTEST_QPS)} QPS.")
+    with open(LOADTEST_OUTPUT, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Load test report written to {LOADTEST_OUTPUT}")
+    return report
+
+if __name__ == "__main__":
+    main()
@@ -3,30 +3,138 @@
 # Main FastAPI entrypoint for all fraud detection agents
 # ------------------------------------------------------------
 
+import threading
+import time
+
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 
 # Import routers from each agent API
+from AgentsAPI.admin_api import router as admin_router
 from AgentsAPI.aggregator_api import router as aggregator_router
 from AgentsAPI.context_analyser_api import router as context_router
 from AgentsAPI.fraud_pattern_matcher_api import router as matcher_router
 from AgentsAPI.orchestrator_api import router as orchestrator_router
 from AgentsAPI.transaction_history_profiler_api import router as profiler_router
+from AgentsAPI import aggregator_api, context_analyser_api, fraud_pattern_matcher_api, transaction_history_profiler_api
+from AgentsAPI.inference_pool import INFERENCE_POOL
+from AgentsAPI.memory_report import process_memory
+from AgentsAPI.metrics import CONTENT_TYPE, REGISTRY, MetricsMiddleware, register_model_slots
+from AgentsAPI.model_watcher import load_all
+from AgentsAPI.profiler import ProfilerMiddleware
+from AgentsAPI.tracing import TracingMiddleware
 
 # ------------------------------------------------------------
 # Main FastAPI Application
 # ------------------------------------------------------------
 app = FastAPI(title="Fraud Detection API", docs_url="/docs", redoc_url="/redoc")
 
+# Per-route request counts, in-flight requests and latency (see /metrics)
+app.add_middleware(MetricsMiddleware)
+# Request-count profiling sessions (/admin/profile); inert otherwise
+app.add_middleware(ProfilerMiddleware)
+# Server span per request, continuing the caller's traceparent (TRACING_EXPORT)
+app.add_middleware(TracingMiddleware)
+
 # Include routers under specific prefixes
 app.include_router(aggregator_router, prefix="/aggregator", tags=["Aggregator"])
 app.include_router(context_router, prefix="/context-analyser", tags=["Context Analyzer"])
 app.include_router(matcher_router, prefix="/fraud-matcher", tags=["Fraud Pattern Matcher"])
 app.include_router(profiler_router, prefix="/transaction-history", tags=["Transaction History Profiler"])
 app.include_router(orchestrator_router, prefix="/orchestrator", tags=["Orchestrator"])
+app.include_router(admin_router, prefix="/admin", tags=["Admin"])
 
 # ------------------------------------------------------------
-# Root endpoint for sanity check / health check
+# Model loading and background hot-reload
+#
+# Models are loaded concurrently in a background thread after the port
+# is bound: `/` (liveness) answers immediately, `/ready` returns 503
+# until every required model is loaded and warmed.
+# ------------------------------------------------------------
+MODEL_SLOTS = [
+    context_analyser_api.slot,
+    transaction_history_profiler_api.slot,
+    fraud_pattern_matcher_api.slot,
+    aggregator_api.slot,
+]
+
+# Shadow candidates (SHADOW_SAMPLE_RATE > 0): optional, loaded after the active models
+SHADOW_SCORERS = [
+    context_analyser_api.shadow,
+    transaction_history_profiler_api.shadow,
+    fraud_pattern_matcher_api.shadow,
+]
+
+STARTUP = {"started_at": None, "finished": False, "load_seconds": None}
+
+register_model_slots(lambda: MODEL_SLOTS + [scorer.slot for scorer in SHADOW_SCORERS if scorer.enabled])
+
+def load_models_and_watch():
+    STARTUP["started_at"] = time.time()
+    STARTUP["load_seconds"] = round(load_all(MODEL_SLOTS), 3)
+    STARTUP["finished"] = True
+    # Watchers also pick up models that were missing at startup
+    for slot in MODEL_SLOTS:
+        slot.start_watcher()
+
+    shadows = [scorer for scorer in SHADOW_SCORERS if scorer.enabled]
+    if shadows:
+        load_all([scorer.slot for scorer in shadows])
+        for scorer in shadows:
+            scorer.start()
+
+@app.on_event("startup")
+def start_model_loading():
+    threading.Thread(target=load_models_and_watch, name="model-startup", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_model_watchers():
+    for slot in MODEL_SLOTS:
+        slot.stop_watcher()
+    for scorer in SHADOW_SCORERS:
+        scorer.stop()
+    INFERENCE_POOL.shutdown()
+
+# ------------------------------------------------------------
+# Root endpoint for sanity check / health check (liveness)
 # ------------------------------------------------------------
 @app.get("/")
 def root():
     return {"message": "Fraud Detection API is running. Check /docs for API documentation."}
+
+# ------------------------------------------------------------
+# Readiness: every required model loaded and warmed
+# ------------------------------------------------------------
+@app.get("/ready")
+def ready():
+    is_ready = STARTUP["finished"] and all(slot.ready for slot in MODEL_SLOTS)
+    body = {
+        "ready": is_ready,
+        "startup_load_seconds": STARTUP["load_seconds"],
+        "models": {
+            slot.agent_prefix: {
+                "loaded": slot.current is not None,
+                "required": slot.required,
+                "model_key": slot.current.key if slot.current else None,
+                "warm_seconds": round(slot.current.warm_seconds, 3) if slot.current else None,
+                "error": slot.last_error,
+            }
+            for slot in MODEL_SLOTS
+        },
+        "inference_pool": INFERENCE_POOL.status(),
+    }
+    return JSONResponse(status_code=200 if is_ready else 503, content=body)
+
+# ------------------------------------------------------------
+# Worker memory (unique vs. shared with the other workers)
+# ------------------------------------------------------------
+@app.get("/memory")
+def memory():
+    return process_memory()
+
+# ------------------------------------------------------------
+# Prometheus metrics (this worker)
+# ------------------------------------------------------------
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,85 @@
+# app/AgentsAPI/memory_report.py
+# ------------------------------------------------------------
+# Per-worker memory report: unique vs. shared pages.
+#
+# Reads /proc/<pid>/smaps_rollup (Linux). "unique" is the memory only
+# this process holds (private clean + private dirty, what would be
+# freed if it exited); "shared" is resident memory also mapped by other
+# processes, e.g. memory-mapped model artifacts in the page cache.
+#
+# Usage:
+#     python -m AgentsAPI.memory_report          # all AgentsAPI workers
+#     GET /memory                                # the worker serving the call
+# ------------------------------------------------------------
+import os
+
+APP_MARKER = "AgentsAPI.main:app"
+
+
+def process_memory(pid="self"):
+    """Memory breakdown in MB for one process."""
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 3 and parts[0].endswith(":") and parts[2] == "kB":
+                fields[parts[0][:-1]] = int(parts[1])
+
+    unique = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    return {
+        "pid": os.getpid() if pid == "self" else int(pid),
+        "rss_mb": round(fields.get("Rss", 0) / 1024, 1),
+        "pss_mb": round(fields.get("Pss", 0) / 1024, 1),
+        "unique_mb": round(unique / 1024, 1),
+        "shared_mb": round(shared / 1024, 1),
+    }
+
+
+def _read_cmdline(pid):
+    with open(f"/proc/{pid}/cmdline", "rb") as f:
+        return f.read().replace(b"\0", b" ").decode(errors="ignore")
+
+def _parent_pid(pid):
+    with open(f"/proc/{pid}/stat") as f:
+        # The command name may contain spaces: the ppid follows the closing ")"
+        return int(f.read().rsplit(")", 1)[1].split()[1])
+
+def worker_pids(marker: str = APP_MARKER):
+    """PIDs of the uvicorn process serving the AgentsAPI app and its workers."""
+    parents, children = set(), {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            if marker in _read_cmdline(entry):
+                parents.add(int(entry))
+            children.setdefault(_parent_pid(entry), []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+
+    # uvicorn --workers spawns children whose cmdline does not name the app
+    pids = set(parents)
+    for parent in parents:
+        pids.update(children.get(parent, []))
+    return sorted(pids)
+
+
+def main():
+    rows = []
+    for pid in worker_pids():
+        try:
+            rows.append(process_memory(pid))
+        except OSError:
+            continue
+
+    print(f"{'pid':>8} {'rss_mb':>10} {'pss_mb':>10} {'unique_mb':>10} {'shared_mb':>10}")
+    for row in rows:
+        print(f"{row['pid']:>8} {row['rss_mb']:>10} {row['pss_mb']:>10} {row['unique_mb']:>10} {row['shared_mb']:>10}")
+    if rows:
+        print(f"Total unique: {sum(r['unique_mb'] for r in rows):.1f} MB, "
+              f"total PSS: {sum(r['pss_mb'] for r in rows):.1f} MB across {len(rows)} processes")
+
+
+if __name__ == "__main__":
+    main()
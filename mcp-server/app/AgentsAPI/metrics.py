@@ -0,0 +1,299 @@
+# app/AgentsAPI/metrics.py
+# ------------------------------------------------------------
+# Prometheus metrics for the AgentsAPI (text exposition format 0.0.4,
+# served at /metrics), without a client library dependency.
+#
+# Hot-path updates take no lock: every thread increments its own shard
+# (a dict of plain lists, created once per thread and label set) and a
+# scrape sums the shards. Only a thread's first update of a metric
+# registers its shard under a lock. Values from live threads are read
+# while they may be written, so a scrape can be off by the few updates
+# in flight; totals are never lost.
+#
+# Metrics are per process: with several uvicorn workers each worker
+# serves its own numbers (scrape each, or aggregate across them).
+#
+#     http_requests_total{route,method,status}       requests by route template
+#     http_requests_in_progress{route}                in-flight requests
+#     http_request_duration_seconds{route}            request latency
+#     agent_score_duration_seconds{agent}             model scoring latency
+#     agent_batch_size{agent}                         records per scoring call
+#     agent_score{agent}                              score distribution
+#     agent_call_duration_seconds{agent}              orchestrator → agent calls
+#     cache_requests_total{cache,result}              hit / miss per cache
+#     model_load_seconds{agent_prefix,stage}          download / load / warm-up
+#     model_info{agent_prefix,model_key,etag}         active model keys
+#     model_reloads_total{agent_prefix}               hot swaps
+# ------------------------------------------------------------
+import bisect
+import math
+import threading
+import time
+
+# Default latency buckets (seconds)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096)
+SCORE_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name: str, documentation: str, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._local = threading.local()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def _cells(self, labels):
+        """This thread's cells for a label set (created on first use)."""
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        cells = shard.get(labels)
+        if cells is None:
+            cells = shard[labels] = self._new_cells()
+        return cells
+
+    def _merged(self):
+        merged = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for labels, cells in list(shard.items()):
+                total = merged.get(labels)
+                if total is None:
+                    merged[labels] = list(cells)
+                else:
+                    for i, value in enumerate(cells):
+                        total[i] += value
+        return merged
+
+    def _new_cells(self):
+        return [0]
+
+    def collect(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type}"]
+        lines.extend(self.collect())
+        return lines
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        self._cells(labels)[0] += amount
+
+    def collect(self):
+        for labels, (value,) in sorted(self._merged().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """A gauge moved with inc/dec (e.g. in-flight requests)."""
+    type = "gauge"
+
+    def dec(self, *labels, amount=1):
+        self._cells(labels)[0] -= amount
+
+
+class GaugeFunction(_Metric):
+    """A gauge read at scrape time: `function()` returns {label values tuple: value}."""
+    type = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames, function, registry=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.function = function
+
+    def collect(self):
+        for labels, value in sorted(self.function().items()):
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_cells(self):
+        # One count per bucket plus +Inf, then the sum
+        return [0] * (len(self.buckets) + 1) + [0.0]
+
+    def observe(self, value, *labels):
+        cells = self._cells(labels)
+        cells[bisect.bisect_left(self.buckets, value)] += 1
+        cells[-1] += value
+
+    def observe_many(self, values, *labels):
+        cells = self._cells(labels)
+        for value in values:
+            cells[bisect.bisect_left(self.buckets, value)] += 1
+            cells[-1] += value
+
+    def time(self, *labels):
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(self, labels)
+
+    def collect(self):
+        for labels, cells in sorted(self._merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), cells):
+                cumulative += count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(float(cells[-1]))}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}"
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# Content type of the text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# ------------------------------------------------------------
+# Metrics shared across the routers
+# ------------------------------------------------------------
+HTTP_REQUESTS = Counter("http_requests_total", "HTTP requests by route template, method and status.",
+                        ["route", "method", "status"])
+HTTP_IN_PROGRESS = Gauge("http_requests_in_progress", "HTTP requests currently being served.", ["route"])
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route template.", ["route"])
+
+AGENT_SCORE_LATENCY = Histogram("agent_score_duration_seconds", "Model scoring latency per agent.", ["agent"])
+AGENT_BATCH_SIZE = Histogram("agent_batch_size", "Records per scoring call.", ["agent"], buckets=BATCH_SIZE_BUCKETS)
+AGENT_SCORES = Histogram("agent_score", "Distribution of the scores returned per agent.", ["agent"],
+                         buckets=SCORE_BUCKETS)
+AGENT_CALL_LATENCY = Histogram("agent_call_duration_seconds", "Orchestrator calls to the agents and aggregator.",
+                               ["agent", "outcome"])
+
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result (hit / miss).",
+                         ["cache", "result"])
+
+
+def observe_scoring(agent: str, seconds: float, scores):
+    """Record one scoring call: latency, batch size and score distribution."""
+    AGENT_SCORE_LATENCY.observe(seconds, agent)
+    AGENT_BATCH_SIZE.observe(len(scores), agent)
+    AGENT_SCORES.observe_many(scores, agent)
+
+
+def register_model_slots(slots):
+    """Scrape-time gauges for the model slots: load timings, active keys and reloads."""
+    def load_seconds():
+        values = {}
+        for slot in slots():
+            active = slot.current
+            if active is not None:
+                values[(slot.agent_prefix, "download")] = active.download_seconds
+                values[(slot.agent_prefix, "load")] = active.load_seconds
+                values[(slot.agent_prefix, "warm")] = active.warm_seconds
+        return values
+
+    GaugeFunction("model_load_seconds", "Time to download, deserialize and warm the active model.",
+                  ["agent_prefix", "stage"], load_seconds)
+    GaugeFunction("model_info", "Active model per slot (value is always 1).", ["agent_prefix", "model_key", "etag"],
+                  lambda: {(s.agent_prefix, s.current.key, s.current.etag): 1 for s in slots() if s.current})
+    GaugeFunction("model_reloads_total", "Hot swaps since startup.", ["agent_prefix"],
+                  lambda: {(s.agent_prefix,): s.reloads for s in slots()})
+
+
+# ------------------------------------------------------------
+# ASGI middleware: per-route counts, in-flight and latency
+# ------------------------------------------------------------
+class MetricsMiddleware:
+    """
+    Labels requests with their route template ("/context-analyser/predict"),
+    resolved once per path; paths that match no route share one label.
+    """
+
+    UNMATCHED = "unmatched"
+
+    def __init__(self, app):
+        self.app = app
+        self._routes = {}
+
+    def _route(self, scope):
+        path = scope["path"]
+        route = self._routes.get(path)
+        if route is None:
+            from starlette.routing import Match
+
+            route = self.UNMATCHED
+            for candidate in scope["app"].routes:
+                match, _ = candidate.matches(scope)
+                if match == Match.FULL:
+                    route = self._routes[path] = getattr(candidate, "path", path)
+                    break
+        return route
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        route = self._route(scope)
+        status = [500]
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc(route)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_LATENCY.observe(time.perf_counter() - start, route)
+            HTTP_IN_PROGRESS.dec(route)
+            HTTP_REQUESTS.inc(route, scope["method"], str(status[0]))
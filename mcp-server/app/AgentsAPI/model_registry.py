@@ -0,0 +1,203 @@
+# app/AgentsAPI/model_registry.py
+# ------------------------------------------------------------
+# Model Registry: one place to resolve, download and cache agent models.
+#
+# S3 layout (per agent prefix, e.g. "agents/agent1/"):
+#     agents/agent1/agent1_<timestamp>.pkl   model artifacts
+#     agents/agent1/manifest.json            pointer to the latest artifact
+#
+# - Latest resolution reads the manifest (one GET). Without a manifest
+#   it falls back to a paginated listing, so prefixes holding more than
+#   1000 objects still resolve correctly.
+# - Downloads land in a content-addressed local cache keyed by ETag and
+#   are verified against it. A restart with an unchanged model finds the
+#   verified file and skips the download entirely.
+# ------------------------------------------------------------
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+import boto3
+import joblib
+
+from AgentsAPI.metrics import CACHE_REQUESTS
+
+# ------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------
+REGION = "ca-central-1"
+BUCKET_NAME = os.getenv("MODEL_BUCKET", "dav-fraud-detection-models")
+LOCAL_MODEL_DIR = os.getenv("MODEL_CACHE_DIR", "models")
+MANIFEST_NAME = "manifest.json"
+
+# boto3's default multipart chunk size, used to recompute multipart ETags
+DEFAULT_PART_SIZE = 8 * 1024 * 1024
+
+_s3 = None
+
+
+def get_s3():
+    """Shared S3 client (S3_ENDPOINT_URL points it at a local stand-in)."""
+    global _s3
+    if _s3 is None:
+        _s3 = boto3.client("s3", region_name=REGION, endpoint_url=os.getenv("S3_ENDPOINT_URL") or None)
+    return _s3
+
+
+# ------------------------------------------------------------
+# Latest-version resolution
+# ------------------------------------------------------------
+def _entry(key: str, etag: str, size: int, last_modified):
+    if isinstance(last_modified, datetime):
+        last_modified = last_modified.astimezone(timezone.utc).isoformat()
+    return {"key": key, "etag": etag.strip('"'), "size": int(size), "last_modified": last_modified}
+
+def manifest_key(agent_prefix: str):
+    return f"{agent_prefix.rstrip('/')}/{MANIFEST_NAME}"
+
+def list_model_objects(agent_prefix: str):
+    """All model objects under a prefix, following pagination past 1000 keys."""
+    paginator = get_s3().get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=BUCKET_NAME, Prefix=agent_prefix):
+        for obj in page.get("Contents", []):
+            if obj["Key"].endswith(f"/{MANIFEST_NAME}"):
+                continue
+            yield obj
+
+def read_manifest(agent_prefix: str):
+    """The agent's manifest, or None when it has not been written yet."""
+    s3 = get_s3()
+    try:
+        obj = s3.get_object(Bucket=BUCKET_NAME, Key=manifest_key(agent_prefix))
+    except s3.exceptions.NoSuchKey:
+        return None
+    return json.loads(obj["Body"].read())
+
+def write_manifest(agent_prefix: str, s3_key: str, sha256: str = None, **metadata):
+    """Point the agent's manifest at `s3_key` (call after a confirmed upload)."""
+    head = get_s3().head_object(Bucket=BUCKET_NAME, Key=s3_key)
+    latest = _entry(s3_key, head["ETag"], head["ContentLength"], head["LastModified"])
+    if sha256:
+        # Content hash checked by download_model, whatever the ETag scheme
+        latest["sha256"] = sha256
+    manifest = {
+        "agent_prefix": agent_prefix,
+        "latest": latest,
+        **metadata,
+    }
+    get_s3().put_object(
+        Bucket=BUCKET_NAME,
+        Key=manifest_key(agent_prefix),
+        Body=json.dumps(manifest, indent=2).encode("utf-8"),
+        ContentType="application/json",
+    )
+    print(f"Manifest updated: s3://{BUCKET_NAME}/{manifest_key(agent_prefix)} → {s3_key}")
+    return manifest
+
+def resolve_latest(agent_prefix: str):
+    """Latest model entry (key, etag, size, last_modified) for an agent, or None."""
+    manifest = read_manifest(agent_prefix)
+    if manifest is not None:
+        return manifest["latest"]
+
+    # Ties on LastModified (same-second uploads) break on the timestamped key
+    latest = max(list_model_objects(agent_prefix), key=lambda x: (x["LastModified"], x["Key"]), default=None)
+    if latest is None:
+        print(f"No models found for prefix {agent_prefix}")
+        return None
+    return _entry(latest["Key"], latest["ETag"], latest["Size"], latest["LastModified"])
+
+def get_latest_model_key(agent_prefix: str):
+    """Retrieve the latest model key for a given agent prefix."""
+    entry = resolve_latest(agent_prefix)
+    return entry["key"] if entry else None
+
+
+# ------------------------------------------------------------
+# Content-addressed local cache
+# ------------------------------------------------------------
+def file_sha256(path: str):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+def compute_etag(path: str, parts: int = 1, part_size: int = None):
+    """S3-style ETag of a local file (plain MD5, or MD5-of-MD5s for multipart)."""
+    if parts <= 1:
+        md5 = hashlib.md5()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                md5.update(chunk)
+        return md5.hexdigest()
+
+    size = os.path.getsize(path)
+    part_size = part_size or DEFAULT_PART_SIZE
+    if -(-size // part_size) != parts:
+        # Uploaded with a different chunk size: derive it from the part count
+        part_size = -(-size // parts)
+    digests = []
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(part_size), b""):
+            digests.append(hashlib.md5(chunk).digest())
+    return f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+
+def verify_etag(path: str, etag: str):
+    parts = int(etag.split("-")[1]) if "-" in etag else 1
+    return compute_etag(path, parts) == etag
+
+def cached_model_path(entry: dict):
+    """Local cache location for a model entry: <cache>/<etag>/<file name>."""
+    return os.path.join(LOCAL_MODEL_DIR, entry["etag"], os.path.basename(entry["key"]))
+
+def download_model(entry):
+    """
+    Download a model into the local cache unless a verified copy is already there.
+    Accepts a registry entry or a plain S3 key.
+    """
+    if isinstance(entry, str):
+        head = get_s3().head_object(Bucket=BUCKET_NAME, Key=entry)
+        entry = _entry(entry, head["ETag"], head["ContentLength"], head["LastModified"])
+
+    local_path = cached_model_path(entry)
+    verified_marker = f"{local_path}.verified"
+    if os.path.exists(verified_marker) and os.path.exists(local_path) \
+            and os.path.getsize(local_path) == entry["size"]:
+        CACHE_REQUESTS.inc("model_artifact", "hit")
+        print(f"Using cached model {local_path} (etag {entry['etag']})")
+        return local_path
+
+    CACHE_REQUESTS.inc("model_artifact", "miss")
+
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    tmp_path = f"{local_path}.tmp-{os.getpid()}"
+    get_s3().download_file(BUCKET_NAME, entry["key"], tmp_path)
+    if os.path.getsize(tmp_path) != entry["size"]:
+        os.remove(tmp_path)
+        raise RuntimeError(f"Downloaded model size mismatch: s3://{BUCKET_NAME}/{entry['key']}")
+    if entry.get("sha256"):
+        if file_sha256(tmp_path) != entry["sha256"]:
+            os.remove(tmp_path)
+            raise RuntimeError(f"Downloaded model checksum mismatch: s3://{BUCKET_NAME}/{entry['key']}")
+    elif not verify_etag(tmp_path, entry["etag"]):
+        # SSE-KMS objects and unusual part sizes have ETags that are not content MD5s
+        print(f"ETag {entry['etag']} is not a content hash; verified by size only.")
+    os.replace(tmp_path, local_path)
+    open(verified_marker, "w").close()
+    print(f"Downloaded model: s3://{BUCKET_NAME}/{entry['key']} → {local_path}")
+    return local_path
+
+def load_latest_model(agent_prefix: str, loader=joblib.load):
+    """Resolve, fetch (or reuse) and load the latest model for an agent."""
+    print(f"Resolving the latest model for {agent_prefix}...")
+    entry = resolve_latest(agent_prefix)
+    if not entry:
+        raise RuntimeError(f"No model found for prefix {agent_prefix}")
+
+    local_path = download_model(entry)
+    print(f"Loading model from {local_path}")
+    model = loader(local_path)
+    print("Model loaded successfully.")
+    return model, entry["key"]
@@ -0,0 +1,195 @@
+# app/AgentsAPI/model_watcher.py
+# ------------------------------------------------------------
+# Hot-reloadable model slots for the agent routers.
+#
+# A ModelSlot holds the active model for one agent prefix. A background
+# watcher thread polls the model registry; when the latest artifact's
+# ETag changes it downloads, loads and warms the new model off the
+# request path, then swaps it in with a single reference assignment.
+#
+# Scoring reads `slot.current` once (active_model) and uses that object
+# for the whole request, so in-flight requests finish on the model they
+# started with while new requests pick up the new one. Responses carry
+# that snapshot's key, which is also what shadow comparisons are keyed on.
+#
+# At startup `load_all` loads every slot concurrently, off the import
+# path, so the app binds its port immediately and reports readiness
+# once all required models are loaded and warmed.
+# ------------------------------------------------------------
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from AgentsAPI import model_registry
+from AgentsAPI.shared_artifacts import load_shared_artifact
+
+# Seconds between registry polls; 0 disables the background watcher
+POLL_INTERVAL_SECONDS = float(os.getenv("MODEL_POLL_INTERVAL_SECONDS", "60"))
+
+# Slots loaded concurrently at startup (resolve, download, deserialize, warm)
+STARTUP_LOAD_WORKERS = int(os.getenv("MODEL_LOAD_WORKERS", "4"))
+
+
+class LoadedModel:
+    """An immutable snapshot of one loaded artifact and its timings."""
+
+    def __init__(self, model, entry, download_seconds, load_seconds, warm_seconds):
+        self.model = model
+        self.key = entry["key"]
+        self.etag = entry["etag"]
+        self.loaded_at = datetime.now(timezone.utc).isoformat()
+        self.download_seconds = download_seconds
+        self.load_seconds = load_seconds
+        self.warm_seconds = warm_seconds
+        # Per-stage warm-up timings returned by the slot's warm-up hook
+        self.warmup = {}
+        # Per-model derived objects (e.g. a SHAP explainer), built lazily
+        self.cache = {}
+
+    def status(self):
+        return {
+            "model_key": self.key,
+            "etag": self.etag,
+            "loaded_at": self.loaded_at,
+            "download_seconds": round(self.download_seconds, 3),
+            "load_seconds": round(self.load_seconds, 3),
+            "warm_seconds": round(self.warm_seconds, 3),
+            "warmup": self.warmup,
+        }
+
+
+class ModelSlot:
+    """The active model for one agent, reloaded in the background."""
+
+    def __init__(self, agent_prefix: str, warmup=None, loader=load_shared_artifact,
+                 poll_interval: float = POLL_INTERVAL_SECONDS, required: bool = True):
+        self.agent_prefix = agent_prefix
+        self.warmup = warmup
+        # Optional slots (e.g. the stacker) have a fallback and do not gate readiness
+        self.required = required
+        self.loader = loader
+        self.poll_interval = poll_interval
+        self.current = None
+        self.reloads = 0
+        self.last_error = None
+        self.last_checked_at = None
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self.current is not None or not self.required
+
+    # --------------------------------------------------------
+    # Loading
+    # --------------------------------------------------------
+    def _build(self, entry):
+        """Download, deserialize and warm an artifact without touching `current`."""
+        start = time.perf_counter()
+        local_path = model_registry.download_model(entry)
+        downloaded = time.perf_counter()
+        model = self.loader(local_path)
+        loaded = time.perf_counter()
+        candidate = LoadedModel(model, entry, downloaded - start, loaded - downloaded, 0.0)
+        if self.warmup is not None:
+            candidate.warmup = self.warmup(candidate) or {}
+        candidate.warm_seconds = time.perf_counter() - loaded
+        return candidate
+
+    def load(self):
+        """Load the latest model synchronously (startup). Raises if none exists."""
+        entry = model_registry.resolve_latest(self.agent_prefix)
+        if not entry:
+            raise RuntimeError(f"No model found for prefix {self.agent_prefix}")
+        with self._reload_lock:
+            self.current = self._build(entry)
+        print(f"[{self.agent_prefix}] Active model: {self.current.key} "
+              f"(warm-up {self.current.warm_seconds:.3f}s {self.current.warmup})")
+        return self.current
+
+    def check_for_update(self):
+        """Swap in the latest artifact if it changed. Returns True on swap."""
+        with self._reload_lock:
+            self.last_checked_at = datetime.now(timezone.utc).isoformat()
+            entry = model_registry.resolve_latest(self.agent_prefix)
+            if not entry or (self.current is not None and entry["etag"] == self.current.etag):
+                return False
+
+            print(f"[{self.agent_prefix}] New model detected: {entry['key']}, loading in background...")
+            candidate = self._build(entry)
+            # Atomic swap: a single reference assignment
+            self.current = candidate
+            self.reloads += 1
+            print(f"[{self.agent_prefix}] Swapped active model to {candidate.key}")
+            return True
+
+    # --------------------------------------------------------
+    # Background watcher
+    # --------------------------------------------------------
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.check_for_update()
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the current model; retry on the next poll
+                self.last_error = str(e)
+                print(f"[{self.agent_prefix}] Model reload failed: {e}")
+
+    def start_watcher(self):
+        if self.poll_interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._watch, name=f"model-watcher-{self.agent_prefix}", daemon=True
+        )
+        self._thread.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def status(self):
+        return {
+            "agent_prefix": self.agent_prefix,
+            "required": self.required,
+            "active": self.current.status() if self.current else None,
+            "reloads": self.reloads,
+            "poll_interval_seconds": self.poll_interval,
+            "watcher_running": self._thread is not None and self._thread.is_alive(),
+            "last_checked_at": self.last_checked_at,
+            "last_error": self.last_error,
+        }
+
+
+# ------------------------------------------------------------
+# Startup loading
+# ------------------------------------------------------------
+def load_all(slots, max_workers: int = STARTUP_LOAD_WORKERS):
+    """
+    Load every slot concurrently. Failures are recorded on the slot
+    (`last_error`) rather than raised, so one missing model does not
+    block the others. Returns the elapsed seconds.
+    """
+    start = time.perf_counter()
+
+    def load_one(slot):
+        try:
+            slot.load()
+            slot.last_error = None
+        except Exception as e:
+            slot.last_error = str(e)
+            print(f"[{slot.agent_prefix}] Startup load failed: {e}")
+
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="model-load") as pool:
+        list(pool.map(load_one, slots))
+
+    elapsed = time.perf_counter() - start
+    warm = sum(s.current.warm_seconds for s in slots if s.current is not None)
+    print(f"Loaded {sum(s.current is not None for s in slots)}/{len(slots)} models in {elapsed:.2f}s "
+          f"(warm-up {warm:.2f}s)")
+    return elapsed
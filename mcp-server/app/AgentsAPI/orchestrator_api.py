@@ -4,12 +4,19 @@
 # Fraud Detection Orchestrator: Calls all agents and aggregates
 # ------------------------------------------------------------
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
+import numpy as np
 import requests
 import os
+import time
 from typing import Dict, Any, List
 
+from AgentsAPI.columnar import AGENT_BATCH_FORMAT, BatchDecodeError, batch_content_type, decode_table, encode_batch
+from AgentsAPI.metrics import AGENT_CALL_LATENCY
+from AgentsAPI.tracing import start_span
+
 router = APIRouter()
 
 # ------------------------------------------------------------
@@ -19,10 +26,20 @@ router = APIRouter()
 # ------------------------------------------------------------
 # Update agent & aggregator URLs to use single port routes
 # ------------------------------------------------------------
-AGENT1_URL = "http://localhost:80/context-analyser/predict"        # context_router
-AGENT2_URL = "http://localhost:80/transaction-history/predict"     # profiler_router
-AGENT3_URL = "http://localhost:80/fraud-matcher/predict"           # matcher_router
-AGGREGATOR_URL = "http://localhost:80/aggregator/aggregate"        # aggregator_router
+AGENTS_BASE_URL = os.getenv("AGENTS_BASE_URL", "http://localhost:80").rstrip("/")
+AGENT1_URL = f"{AGENTS_BASE_URL}/context-analyser/predict"        # context_router
+AGENT2_URL = f"{AGENTS_BASE_URL}/transaction-history/predict"     # profiler_router
+AGENT3_URL = f"{AGENTS_BASE_URL}/fraud-matcher/predict"           # matcher_router
+AGGREGATOR_URL = f"{AGENTS_BASE_URL}/aggregator/aggregate"        # aggregator_router
+
+# Batch endpoints (/fraud-check-batch); AGENT_BATCH_FORMAT=json|arrow picks the encoding
+AGENT1_BATCH_URL = f"{AGENTS_BASE_URL}/context-analyser/predict-batch"
+AGENT2_BATCH_URL = f"{AGENTS_BASE_URL}/transaction-history/predict-batch"
+AGENT3_BATCH_URL = f"{AGENTS_BASE_URL}/fraud-matcher/predict-batch"
+AGGREGATOR_BATCH_URL = f"{AGENTS_BASE_URL}/aggregator/aggregate-batch"
+
+# Per-call timeout (seconds) for agent and aggregator requests
+AGENT_TIMEOUT_SECONDS = float(os.getenv("AGENT_TIMEOUT_SECONDS", "20"))
 
 class FraudInput(BaseModel):
     # ------------------------------------------------------------
@@ -70,18 +87,33 @@ class FraudInput(BaseModel):
     metadata: str
 
 
-def call_agent(url: str, payload: Dict[str, Any], key: str) -> float:
-    try:
-        resp = requests.post(url, json=payload, timeout=20)
-        resp.raise_for_status()
-        data = resp.json()
-        return float(data.get(key, 0.0))
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error calling {url}: {e}")
+def call_agent(url: str, payload: Dict[str, Any], key: str, agent: str) -> float:
+    start = time.perf_counter()
+    with start_span(f"call {agent}", attributes={"http.url": url, "agent": agent}) as span:
+        try:
+            resp = requests.post(url, json=payload, timeout=AGENT_TIMEOUT_SECONDS, headers=span.headers())
+            span.set_attribute("http.status_code", resp.status_code)
+            resp.raise_for_status()
+            data = resp.json()
+            AGENT_CALL_LATENCY.observe(time.perf_counter() - start, agent, "ok")
+            return float(data.get(key, 0.0))
+        except Exception as e:
+            AGENT_CALL_LATENCY.observe(time.perf_counter() - start, agent, "error")
+            span.set_error(str(e))
+            raise HTTPException(status_code=500, detail=f"Error calling {url}: {e}")
 
 def call_aggregator(scores: List[float]) -> Dict[str, Any]:
-    resp = requests.post(AGGREGATOR_URL, json={"scores": scores})
-    resp.raise_for_status()
+    start = time.perf_counter()
+    outcome = "error"
+    with start_span("call aggregator", attributes={"http.url": AGGREGATOR_URL, "agent": "aggregator"}) as span:
+        try:
+            resp = requests.post(AGGREGATOR_URL, json={"scores": scores}, timeout=AGENT_TIMEOUT_SECONDS,
+                                 headers=span.headers())
+            span.set_attribute("http.status_code", resp.status_code)
+            resp.raise_for_status()
+            outcome = "ok"
+        finally:
+            AGENT_CALL_LATENCY.observe(time.perf_counter() - start, "aggregator", outcome)
     return resp.json()
 
 
@@ -140,9 +172,9 @@ def fraud_check(data: FraudInput):
     # -----------------------------
     # Call agents
     # -----------------------------
-    a1_score = call_agent(AGENT1_URL, agent1_payload, "anomaly_score")
-    a2_score = call_agent(AGENT2_URL, agent2_payload, "pattern_score")
-    a3_score = call_agent(AGENT3_URL, agent3_payload, "fraud_probability")
+    a1_score = call_agent(AGENT1_URL, agent1_payload, "anomaly_score", "agent1")
+    a2_score = call_agent(AGENT2_URL, agent2_payload, "pattern_score", "agent2")
+    a3_score = call_agent(AGENT3_URL, agent3_payload, "fraud_probability", "agent3")
 
     # -----------------------------
     # Aggregate results
@@ -155,7 +187,85 @@ def fraud_check(data: FraudInput):
         "explanation": aggregator_result.get("explanation"),
     }
 
-    
+
+# ------------------------------------------------------------
+# Batch fraud checks (columnar, see columnar.py)
+# ------------------------------------------------------------
+# Request schema fields each agent scores on, in the agent's column order
+AGENT1_COLUMNS = ["step", "type", "amount", "nameOrig", "oldbalanceOrg", "newbalanceOrig", "nameDest",
+                  "oldbalanceDest", "newbalanceDest", "isFraud", "isFlaggedFraud"]
+AGENT2_COLUMNS = ["event_timestamp", "event_id", "entity_type", "entity_id", "card_bin", "customer_name",
+                  "billing_city", "billing_state", "billing_zip", "billing_latitude", "billing_longitude",
+                  "ip_address", "product_category", "order_price", "merchant", "is_fraud"]
+AGENT3_COLUMNS = ["ip_address", "user_agent", "merchant", "product_category", "metadata"]
+
+
+def call_agent_batch(url: str, table, key: str, agent: str) -> np.ndarray:
+    """Send one agent its columns of the batch; returns its scores in row order."""
+    content_type, body = encode_batch(table, AGENT_BATCH_FORMAT)
+    start = time.perf_counter()
+    attributes = {"http.url": url, "agent": agent, "batch.size": table.num_rows, "batch.format": AGENT_BATCH_FORMAT}
+    with start_span(f"call {agent}", attributes=attributes) as span:
+        try:
+            resp = requests.post(url, data=body, timeout=AGENT_TIMEOUT_SECONDS,
+                                 headers={"Content-Type": content_type, **span.headers()})
+            span.set_attribute("http.status_code", resp.status_code)
+            resp.raise_for_status()
+            scores = np.asarray(resp.json()[key], dtype=np.float64)
+            if len(scores) != table.num_rows:
+                raise ValueError(f"expected {table.num_rows} scores, got {len(scores)}")
+            AGENT_CALL_LATENCY.observe(time.perf_counter() - start, agent, "ok")
+            return scores
+        except Exception as e:
+            AGENT_CALL_LATENCY.observe(time.perf_counter() - start, agent, "error")
+            span.set_error(str(e))
+            raise HTTPException(status_code=500, detail=f"Error calling {url}: {e}")
+
+def call_aggregator_batch(scores: np.ndarray) -> Dict[str, Any]:
+    start = time.perf_counter()
+    outcome = "error"
+    with start_span("call aggregator", attributes={"http.url": AGGREGATOR_BATCH_URL, "agent": "aggregator",
+                                                   "batch.size": len(scores)}) as span:
+        try:
+            resp = requests.post(AGGREGATOR_BATCH_URL, json={"scores": scores.tolist()},
+                                 timeout=AGENT_TIMEOUT_SECONDS, headers=span.headers())
+            span.set_attribute("http.status_code", resp.status_code)
+            resp.raise_for_status()
+            outcome = "ok"
+        finally:
+            AGENT_CALL_LATENCY.observe(time.perf_counter() - start, "aggregator", outcome)
+    return resp.json()
+
+
+def fraud_check_table(table):
+    """Score every row of a FraudInput table: each agent gets its own columns, then one aggregator call."""
+    a1_scores = call_agent_batch(AGENT1_BATCH_URL, table.select(AGENT1_COLUMNS), "anomaly_score", "agent1")
+    a2_scores = call_agent_batch(AGENT2_BATCH_URL, table.select(AGENT2_COLUMNS), "pattern_score", "agent2")
+    a3_scores = call_agent_batch(AGENT3_BATCH_URL, table.select(AGENT3_COLUMNS), "fraud_probability", "agent3")
+
+    aggregator_result = call_aggregator_batch(np.column_stack([a1_scores, a2_scores, a3_scores]))
+
+    return {
+        "agent_scores": {"agent1": a1_scores.tolist(), "agent2": a2_scores.tolist(), "agent3": a3_scores.tolist()},
+        "final_risk_score": aggregator_result.get("final_score"),
+        "explanation": aggregator_result.get("explanation"),
+    }
+
+@router.post("/fraud-check-batch")
+async def fraud_check_batch(request: Request):
+    """
+    Fraud-check a batch of FraudInput records, sent as JSON {"records": [...]}
+    or an Arrow IPC stream. Scores come back as columns, in row order.
+    """
+    content_type = batch_content_type(request)
+    body = await request.body()
+    try:
+        table = await run_in_threadpool(decode_table, content_type, body, FraudInput)
+    except BatchDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await run_in_threadpool(fraud_check_table, table)
+
+
 @router.get("/status")
 async def orchestrator_status():
     return {"status": "orchestrator active"}
\ No newline at end of file
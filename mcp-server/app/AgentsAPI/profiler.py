@@ -0,0 +1,223 @@
+# app/AgentsAPI/profiler.py
+# ------------------------------------------------------------
+# On-demand sampling profiler for a live worker.
+#
+# A session samples the Python stacks of the worker's threads
+# (sys._current_frames) every PROFILER_INTERVAL_MS from the thread serving
+# the admin request, and returns them in collapsed-stack format
+# ("root;caller;callee count" per line), which flamegraph.pl, speedscope
+# and inferno read directly. Frames are labelled "function (module)".
+#
+#     for N seconds      every busy thread (not idle in a wait / select)
+#     for one route      stacks inside the route's handler, plus the event
+#                        loop while one of its requests is in flight
+#                        (request parsing, JSON rendering); for N seconds
+#                        or for its next K requests
+#
+# The route's handler is identified by its code object, taken from the
+# first profiled request once the router has matched it. Work a tracked
+# request hands to the inference pool's threads is sampled too (the pool
+# reports it through current_session()).
+#
+# Nothing runs while no session is active: there is no sampler thread and
+# ProfilerMiddleware only reads one attribute per request. One session at
+# a time per worker; with several uvicorn workers the session profiles
+# the worker that served the admin request.
+# ------------------------------------------------------------
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+# Upper bound for any session, including request-count sessions waiting for traffic
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "120"))
+# Deepest stack recorded (innermost frames are kept)
+PROFILER_MAX_DEPTH = 128
+
+# Leaf frames of threads that are waiting rather than working
+IDLE_FRAMES = {
+    ("threading", "wait"),
+    ("threading", "_wait_for_tstate_lock"),
+    ("selectors", "select"),
+}
+
+
+# Session tracking the current request, if any (visible to pool threads)
+_tracked_by = ContextVar("profile_session", default=None)
+
+
+def current_session():
+    return _tracked_by.get()
+
+def _label(frame):
+    return f"{frame.f_code.co_name} ({frame.f_globals.get('__name__', '?')})"
+
+def collapse(frame, depth: int = PROFILER_MAX_DEPTH):
+    """A stack as (root-first labels, code objects on it)."""
+    labels, codes = [], set()
+    while frame is not None and len(labels) < depth:
+        labels.append(_label(frame))
+        codes.add(frame.f_code)
+        frame = frame.f_back
+    labels.reverse()
+    return labels, codes
+
+def is_idle(frame):
+    return (frame.f_globals.get("__name__"), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class ProfileSession:
+    """One profiling run: samples until its duration or request count is reached."""
+
+    def __init__(self, seconds: float = None, route: str = None, requests: int = None,
+                 interval_ms: float = PROFILER_INTERVAL_MS):
+        self.route = route
+        # Code object of the route's handler: marks the stacks serving that route
+        self.endpoint_code = None
+        self.requests = requests
+        self.seconds = min(seconds or PROFILER_MAX_SECONDS, PROFILER_MAX_SECONDS)
+        self.interval = max(interval_ms, 1.0) / 1000
+        self.stacks = Counter()
+        self.samples = 0
+        self.completed_requests = 0
+        self.started_at = None
+        self.elapsed = None
+        self._in_flight = {}
+        self._workers = {}
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    # --------------------------------------------------------
+    # Request tracking (ProfilerMiddleware, route sessions only)
+    # --------------------------------------------------------
+    def tracks(self, path: str):
+        return path == self.route
+
+    def routed(self, scope):
+        """Record the handler of a tracked request once the router has matched it."""
+        if self.endpoint_code is None:
+            endpoint = getattr(scope.get("route"), "endpoint", None)
+            self.endpoint_code = getattr(endpoint, "__code__", None)
+
+    def _enter(self, threads):
+        thread_id = threading.get_ident()
+        with self._lock:
+            threads[thread_id] = threads.get(thread_id, 0) + 1
+
+    def _exit(self, threads):
+        thread_id = threading.get_ident()
+        with self._lock:
+            threads[thread_id] -= 1
+            if not threads[thread_id]:
+                del threads[thread_id]
+
+    def request_started(self):
+        self._enter(self._in_flight)
+
+    def work_started(self):
+        """A pool thread starts work for a tracked request."""
+        self._enter(self._workers)
+
+    def work_finished(self):
+        self._exit(self._workers)
+
+    def request_finished(self):
+        self._exit(self._in_flight)
+        with self._lock:
+            self.completed_requests += 1
+            if self.requests is not None and self.completed_requests >= self.requests:
+                self._done.set()
+
+    # --------------------------------------------------------
+    # Sampling
+    # --------------------------------------------------------
+    def _sample(self, own_id):
+        with self._lock:
+            tracked_threads = set(self._in_flight) | set(self._workers)
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id or is_idle(frame):
+                continue
+            labels, codes = collapse(frame)
+            if self.route is not None and thread_id not in tracked_threads \
+                    and (self.endpoint_code is None or self.endpoint_code not in codes):
+                continue
+            self.stacks[";".join(labels)] += 1
+        self.samples += 1
+
+    def run(self):
+        """Sample on the calling thread until the session ends; returns the collapsed stacks."""
+        own_id = threading.get_ident()
+        self.started_at = time.time()
+        start = time.perf_counter()
+        deadline = start + self.seconds
+        while not self._done.wait(self.interval):
+            self._sample(own_id)
+            if time.perf_counter() >= deadline:
+                break
+        self.elapsed = time.perf_counter() - start
+        return self.collapsed()
+
+    def collapsed(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def summary(self):
+        return {
+            "route": self.route,
+            "requests": self.requests,
+            "completed_requests": self.completed_requests,
+            "samples": self.samples,
+            "stacks": len(self.stacks),
+            "interval_ms": self.interval * 1000,
+            "elapsed_seconds": round(self.elapsed, 3) if self.elapsed is not None else None,
+        }
+
+
+class Profiler:
+    """The worker's profiler: at most one active session."""
+
+    def __init__(self):
+        self.session = None
+        self._lock = threading.Lock()
+
+    def profile(self, session: ProfileSession):
+        """Run a session to completion (blocking). Raises RuntimeError if one is already running."""
+        with self._lock:
+            if self.session is not None:
+                raise RuntimeError("A profiling session is already running")
+            self.session = session
+        try:
+            return session.run()
+        finally:
+            self.session = None
+
+
+PROFILER = Profiler()
+
+
+class ProfilerMiddleware:
+    """Tracks a route session's requests; a single attribute read otherwise."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        session = PROFILER.session
+        if session is None or scope["type"] != "http" or not session.tracks(scope["path"]):
+            return await self.app(scope, receive, send)
+
+        async def receive_routed():
+            # The body is read after routing, before the handler runs
+            session.routed(scope)
+            return await receive()
+
+        session.request_started()
+        token = _tracked_by.set(session)
+        try:
+            await self.app(scope, receive_routed, send)
+        finally:
+            _tracked_by.reset(token)
+            session.routed(scope)
+            session.request_finished()
@@ -0,0 +1,226 @@
+# app/AgentsAPI/shadow.py
+# ------------------------------------------------------------
+# Shadow scoring: compare a candidate model with the active one on live
+# traffic before promoting it.
+#
+# Each agent router owns a ShadowScorer with its own optional ModelSlot on
+# the "shadow/<agent>/" registry prefix (publish a candidate there with
+# publish_artifact; it is hot-reloaded like the active model). With
+# SHADOW_SAMPLE_RATE > 0, that fraction of requests is handed to a
+# background worker after the primary response has been computed:
+#     - the request only pays for a random draw and a non-blocking put
+#       on a bounded queue; when the queue is full, or the inference pool
+#       has a backlog, the sample is dropped (shadow_dropped_total)
+#     - the worker scores the same records with the candidate and records
+#       per-record score deltas and both models' latencies
+#     - one worker thread per agent; it shares the GIL and the BLAS
+#       threads with serving, so the sample rate and queue are capped
+#       (SHADOW_MAX_SAMPLE_RATE, SHADOW_MAX_QUEUE_SIZE)
+# Stats restart whenever the active or candidate model changes, and are
+# served by each router's /shadow endpoint. SHADOW_LOG_PATH additionally
+# appends every comparison as a JSON line.
+#
+# Configuration (env):
+#     SHADOW_SAMPLE_RATE=0          fraction of requests shadow-scored (0 = off, at most 0.1)
+#     SHADOW_QUEUE_SIZE=64          pending shadow jobs before samples are dropped (at most 256)
+#     SHADOW_DECISION_THRESHOLD=0.5 score at which the two models' decisions are compared
+#     SHADOW_LOG_PATH=""            optional JSON-lines log of every comparison
+# ------------------------------------------------------------
+import os
+import json
+import queue
+import random
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from AgentsAPI.inference_pool import INFERENCE_POOL
+from AgentsAPI.metrics import Counter
+from AgentsAPI.model_watcher import ModelSlot
+
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0"))
+SHADOW_QUEUE_SIZE = int(os.getenv("SHADOW_QUEUE_SIZE", "64"))
+SHADOW_DECISION_THRESHOLD = float(os.getenv("SHADOW_DECISION_THRESHOLD", "0.5"))
+SHADOW_LOG_PATH = os.getenv("SHADOW_LOG_PATH", "")
+
+# Recent comparisons kept for percentiles
+SHADOW_WINDOW = 2000
+
+# Upper bounds on shadow work, whatever the configuration asks for
+SHADOW_MAX_SAMPLE_RATE = 0.1
+SHADOW_MAX_QUEUE_SIZE = 256
+
+DROPPED = Counter("shadow_dropped_total", "Shadow samples dropped before scoring.", ["agent", "reason"])
+
+
+class ShadowStats:
+    """Score deltas and latencies for one (active, candidate) model pair."""
+
+    def __init__(self, active_key: str, shadow_key: str):
+        self.active_key = active_key
+        self.shadow_key = shadow_key
+        self.started_at = time.time()
+        self.records = 0
+        self.delta_sum = 0.0
+        self.abs_delta_sum = 0.0
+        self.max_abs_delta = 0.0
+        self.disagreements = 0
+        self.deltas = deque(maxlen=SHADOW_WINDOW)
+        self.active_ms = deque(maxlen=SHADOW_WINDOW)
+        self.shadow_ms = deque(maxlen=SHADOW_WINDOW)
+
+    def add(self, active_scores, shadow_scores, active_seconds: float, shadow_seconds: float):
+        deltas = np.asarray(shadow_scores, dtype=np.float64) - np.asarray(active_scores, dtype=np.float64)
+        self.records += len(deltas)
+        self.delta_sum += float(deltas.sum())
+        self.abs_delta_sum += float(np.abs(deltas).sum())
+        self.max_abs_delta = max(self.max_abs_delta, float(np.abs(deltas).max(initial=0.0)))
+        self.disagreements += int(np.sum(
+            (np.asarray(active_scores) >= SHADOW_DECISION_THRESHOLD)
+            != (np.asarray(shadow_scores) >= SHADOW_DECISION_THRESHOLD)
+        ))
+        self.deltas.extend(deltas.tolist())
+        self.active_ms.append(active_seconds * 1000)
+        self.shadow_ms.append(shadow_seconds * 1000)
+
+    @staticmethod
+    def _percentiles(values):
+        if not values:
+            return None
+        p50, p90, p99 = np.percentile(np.asarray(values), [50, 90, 99])
+        return {"p50": round(float(p50), 3), "p90": round(float(p90), 3), "p99": round(float(p99), 3)}
+
+    def summary(self):
+        n = max(self.records, 1)
+        return {
+            "active_key": self.active_key,
+            "shadow_key": self.shadow_key,
+            "since": self.started_at,
+            "records": self.records,
+            "mean_delta": round(self.delta_sum / n, 6),
+            "mean_abs_delta": round(self.abs_delta_sum / n, 6),
+            "max_abs_delta": round(self.max_abs_delta, 6),
+            "decision_disagreement_rate": round(self.disagreements / n, 6),
+            "delta_percentiles": self._percentiles(self.deltas),
+            "active_latency_ms": self._percentiles(self.active_ms),
+            "shadow_latency_ms": self._percentiles(self.shadow_ms),
+        }
+
+
+class ShadowScorer:
+    """Scores a sample of an agent's requests with its shadow candidate, off the response path."""
+
+    def __init__(self, agent: str, score_batch, score_field: str, warmup=None,
+                 sample_rate: float = SHADOW_SAMPLE_RATE, queue_size: int = SHADOW_QUEUE_SIZE):
+        self.agent = agent
+        self.score_batch = score_batch
+        self.score_field = score_field
+        self.sample_rate = min(max(sample_rate, 0.0), SHADOW_MAX_SAMPLE_RATE)
+        if sample_rate > SHADOW_MAX_SAMPLE_RATE:
+            print(f"[shadow/{agent}] SHADOW_SAMPLE_RATE={sample_rate} capped at {SHADOW_MAX_SAMPLE_RATE}")
+        self.slot = ModelSlot(f"shadow/{agent}/", warmup=warmup, required=False)
+        self.stats = None
+        self.sampled = 0
+        self.dropped = {"queue_full": 0, "pool_busy": 0}
+        self.errors = 0
+        self.last_error = None
+        self._queue = queue.Queue(maxsize=min(max(1, queue_size), SHADOW_MAX_QUEUE_SIZE))
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0
+
+    # --------------------------------------------------------
+    # Request path
+    # --------------------------------------------------------
+    def submit(self, active_key: str, records, active_scores, active_seconds: float):
+        """
+        Queue a sampled request (records or a frame, and the scores and key of
+        the active model snapshot that produced them) for shadow scoring. Never blocks.
+        """
+        if not self.enabled or self.slot.current is None or random.random() >= self.sample_rate:
+            return
+        self.sampled += 1
+        if INFERENCE_POOL.queued:
+            # Requests are waiting for a scoring worker: leave the CPU to them
+            self._drop("pool_busy")
+            return
+        try:
+            self._queue.put_nowait((active_key, records, active_scores, active_seconds))
+        except queue.Full:
+            self._drop("queue_full")
+
+    def _drop(self, reason: str):
+        self.dropped[reason] += 1
+        DROPPED.inc(self.agent, reason)
+
+    # --------------------------------------------------------
+    # Background worker
+    # --------------------------------------------------------
+    def _compare(self, active_key, records, active_scores, active_seconds):
+        shadow = self.slot.current
+        if shadow is None:
+            return
+        start = time.perf_counter()
+        shadow_results = self.score_batch(shadow, records)
+        shadow_seconds = time.perf_counter() - start
+
+        shadow_scores = [r[self.score_field] for r in shadow_results]
+        with self._lock:
+            if self.stats is None or (self.stats.active_key, self.stats.shadow_key) != (active_key, shadow.key):
+                self.stats = ShadowStats(active_key, shadow.key)
+            self.stats.add(active_scores, shadow_scores, active_seconds, shadow_seconds)
+
+        if SHADOW_LOG_PATH:
+            with open(SHADOW_LOG_PATH, "a") as f:
+                f.write(json.dumps({
+                    "agent": self.agent, "time": time.time(),
+                    "active_key": active_key, "shadow_key": shadow.key,
+                    "active_scores": active_scores, "shadow_scores": shadow_scores,
+                    "active_ms": round(active_seconds * 1000, 3), "shadow_ms": round(shadow_seconds * 1000, 3),
+                }) + "\n")
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                self._compare(*job)
+            except Exception as e:
+                # A failing candidate is reported, never raised into serving
+                self.errors += 1
+                self.last_error = str(e)
+
+    def start(self):
+        """Start the shadow worker and the candidate's hot-reload watcher."""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._work, name=f"shadow-{self.agent}", daemon=True)
+        self._thread.start()
+        self.slot.start_watcher()
+
+    def stop(self):
+        self.slot.stop_watcher()
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout=5)
+
+    def status(self):
+        with self._lock:
+            stats = self.stats.summary() if self.stats is not None else None
+        return {
+            "enabled": self.enabled,
+            "sample_rate": self.sample_rate,
+            "candidate": self.slot.status(),
+            "sampled": self.sampled,
+            "dropped": dict(self.dropped),
+            "queued": self._queue.qsize(),
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "comparison": stats,
+        }
@@ -0,0 +1,156 @@
+# app/AgentsAPI/shared_artifacts.py
+# ------------------------------------------------------------
+# Memory-mapped model artifacts shared across uvicorn workers.
+#
+# Each uvicorn worker used to unpickle a private copy of every model.
+# Here a downloaded artifact is rewritten once into a "serving layout"
+# next to it in the content-addressed model cache:
+#
+#     models/<etag>/agent1_<ts>.pkl          as uploaded by training
+#     models/<etag>/agent1_<ts>.pkl.shared   uncompressed joblib, mmap-able
+#
+# and every worker loads the serving file with joblib's mmap_mode="r".
+# Large NumPy arrays are stored uncompressed (joblib aligns them for
+# memmapping), so the workers map the same file pages read-only and
+# share the physical memory through the OS page cache.
+#
+# Only array payloads are shared; Python objects are still unpickled
+# into every worker. Per agent:
+#   agent1  RandomForestClassifier -> FlatForest: the same forest as flat
+#           node arrays plus a vectorized predict_proba (sklearn trees
+#           copy their node arrays into private buffers on unpickle).
+#           Shared.
+#   agent3  the TF-IDF vectorizer's vocabulary_ dict -> ArrayVocabulary
+#           (sorted term / column arrays) and its idf_ array are shared;
+#           stop_words_ (introspection only) is dropped. The
+#           LogisticRegression coefficients are arrays and shared too.
+#   agent2  only the arrays inside the bundle (KMeans centers, scaler
+#           statistics) are shared. The Prophet model and the fitted
+#           OneHotEncoder categories are Python / object-dtype data and
+#           remain a private copy per worker.
+# ------------------------------------------------------------
+import os
+from collections.abc import Mapping
+
+import joblib
+import numpy as np
+
+# joblib mmap mode for serving artifacts ("" loads private copies instead)
+MODEL_MMAP_MODE = os.getenv("MODEL_MMAP_MODE", "r") or None
+
+
+class FlatForest:
+    """
+    RandomForestClassifier inference over flat, concatenated node arrays.
+    Mirrors predict_proba / classes_ / feature_names_in_ of the source forest.
+    """
+
+    def __init__(self, forest):
+        trees = [est.tree_ for est in forest.estimators_]
+        counts = np.array([t.node_count for t in trees])
+        offsets = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+        def shifted(children, offset):
+            # Keep -1 (leaf marker) as is, shift real child ids into the flat space
+            return np.where(children == -1, -1, children + offset)
+
+        self.children_left = np.concatenate(
+            [shifted(t.children_left, o) for t, o in zip(trees, offsets)]).astype(np.int64)
+        self.children_right = np.concatenate(
+            [shifted(t.children_right, o) for t, o in zip(trees, offsets)]).astype(np.int64)
+        self.feature = np.concatenate([t.feature for t in trees]).astype(np.int64)
+        self.threshold = np.concatenate([t.threshold for t in trees]).astype(np.float64)
+
+        # Per-node class probabilities (single-output classifier)
+        value = np.concatenate([t.value[:, 0, :] for t in trees]).astype(np.float64)
+        totals = value.sum(axis=1, keepdims=True)
+        self.value = np.divide(value, totals, out=np.zeros_like(value), where=totals > 0)
+
+        self.roots = offsets.astype(np.int64)
+        self.max_depth = int(max(t.max_depth for t in trees))
+        self.classes_ = forest.classes_
+        self.n_features_in_ = forest.n_features_in_
+        if hasattr(forest, "feature_names_in_"):
+            self.feature_names_in_ = forest.feature_names_in_
+
+    def predict_proba(self, X):
+        # sklearn compares float32 features against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+        rows = np.arange(X.shape[0])
+        node = np.repeat(self.roots[:, None], X.shape[0], axis=1)
+        for _ in range(self.max_depth):
+            left = self.children_left[node]
+            internal = left != -1
+            if not internal.any():
+                break
+            go_left = X[rows, self.feature[node]] <= self.threshold[node]
+            node = np.where(internal, np.where(go_left, left, self.children_right[node]), node)
+        return self.value[node].mean(axis=0)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class ArrayVocabulary(Mapping):
+    """
+    A fitted text vectorizer's vocabulary_ (term -> column) as sorted UTF-8
+    term and column arrays, looked up by binary search. Memory-mappable,
+    unlike the dict it replaces.
+    """
+
+    def __init__(self, vocabulary):
+        terms = sorted(term.encode("utf-8") for term in vocabulary)
+        self.terms = np.array(terms, dtype=bytes)
+        self.columns = np.array([vocabulary[term.decode("utf-8")] for term in terms], dtype=np.int64)
+
+    def __getitem__(self, term):
+        key = term.encode("utf-8")
+        i = int(np.searchsorted(self.terms, key))
+        if i < len(self.terms) and self.terms[i] == key:
+            return int(self.columns[i])
+        raise KeyError(term)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __iter__(self):
+        return (term.decode("utf-8") for term in self.terms)
+
+
+def to_serving_layout(model):
+    """Convert a trained artifact into its mmap-friendly serving form."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.feature_extraction.text import CountVectorizer
+
+    if isinstance(model, RandomForestClassifier):
+        return FlatForest(model)
+    if isinstance(model, CountVectorizer) and isinstance(getattr(model, "vocabulary_", None), dict):
+        model.vocabulary_ = ArrayVocabulary(model.vocabulary_)
+        if hasattr(model, "stop_words_"):
+            del model.stop_words_
+        return model
+    if isinstance(model, dict):
+        # Agent bundles ({"vectorizer": ..., "model": ...}): convert each part
+        return {name: to_serving_layout(part) for name, part in model.items()}
+    return model
+
+
+def shared_path(local_path: str):
+    return f"{local_path}.shared"
+
+
+def load_shared_artifact(local_path: str):
+    """
+    Load an artifact through its shared serving layout, writing that layout
+    on first use. Workers loading the same file share its array pages.
+    """
+    serving_path = shared_path(local_path)
+    if not os.path.exists(serving_path):
+        serving = to_serving_layout(joblib.load(local_path))
+        tmp_path = f"{serving_path}.tmp-{os.getpid()}"
+        # Uncompressed: joblib can only memory-map raw array payloads
+        joblib.dump(serving, tmp_path, compress=0)
+        os.replace(tmp_path, serving_path)
+        del serving
+        print(f"Wrote shared serving layout {serving_path}")
+    return joblib.load(serving_path, mmap_mode=MODEL_MMAP_MODE)
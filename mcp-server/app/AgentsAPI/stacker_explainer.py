@@ -0,0 +1,57 @@
+# app/AgentsAPI/stacker_explainer.py
+# ------------------------------------------------------------
+# SHAP explanations for the learned stacking aggregator.
+#
+# Shared by training (agents/aggregator.py) and serving
+# (aggregator_api.py), which caches the explainer on the loaded stacker
+# snapshot. Both stacker types are explained in probability space,
+# against the bundle's background sample (interventional), so an
+# explanation's base_value plus its contributions equals the
+# final_score it is returned with:
+#     xgboost    TreeSHAP with model_output="probability"
+#     logistic   exact Shapley values of predict_proba (3 inputs: 8
+#                coalitions); LinearExplainer would explain log-odds
+#
+# shap is imported on first use: most requests never need it.
+# ------------------------------------------------------------
+import numpy as np
+
+
+def build_explainer(stacker):
+    """SHAP explainer for a stacker bundle ({"model", "model_type", "background", ...})."""
+    import shap
+
+    model = stacker["model"]
+    background = stacker["background"]
+    if stacker["model_type"] == "xgboost":
+        return shap.TreeExplainer(
+            model,
+            data=background,
+            feature_perturbation="interventional",
+            model_output="probability",
+        )
+    masker = shap.maskers.Independent(background, max_samples=len(background))
+    return shap.explainers.Exact(lambda X: model.predict_proba(X)[:, 1], masker)
+
+
+def explain_rows(explainer, X):
+    """Agent contributions and base value for each row of X (rows of 3 agent scores)."""
+    import shap
+
+    X = np.asarray(X, dtype=np.float64)
+    if isinstance(explainer, shap.explainers.Exact):
+        result = explainer(X, silent=True)
+    else:
+        result = explainer(X)
+    values = np.asarray(result.values).reshape(len(X), 3)
+    base_values = np.broadcast_to(np.asarray(result.base_values, dtype=np.float64).reshape(-1), len(X))
+    return [
+        {
+            "agent_1_contribution": float(row[0]),
+            "agent_2_contribution": float(row[1]),
+            "agent_3_contribution": float(row[2]),
+            "base_value": float(base_value),
+            "output": "probability",
+        }
+        for row, base_value in zip(values, base_values)
+    ]
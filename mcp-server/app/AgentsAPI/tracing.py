@@ -0,0 +1,279 @@
+# app/AgentsAPI/tracing.py
+# ------------------------------------------------------------
+# Request tracing across the orchestrator, agent and aggregator hops.
+#
+# - IDs travel in the W3C Trace Context `traceparent` header
+#   ("00-<trace id>-<parent span id>-<flags>"). TracingMiddleware
+#   continues the caller's trace, or starts one, and records a server
+#   span per request; the trace ID is returned in `X-Trace-Id`.
+# - The orchestrator wraps each agent / aggregator call in a client span
+#   and forwards its `traceparent`, so the agent's server span is a child
+#   of the call that made it and tail latency can be attributed per hop.
+# - Finished spans are exported in OTLP/JSON (the OpenTelemetry wire
+#   format) by a background thread, in batches, off the request path:
+#       TRACING_EXPORT=file   one ExportTraceServiceRequest per line in TRACING_FILE
+#       TRACING_EXPORT=otlp   POST to an OTLP/HTTP collector (TRACING_OTLP_ENDPOINT/v1/traces)
+#   A full export queue drops spans rather than block requests.
+# - New traces are sampled at TRACING_SAMPLE_RATE; incoming traces keep
+#   the caller's sampling decision. Unsampled requests still propagate IDs.
+#
+# Configuration (env):
+#     TRACING_EXPORT=none  TRACING_FILE=traces.jsonl  TRACING_OTLP_ENDPOINT=http://localhost:4318
+#     TRACING_SERVICE_NAME=fraud-detection-api  TRACING_SAMPLE_RATE=1.0
+# ------------------------------------------------------------
+import os
+import json
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+import requests
+
+TRACING_EXPORT = os.getenv("TRACING_EXPORT", "none")
+TRACING_FILE = os.getenv("TRACING_FILE", "traces.jsonl")
+TRACING_OTLP_ENDPOINT = os.getenv("TRACING_OTLP_ENDPOINT", "http://localhost:4318").rstrip("/")
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "fraud-detection-api")
+TRACING_SAMPLE_RATE = float(os.getenv("TRACING_SAMPLE_RATE", "1.0"))
+
+# Export queue and batching
+TRACING_QUEUE_SIZE = 10000
+TRACING_BATCH_SIZE = 512
+TRACING_FLUSH_SECONDS = 1.0
+
+# OTLP span kinds and status codes
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span = ContextVar("current_span", default=None)
+
+
+def _new_id(n_bytes: int):
+    return f"{random.getrandbits(n_bytes * 8):0{n_bytes * 2}x}"
+
+def parse_traceparent(header: str):
+    """(trace_id, parent_span_id, sampled) from a traceparent header, or None if invalid."""
+    parts = (header or "").strip().split("-")
+    if len(parts) < 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        flags = int(parts[3][:2], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1], parts[2], bool(flags & 1)
+
+
+def _attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class Span:
+    """One timed operation; a context manager that ends (and exports) the span on exit."""
+
+    def __init__(self, name: str, kind: int, trace_id: str, parent_id: str = None,
+                 sampled: bool = True, attributes: dict = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_OK
+        self.status_message = None
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self._token = None
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def headers(self):
+        """Headers that make the callee's spans children of this one."""
+        return {"traceparent": self.traceparent()}
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status = STATUS_ERROR
+        self.status_message = message
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        if self.sampled:
+            EXPORTER.submit(self)
+
+    def __enter__(self):
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is not None:
+            self.set_error(f"{exc_type.__name__}: {exc}")
+        _current_span.reset(self._token)
+        self.end()
+
+    def to_otlp(self):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_attribute(k, v) for k, v in self.attributes.items()],
+            "status": {"code": self.status, **({"message": self.status_message} if self.status_message else {})},
+        }
+        if self.parent_id:
+            span["parentSpanId"] = self.parent_id
+        return span
+
+
+class _NoSpan:
+    """Stand-in when tracing is off: no IDs, no headers, no export."""
+
+    def headers(self):
+        return {}
+
+    def set_attribute(self, key, value):
+        pass
+
+    def set_error(self, message):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+NO_SPAN = _NoSpan()
+
+
+def enabled():
+    return TRACING_EXPORT in ("file", "otlp")
+
+def current_span():
+    return _current_span.get()
+
+def start_span(name: str, kind: int = SPAN_KIND_CLIENT, attributes: dict = None):
+    """A child of the current span (or a new trace); use as a context manager."""
+    if not enabled():
+        return NO_SPAN
+    parent = _current_span.get()
+    if parent is None:
+        return Span(name, kind, _new_id(16), None, random.random() < TRACING_SAMPLE_RATE, attributes)
+    return Span(name, kind, parent.trace_id, parent.span_id, parent.sampled, attributes)
+
+
+# ------------------------------------------------------------
+# Export (background thread, OTLP/JSON)
+# ------------------------------------------------------------
+class SpanExporter:
+    def __init__(self, mode: str = TRACING_EXPORT, queue_size: int = TRACING_QUEUE_SIZE):
+        self.mode = mode
+        self.exported = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error = None
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, span):
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._work, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def payload(self, spans):
+        return {"resourceSpans": [{
+            "resource": {"attributes": [
+                _attribute("service.name", TRACING_SERVICE_NAME),
+                _attribute("process.pid", os.getpid()),
+            ]},
+            "scopeSpans": [{"scope": {"name": "AgentsAPI.tracing"}, "spans": [s.to_otlp() for s in spans]}],
+        }]}
+
+    def export(self, spans):
+        payload = self.payload(spans)
+        if self.mode == "file":
+            with open(TRACING_FILE, "a") as f:
+                f.write(json.dumps(payload) + "\n")
+        elif self.mode == "otlp":
+            requests.post(f"{TRACING_OTLP_ENDPOINT}/v1/traces", json=payload, timeout=5).raise_for_status()
+        self.exported += len(spans)
+
+    def _work(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + TRACING_FLUSH_SECONDS
+            while len(batch) < TRACING_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            try:
+                self.export(batch)
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print(f"Span export failed ({len(batch)} spans dropped): {e}")
+
+
+EXPORTER = SpanExporter()
+
+
+# ------------------------------------------------------------
+# ASGI middleware: one server span per request
+# ------------------------------------------------------------
+class TracingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not enabled():
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        incoming = parse_traceparent(headers.get(b"traceparent", b"").decode("latin-1"))
+        if incoming is None:
+            trace_id, parent_id, sampled = _new_id(16), None, random.random() < TRACING_SAMPLE_RATE
+        else:
+            trace_id, parent_id, sampled = incoming
+
+        span = Span(f"{scope['method']} {scope['path']}", SPAN_KIND_SERVER, trace_id, parent_id, sampled,
+                    {"http.method": scope["method"], "http.target": scope["path"]})
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.set_error(f"HTTP {message['status']}")
+                message = {**message, "headers": list(message.get("headers", [])) + [
+                    (b"x-trace-id", trace_id.encode("latin-1"))]}
+            await send(message)
+
+        with span:
+            await self.app(scope, receive, send_with_trace)
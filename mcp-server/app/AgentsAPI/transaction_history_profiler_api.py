@@ -3,30 +3,28 @@
 # Agent 2: Transaction History Profiler (Prophet + KMeans, Full Features)
 # ------------------------------------------------------------
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 import pandas as pd
+import time
 import numpy as np
-import boto3
-import joblib
-import os
+
+from AgentsAPI.columnar import BatchDecodeError, as_frame, batch_content_type, decode_batch
+from AgentsAPI.inference_pool import INFERENCE_POOL, active_model
+from AgentsAPI.metrics import observe_scoring
+from AgentsAPI.model_watcher import ModelSlot
+from AgentsAPI.shadow import ShadowScorer
+from AgentsAPI.warmup import make_warmup
 
 router = APIRouter()
 
 # ------------------------------------------------------------
 # Configuration
 # ------------------------------------------------------------
-REGION = "ca-central-1"
-BUCKET_NAME = os.getenv("MODEL_BUCKET", "dav-fraud-detection-models")
-LOCAL_MODEL_DIR = "models"
 AGENT_PREFIX = "agents/agent2/"
 
-os.makedirs(LOCAL_MODEL_DIR, exist_ok=True)
-
-# ------------------------------------------------------------
-# S3 Client
-# ------------------------------------------------------------
-s3 = boto3.client("s3", region_name=REGION)
+# Cluster distance normalization (evaluate_agent2's threshold * 10)
+CLUSTER_DISTANCE_SCALE = 100.0
 
 # ------------------------------------------------------------
 # Full Data Model
@@ -50,84 +48,182 @@ class TransactionHistory(BaseModel):
     is_fraud: str
 
 # ------------------------------------------------------------
-# Utility Functions
+# Scoring
 # ------------------------------------------------------------
-def get_latest_model_key(agent_prefix: str):
-    """Retrieve the latest model file for a given agent prefix from S3."""
-    response = s3.list_objects_v2(Bucket=BUCKET_NAME, Prefix=agent_prefix)
-    if "Contents" not in response:
-        print(f"No models found for prefix {agent_prefix}")
-        return None
-    latest = sorted(response["Contents"], key=lambda x: x["LastModified"], reverse=True)[0]
-    return latest["Key"]
-
-def download_model(s3_key: str):
-    """Download model from S3 to local directory."""
-    local_path = os.path.join(LOCAL_MODEL_DIR, os.path.basename(s3_key))
-    s3.download_file(BUCKET_NAME, s3_key, local_path)
-    print(f"Downloaded model: s3://{BUCKET_NAME}/{s3_key} → {local_path}")
-    return local_path
-
-def load_latest_model():
-    """Load latest model from S3 at startup."""
-    print("Searching for the latest model in S3...")
-    key = get_latest_model_key(AGENT_PREFIX)
-    if not key:
-        raise RuntimeError(f"No Agent 2 model found in S3")
-
-    local_path = download_model(key)
-    print(f"Loading model from {local_path}")
-    model_bundle = joblib.load(local_path)
-    print("Model loaded successfully.")
-    return model_bundle, key
+def _to_numeric_where_possible(df: pd.DataFrame):
+    # Same as df.apply(pd.to_numeric, errors="ignore"), which newer pandas removed
+    for col in df.columns:
+        try:
+            df[col] = pd.to_numeric(df[col])
+        except (ValueError, TypeError):
+            pass
+    return df
+
+def _cluster_distances(pipeline, df: pd.DataFrame):
+    """Distance of each row to its nearest cluster center, in the fitted preprocessor's feature space."""
+    preprocessor = pipeline.named_steps["preprocessor"]
+    X = preprocessor.transform(df[list(preprocessor.feature_names_in_)].fillna("missing"))
+    return pipeline.named_steps["cluster"].transform(X).min(axis=1)
+
+def batch_scores(active, txs):
+    """Pattern scores (an array) for a batch of transaction history records, or a frame of their columns."""
+    model_bundle = active.model
+    df = as_frame(txs)
+
+    # Bundles published by agents/transactionHistoryProfiler.py (full and incremental runs).
+    # Same cluster term as evaluate_agent2: tanh(distance / (threshold * 10)); the Prophet
+    # forecast deviation is not computed on the request path (one predict() per record).
+    pipeline = model_bundle.get("cluster_pipeline")
+    if pipeline is not None:
+        return np.tanh(_cluster_distances(pipeline, df) / CLUSTER_DISTANCE_SCALE)
+
+    # Drop label column if present
+    df = df.drop(columns=["is_fraud"], errors="ignore")
+
+    # Ensure numeric conversion where possible
+    df = _to_numeric_where_possible(df)
+
+    # Legacy bundles: a KMeans over the scaled numeric columns
+    kmeans = model_bundle.get("kmeans")
+    scaler = model_bundle.get("scaler")
+
+    if scaler is not None:
+        X = scaler.transform(df.select_dtypes(include=[np.number]))
+    else:
+        X = df.select_dtypes(include=[np.number]).to_numpy()
+
+    if kmeans is not None:
+        # Example: high-risk clusters get higher pattern score
+        distances = kmeans.transform(X)
+        pattern_scores = np.exp(-np.min(distances, axis=1))
+    else:
+        pattern_scores = np.full(len(df), 0.5)  # fallback neutral
+    return pattern_scores
+
+def score_batch(active, txs):
+    """Score a batch of transaction history records with a loaded model snapshot."""
+    pattern_scores = batch_scores(active, txs)
+    return [
+        {
+            "agent_id": 2,
+            "model_key": active.key,
+            "model_name": "TransactionHistoryProfiler",
+            "pattern_score": float(score),
+        }
+        for score in pattern_scores
+    ]
+
+def score_transaction(active, tx: TransactionHistory):
+    """Score one transaction history record with a loaded model snapshot."""
+    return score_batch(active, [tx])[0]
+
+# Sample used to warm a freshly loaded model before it is swapped in
+WARMUP_SAMPLE = TransactionHistory(
+    event_timestamp="2025-10-21T12:00:00Z", event_id="evt-123", entity_type="card",
+    entity_id="ent-789", card_bin=543210, customer_name="John Doe", billing_city="Toronto",
+    billing_state="ON", billing_zip="M5H 2N2", billing_latitude=43.6532, billing_longitude=-79.3832,
+    ip_address="192.168.1.10", product_category="Electronics", order_price=899.99,
+    merchant="Amazon", is_fraud="no",
+)
+
+# Realistic values for synthetic records (warm-up, benchmarks)
+WARMUP_CHOICES = {
+    "event_timestamp": ["2025-10-21T12:00:00Z", "2025-10-22T08:30:00Z", "2025-10-23T23:15:00Z"],
+    "entity_type": ["card", "account"],
+    "billing_state": ["ON", "QC", "BC", "AB"],
+    "product_category": ["Electronics", "Gift Cards", "Grocery", "Apparel"],
+    "merchant": ["Amazon", "eBay", "Walmart", "BestBuy"],
+    "is_fraud": ["no", "yes"],
+}
 
 # ------------------------------------------------------------
-# Load Model at Startup
+# Model slot: loaded at app startup, hot-reloaded in the background
 # ------------------------------------------------------------
-model_bundle, model_key = load_latest_model()
+warmup = make_warmup(
+    score_batch, TransactionHistory, WARMUP_SAMPLE, choices=WARMUP_CHOICES,
+)
+slot = ModelSlot(AGENT_PREFIX, warmup=warmup)
+
+# Optional shadow candidate, scored on a sample of requests off the response path
+shadow = ShadowScorer("agent2", score_batch, "pattern_score", warmup=warmup)
 
 # ------------------------------------------------------------
 # Prediction Endpoint
 # ------------------------------------------------------------
+def predict_record(tx: TransactionHistory):
+    """Score one record on the active model; runs on the inference pool. Returns (result, seconds)."""
+    active = active_model(slot)
+    start = time.perf_counter()
+    result = score_transaction(active, tx)
+    return result, time.perf_counter() - start
+
 @router.post("/predict")
-def predict(tx: TransactionHistory):
+async def predict(tx: TransactionHistory):
     """
     Evaluate a transaction history record using Prophet + KMeans.
     Returns a combined anomaly/pattern score.
     """
+    # Scoring runs on the inference pool; a full pool answers 429 with Retry-After
+    if slot.current is None:
+        raise HTTPException(status_code=503, detail="Model is still loading")
     try:
-        df = pd.DataFrame([tx.dict()])
-
-        # Drop label column if present
-        df = df.drop(columns=["is_fraud"], errors="ignore")
-
-        # Ensure numeric conversion where possible
-        df = df.apply(pd.to_numeric, errors="ignore")
-
-        # Load model components
-        prophet_model = model_bundle.get("prophet")
-        kmeans = model_bundle.get("kmeans")
-        scaler = model_bundle.get("scaler")
-
-        if scaler is not None:
-            X = scaler.transform(df.select_dtypes(include=[np.number]))
-        else:
-            X = df.select_dtypes(include=[np.number]).to_numpy()
-
-        if kmeans is not None:
-            cluster_id = kmeans.predict(X)[0]
-            # Example: high-risk clusters get higher pattern score
-            distances = kmeans.transform(X)
-            dist_score = float(np.min(distances))
-            pattern_score = np.exp(-dist_score)
-        else:
-            pattern_score = 0.5  # fallback neutral
-
-        return {
-            "agent_id": 2,
-            "model_key": model_key,
-            "model_name": "TransactionHistoryProfiler",
-            "pattern_score": float(pattern_score),
-        }
+        result, elapsed = await INFERENCE_POOL.run(predict_record, tx)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    observe_scoring("agent2", elapsed, [result["pattern_score"]])
+    # Compared against the snapshot that scored (a hot swap may land in between)
+    shadow.submit(result["model_key"], [tx], [result["pattern_score"]], elapsed)
+    return result
+
+def predict_batch_body(content_type: str, body: bytes):
+    """Decode and score one batch on the active model; runs on the inference pool. Returns (result, frame, seconds)."""
+    df = decode_batch(content_type, body, TransactionHistory)
+    active = active_model(slot)
+    start = time.perf_counter()
+    scores = batch_scores(active, df)
+    elapsed = time.perf_counter() - start
+    result = {
+        "agent_id": 2,
+        "model_key": active.key,
+        "model_name": "TransactionHistoryProfiler",
+        "pattern_score": scores.tolist(),
+    }
+    return result, df, elapsed
+
+@router.post("/predict-batch")
+async def predict_batch(request: Request):
+    """
+    Score a batch of transaction history records: JSON {"records": [...]} or an Arrow IPC
+    stream (see columnar.py). Returns the scores as one column, in order.
+    """
+    content_type = batch_content_type(request)
+    if slot.current is None:
+        raise HTTPException(status_code=503, detail="Model is still loading")
+    body = await request.body()
+    try:
+        result, df, elapsed = await INFERENCE_POOL.run(predict_batch_body, content_type, body)
+    except BatchDecodeError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    observe_scoring("agent2", elapsed, result["pattern_score"])
+    # Compared against the snapshot that scored (a hot swap may land in between)
+    shadow.submit(result["model_key"], df, result["pattern_score"], elapsed)
+    return result
+
+# ------------------------------------------------------------
+# Model Status Endpoint
+# ------------------------------------------------------------
+@router.get("/status")
+def status():
+    """Active model key, load timings and hot-reload state."""
+    return slot.status()
+
+@router.get("/shadow")
+def shadow_status():
+    """Shadow candidate, sampling counters and score / latency comparison with the active model."""
+    return shadow.status()
@@ -0,0 +1,69 @@
+# app/AgentsAPI/warmup.py
+# ------------------------------------------------------------
+# Model warm-up: prime every inference path before traffic.
+#
+# The first requests to a fresh model pay for lazy initialization
+# (sklearn input validation, vectorizer regex compilation, NumPy buffer
+# allocation, ...). A warm-up runs synthetic payloads, generated from
+# the router's request schema, through the agent's real batch scoring
+# path at batch size 1 and WARMUP_BATCH_SIZE before the model is swapped
+# in, so those costs are paid before the worker reports ready.
+# ------------------------------------------------------------
+import os
+import time
+
+import numpy as np
+
+from models.schema_dtypes import field_annotations
+
+# Rows in the large warm-up batch (0 skips it)
+WARMUP_BATCH_SIZE = int(os.getenv("MODEL_WARMUP_BATCH_SIZE", "64"))
+
+# Same sample set on every worker and every reload
+WARMUP_SEED = 0
+
+
+def synthetic_records(schema, n: int, choices=None, seed: int = WARMUP_SEED):
+    """
+    `n` schema instances with randomized values of the declared field types.
+    `choices` maps field names to realistic values to sample from.
+    """
+    choices = choices or {}
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(n):
+        values = {}
+        for name, annotation in field_annotations(schema).items():
+            if name in choices:
+                values[name] = choices[name][rng.integers(len(choices[name]))]
+            elif annotation is int:
+                values[name] = int(rng.integers(0, 1000))
+            elif annotation is float:
+                values[name] = float(np.round(rng.lognormal(5, 1.5), 2))
+            elif annotation is bool:
+                values[name] = bool(rng.integers(0, 2))
+            else:
+                values[name] = f"{name}_{rng.integers(0, 1_000_000)}"
+        records.append(schema(**values))
+    return records
+
+
+def make_warmup(score_batch, schema, sample, choices=None, batch_size: int = WARMUP_BATCH_SIZE):
+    """
+    Warm-up hook for a ModelSlot: scores `sample` alone, then a synthetic
+    batch, through `score_batch(active, records)`. Returns per-stage timings.
+    """
+    batch = synthetic_records(schema, batch_size, choices) if batch_size > 0 else []
+
+    def warmup(candidate):
+        report = {}
+        start = time.perf_counter()
+        score_batch(candidate, [sample])
+        report["batch_1_seconds"] = round(time.perf_counter() - start, 4)
+        if batch:
+            start = time.perf_counter()
+            score_batch(candidate, batch)
+            report[f"batch_{len(batch)}_seconds"] = round(time.perf_counter() - start, 4)
+        return report
+
+    return warmup
@@ -16,26 +16,123 @@
 #     -Transaction History Profiler (Agent 2),
 #     - and Destination Risk Evaluator (Agent 3).
 #     It includes weighted scoring and SHAP-based explanation logic.
+#
+#     Learned stacking (optional):
+#
+#         train_aggregator() fits a small XGBoost (or logistic) stacker on
+#         held-out agent scores. The returned bundle carries a background
+#         summary for the SHAP explainer (AgentsAPI/stacker_explainer.py,
+#         probability space for both stacker types).
+#
+#         aggregate(..., stacker=bundle) scores with the stacker and only
+#         computes SHAP contributions when final_score >= explain_threshold.
+#         Pass the explainer built for the bundle to avoid rebuilding it.
 
 import shap
 import numpy as np
 import xgboost as xgb
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import train_test_split
+
+from models.agent_scores import load_agent_scores
+from AgentsAPI.stacker_explainer import build_explainer, explain_rows
 
 # Default weights for agents 1, 2, and 3
 DEFAULT_WEIGHTS = [0.4, 0.3, 0.3]
 
-def aggregate(scores, weights=DEFAULT_WEIGHTS):
+# Stacker input columns, in agent order
+SCORE_COLUMNS = ["agent1_score", "agent2_score", "agent3_score"]
+
+# Only transactions at or above this score get a SHAP explanation
+DEFAULT_EXPLAIN_THRESHOLD = 0.5
+
+
+# ============================================================
+#  Training Function
+# ============================================================
+def make_stacker(model_type: str = "xgboost"):
+    """Untrained stacker of the given type ("xgboost" or "logistic")."""
+    if model_type == "xgboost":
+        return xgb.XGBClassifier(
+            n_estimators=50, max_depth=3, learning_rate=0.1, eval_metric="logloss", random_state=42
+        )
+    if model_type == "logistic":
+        return LogisticRegression(max_iter=500)
+    raise ValueError(f"Unknown stacker model_type: {model_type}")
+
+def train_aggregator(model_type: str = "xgboost", background_size: int = 100, test_size: float = 0.2):
+    """
+    Fits a stacking aggregator on held-out agent scores.
+    Returns a bundle with the model, a background summary for SHAP and holdout metrics.
+    """
+    df = load_agent_scores(columns=SCORE_COLUMNS + ["is_fraud"])
+    X = df[SCORE_COLUMNS].to_numpy(dtype=np.float64)
+    y = df["is_fraud"].astype(int).values
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=test_size, random_state=42, stratify=y
+    )
+
+    model = make_stacker(model_type)
+    model.fit(X_train, y_train)
+
+    auc = float(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]))
+    print(f"Stacker ({model_type}) holdout AUC: {auc:.4f}")
+
+    # Background summary: a fixed sample of training rows, small enough that
+    # the interventional TreeSHAP cost per explanation stays bounded.
+    background = shap.utils.sample(X_train, min(background_size, len(X_train)), random_state=42)
+
+    return {
+        "model": model,
+        "model_type": model_type,
+        "background": np.asarray(background, dtype=np.float64),
+        "feature_names": SCORE_COLUMNS,
+        "metrics": {"holdout_auc": auc, "n_train": int(len(X_train)), "n_test": int(len(X_test))},
+    }
+
+
+# ============================================================
+#  SHAP Explainer
+# ============================================================
+def explain(stacker, scores, explainer=None):
     """
-    Combines scores from Agent 1, 2, and 3 using weighted ensemble.
-    Returns final risk score and SHAP-style explanation.
+    Computes SHAP contributions of each agent score to the stacker's probability.
+    `explainer` is the one built for this bundle (build_explainer), if cached.
+    """
+    if explainer is None:
+        explainer = build_explainer(stacker)
+    return explain_rows(explainer, [scores])[0]
+
+
+def aggregate(scores, weights=DEFAULT_WEIGHTS, stacker=None, explain_threshold=DEFAULT_EXPLAIN_THRESHOLD,
+              explainer=None):
+    """
+    Combines scores from Agent 1, 2, and 3 using weighted ensemble,
+    or the learned stacker when one is given.
+    Returns final risk score and explanation.
     """
     if len(scores) != 3:
         raise ValueError("Expected 3 scores from agents 1, 2, and 3.")
 
+    if stacker is not None:
+        X = np.asarray([scores], dtype=np.float64)
+        final_score = float(stacker["model"].predict_proba(X)[0][1])
+
+        # SHAP only for risky transactions; the common path is a single predict
+        if final_score >= explain_threshold:
+            explanation = explain(stacker, scores, explainer)
+            explanation["method"] = "shap"
+        else:
+            explanation = {"method": "none"}
+        explanation["final_score"] = final_score
+        return final_score, explanation
+
     # Weighted sum
     final_score = sum(w * s for w, s in zip(weights, scores))
 
-    # SHAP-style explanation (simulated) trigger build 
+    # SHAP-style explanation (simulated) trigger build
     explanation = {
         "agent_1_contribution": weights[0] * scores[0],
         "agent_2_contribution": weights[1] * scores[1],
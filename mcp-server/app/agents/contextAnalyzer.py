@@ -25,39 +25,134 @@
 # ---------------------------------------------------------------------------
 
 from sklearn.ensemble import RandomForestClassifier
+import numpy as np
 import pandas as pd
-from models.device_ip_logs import load_device_ip_logs, DeviceIPLog
+import scipy.sparse as sp
+from models.device_ip_logs import DeviceIPLog, load_device_ip_logs
+from models.dataset_registry import DATASETS
+from models.feature_cache import cached_features
 
-def train_agent1(sample_size: int = 10000):
+# Model inputs and label; only these columns are read from the dataset cache
+FEATURE_COLUMNS = ['step','type','amount','nameOrig','oldbalanceOrg','newbalanceOrig',
+                   'nameDest','oldbalanceDest','newbalanceDest']
+LABEL_COLUMN = 'isFraud'
+
+# Incremental training consumes rows with a step past the stored watermark
+WATERMARK_COLUMN = 'step'
+
+# Random Forest hyperparameters (tuned with search_hyperparameters.py)
+MODEL_PARAMS = {"n_estimators": 100, "random_state": 42}
+
+def make_model(n_jobs: int = None, **params):
+    """Untrained Random Forest with the default parameters, overridden by `params`."""
+    return RandomForestClassifier(**{**MODEL_PARAMS, **params}, n_jobs=n_jobs)
+
+def current_watermark():
+    """Highest step in the dataset; rows past it are new to the next incremental run."""
+    return int(load_device_ip_logs(columns=[WATERMARK_COLUMN])[WATERMARK_COLUMN].max())
+
+def build_features(sample_size: int = 10000):
     """
-    Loads device/IP logs and trains a Random Forest classifier for fraud detection.
-    Returns trained model.
+    One-hot encoded training matrix for Agent 1.
+    Returns {"X": CSR matrix (float32), "y": labels, "columns": feature names}.
     """
-    df = load_device_ip_logs()
+    df = DATASETS.acquire("device_ip_logs", "agent1", columns=FEATURE_COLUMNS + [LABEL_COLUMN])
     
     # Downsample if dataset is larger than sample_size
     if len(df) > sample_size:
         df = df.sample(n=sample_size, random_state=42)
 
     # Features for training
-    features = df[['step','type','amount','nameOrig','oldbalanceOrg','newbalanceOrig',
-                   'nameDest','oldbalanceDest','newbalanceDest']]
+    features = df[FEATURE_COLUMNS]
     
-    # One-hot encode categorical features
-    categorical_cols = features.select_dtypes(include=["object"]).columns
-    features = pd.get_dummies(features, columns=categorical_cols)
+    # One-hot encode categorical features (sparse: account ids have huge cardinality)
+    categorical_cols = features.select_dtypes(include=["object", "category", "string"]).columns
+    features = pd.get_dummies(features, columns=categorical_cols, sparse=True, dtype=np.float32)
+    dummy_cols = [c for c in features.columns if isinstance(features[c].dtype, pd.SparseDtype)]
+    numeric_cols = [c for c in features.columns if c not in dummy_cols]
+    X = sp.hstack(
+        [sp.csr_matrix(features[numeric_cols].to_numpy(np.float32)), features[dummy_cols].sparse.to_coo()],
+        format="csr", dtype=np.float32,
+    )
     
     # Target
-    y = df['isFraud'].values
+    y = df[LABEL_COLUMN].to_numpy()
+
+    # Encoded copies are built; the shared dataset is no longer needed
+    DATASETS.release("device_ip_logs", "agent1")
+    return {"X": X, "y": y, "columns": numeric_cols + dummy_cols}
+
+def train_agent1(sample_size: int = 10000, n_jobs: int = None, **model_params):
+    """
+    Loads device/IP logs and trains a Random Forest classifier for fraud detection.
+    Encoded features come from the feature cache when the data and spec are unchanged.
+    `n_jobs` is the number of cores used to build the trees; `model_params`
+    override the Random Forest defaults.
+    Returns trained model.
+    """
+    features = cached_features("agent1", DATASETS.version("device_ip_logs"), build_features,
+                               sample_size=sample_size)
     
     # Train Random Forest
-    model = RandomForestClassifier(n_estimators=100, random_state=42)
-    model.fit(features, y)
+    model = make_model(n_jobs=n_jobs, **model_params)
+    model.fit(features["X"], features["y"])
     
     # Save column structure for evaluation
-    model.feature_names_in_ = features.columns.tolist()
+    model.feature_names_in_ = list(features["columns"])
     return model
 
+def encode_features(df, columns):
+    """
+    One-hot encode rows onto an existing feature layout (`columns`, as built by
+    build_features). Categories the layout has never seen are dropped.
+    Returns a CSR matrix (float32).
+    """
+    index = {c: i for i, c in enumerate(columns)}
+    rows, cols, values = [], [], []
+    positions = np.arange(len(df))
+    for col in FEATURE_COLUMNS:
+        if col in index:
+            rows.append(positions)
+            cols.append(np.full(len(df), index[col]))
+            values.append(df[col].to_numpy(np.float32))
+        else:
+            col_idx = (col + "_" + df[col].astype(str)).map(index).to_numpy(np.float64)
+            known = ~np.isnan(col_idx)
+            rows.append(positions[known])
+            cols.append(col_idx[known].astype(np.int64))
+            values.append(np.ones(known.sum(), dtype=np.float32))
+    return sp.csr_matrix(
+        (np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+        shape=(len(df), len(columns)), dtype=np.float32,
+    )
+
+def train_incremental(model, watermark, n_estimators: int = 20, n_jobs: int = None):
+    """
+    Grows a trained forest with `n_estimators` new trees fitted on the rows
+    past `watermark` (warm start; existing trees are kept as they are).
+    Returns (model, new watermark, delta rows); None when there are no new
+    rows, or a skip reason (str) when the new rows cannot be learned from yet.
+    """
+    df = load_device_ip_logs(columns=FEATURE_COLUMNS + [LABEL_COLUMN],
+                             newer_than=(WATERMARK_COLUMN, watermark))
+    if df.empty:
+        return None
+    if df[LABEL_COLUMN].nunique() < 2:
+        # New trees must see both classes; keep the watermark so the rows are retried
+        return f"{len(df)} new rows have a single class; waiting for the other class"
+
+    columns = list(model.feature_names_in_)
+    X = encode_features(df, columns)
+
+    model.set_params(warm_start=True, n_estimators=len(model.estimators_) + n_estimators)
+    if n_jobs is not None:
+        # Otherwise the published forest keeps its own n_jobs
+        model.set_params(n_jobs=n_jobs)
+    model.fit(X, df[LABEL_COLUMN].to_numpy())
+    # Fitting on a matrix drops the column names; restore them for evaluation
+    model.feature_names_in_ = columns
+    return model, int(df[WATERMARK_COLUMN].max()), len(df)
+
 def evaluate_agent1(model, tx: DeviceIPLog):
     """
     Evaluates a single transaction using trained Random Forest model.
@@ -12,32 +12,93 @@
 # ---------------------------------------------------------------------------
 
 from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
 import numpy as np
-from models.metadata_text import load_metadata_text, MetadataText
+from models.metadata_text import SOURCE_COLUMNS, build_metadata_text, load_metadata_text, MetadataText
+from models.transaction_history import load_transaction_history, parse_watermark, timestamp_watermark
+from models.dataset_registry import DATASETS
+from models.feature_cache import cached_features
 import joblib
 
-def train_agent3():
+# Logistic Regression hyperparameters (tuned with search_hyperparameters.py)
+MODEL_PARAMS = {"max_iter": 500}
+
+# Online logistic regression continuing a trained model in incremental runs
+# (small constant step so one delta cannot undo the full fit)
+INCREMENTAL_PARAMS = {"loss": "log_loss", "learning_rate": "constant", "eta0": 0.01, "random_state": 42}
+
+# Incremental training consumes rows with an event timestamp past the stored watermark
+WATERMARK_COLUMN = 'event_timestamp'
+
+def make_model(**params):
+    """Untrained Logistic Regression with the default parameters, overridden by `params`."""
+    return LogisticRegression(**{**MODEL_PARAMS, **params})
+
+def current_watermark():
+    """Latest event timestamp in the dataset; rows past it are new to the next incremental run."""
+    return timestamp_watermark(load_transaction_history(columns=[WATERMARK_COLUMN])[WATERMARK_COLUMN])
+
+def build_features(max_features: int = 5000):
     """
-    Loads metadata and trains a Logistic Regression classifier using TF-IDF.
-    Returns trained model pipeline.
+    TF-IDF features for Agent 3.
+    Returns {"X": sparse TF-IDF matrix, "y": labels, "vectorizer": fitted vectorizer}.
     """
     df = load_metadata_text()
     
     # Labels
-    y = df['is_fraud'].map({'yes': 1, 'no': 0}).values
+    y = df['is_fraud'].map({'yes': 1, 'no': 0}).to_numpy()
     
     # TF-IDF vectorizer
-    vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1,2))
+    vectorizer = TfidfVectorizer(max_features=max_features, ngram_range=(1,2))
     X = vectorizer.fit_transform(df['metadata'])
+    return {"X": X, "y": y, "vectorizer": vectorizer}
+
+def train_agent3(max_features: int = 5000, **model_params):
+    """
+    Loads metadata and trains a Logistic Regression classifier using TF-IDF.
+    TF-IDF features come from the feature cache when the data and spec are unchanged.
+    Returns trained model pipeline.
+    """
+    features = cached_features("agent3", DATASETS.version("transaction_history"), build_features,
+                               max_features=max_features)
+    vectorizer = features["vectorizer"]
     
     # Logistic Regression classifier
-    model = LogisticRegression(max_iter=500)
-    model.fit(X, y)
+    model = make_model(**model_params)
+    model.fit(features["X"], features["y"])
     
     # Return a simple dict with vectorizer + model
     return {'vectorizer': vectorizer, 'model': model}
 
+def train_incremental(agent_model, watermark):
+    """
+    Updates a trained classifier with `partial_fit` on the rows past `watermark`,
+    vectorized with the model's fitted TF-IDF vocabulary.
+    A Logistic Regression from a full run is first converted to an SGD
+    classifier starting from its coefficients.
+    Returns (model, new watermark, delta rows), or None when there are no new rows.
+    """
+    df = load_transaction_history(columns=SOURCE_COLUMNS + [WATERMARK_COLUMN],
+                                  newer_than=(WATERMARK_COLUMN, parse_watermark(watermark)))
+    if df.empty:
+        return None
+    new_watermark = timestamp_watermark(df[WATERMARK_COLUMN])
+    df = build_metadata_text(df)
+
+    X = agent_model['vectorizer'].transform(df['metadata'])
+    y = df['is_fraud'].map({'yes': 1, 'no': 0}).to_numpy()
+
+    model = agent_model['model']
+    if not isinstance(model, SGDClassifier):
+        online = SGDClassifier(**INCREMENTAL_PARAMS)
+        # Start from the trained weights instead of zeros
+        online.coef_ = model.coef_.copy()
+        online.intercept_ = model.intercept_.copy()
+        model = online
+
+    model.partial_fit(X, y, classes=np.array([0, 1]))
+    return {**agent_model, 'model': model}, new_watermark, len(df)
+
 def evaluate_agent3(agent_model, tx: MetadataText):
     """
     Evaluates a single transaction using TF-IDF + Logistic Regression.
@@ -10,7 +10,7 @@
 
 from prophet import Prophet
 from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 import pandas as pd
@@ -18,70 +18,130 @@ import numpy as np
 import joblib
 import boto3, tempfile, os
 from io import StringIO
-from models.transaction_history import load_transaction_history, TransactionHistory
-
+from models.transaction_history import TransactionHistory, load_transaction_history, parse_watermark, timestamp_watermark
+from models.dataset_registry import DATASETS
+from models.feature_cache import cached_features
+
+# Clustering features; only these columns are read from the dataset cache
+CATEGORICAL_COLS = [
+    'entity_type', 'customer_name', 'billing_city', 'billing_state',
+    'billing_zip', 'ip_address', 'product_category', 'merchant', 'is_fraud'
+]
+NUMERIC_COLS = [
+    'card_bin', 'billing_latitude', 'billing_longitude', 'order_price'
+]
+TIMESTAMP_COL = 'event_timestamp'
+DATASET_COLUMNS = [TIMESTAMP_COL] + CATEGORICAL_COLS + NUMERIC_COLS
+
+# Incremental training consumes rows with an event timestamp past the stored
+# watermark (compared as UTC instants, stored as a normalized UTC string)
+WATERMARK_COLUMN = TIMESTAMP_COL
+
+# KMeans hyperparameters (tuned with search_hyperparameters.py)
+MODEL_PARAMS = {"n_clusters": 5, "random_state": 42}
+
+def make_model(**params):
+    """Untrained KMeans with the default parameters, overridden by `params`."""
+    return KMeans(**{**MODEL_PARAMS, **params})
+
+def make_preprocessor():
+    """Unfitted clustering preprocessor: scaled numeric columns + one-hot categorical columns."""
+    return ColumnTransformer(
+        transformers=[
+            ('num', StandardScaler(), NUMERIC_COLS),
+            ('cat', OneHotEncoder(handle_unknown='ignore'), CATEGORICAL_COLS)
+        ]
+    )
 
 # ============================================================
 #  Training Function
 # ============================================================
-def train_agent2(n_clusters: int = 5):
+def current_watermark():
+    """Latest event timestamp in the dataset; rows past it are new to the next incremental run."""
+    return timestamp_watermark(load_transaction_history(columns=[WATERMARK_COLUMN])[WATERMARK_COLUMN])
+
+def clean_transactions(df):
+    """Parse timestamps, drop unusable rows and fill missing values (works on a private copy)."""
+    df['event_timestamp'] = pd.to_datetime(df['event_timestamp'], errors='coerce')
+    df = df.dropna(subset=['event_timestamp', 'order_price'])
+    # Categorical columns need the fill value registered as a category first
+    for col in df.select_dtypes(include='category').columns:
+        if 'missing' not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories('missing')
+    return df.fillna('missing')
+
+def build_features():
     """
-    Trains the enhanced Transaction History Profiler using all fields from the dataset.
-    Combines Prophet (temporal forecasting) + KMeans (behavior clustering).
+    Cleaned and encoded training data for Agent 2:
+    the Prophet series (ds, y) and the fitted clustering preprocessor with its output matrix.
     """
     print("Loading transaction history dataset...")
-    df = load_transaction_history()
+    df = DATASETS.acquire("transaction_history", "agent2", columns=DATASET_COLUMNS)
 
     # ---------------------------------
     # Step 1: Clean & preprocess
     # ---------------------------------
+    # The shared dataset is read-only: work on a private copy
     df = df.copy()
-    df['event_timestamp'] = pd.to_datetime(df['event_timestamp'], errors='coerce')
-    df = df.dropna(subset=['event_timestamp', 'order_price'])
-    df = df.fillna('missing')
+    DATASETS.release("transaction_history", "agent2")
+    df = clean_transactions(df)
+
+    # Prophet series
+    ds = pd.to_datetime(df['event_timestamp']).dt.tz_localize(None).to_numpy()
+    y = df['order_price'].to_numpy(np.float64)
 
     # ---------------------------------
-    # Step 2: Train Prophet model
+    # Step 2: Prepare features for KMeans clustering
     # ---------------------------------
-    df_ts = df[['event_timestamp', 'order_price']].rename(columns={'event_timestamp': 'ds', 'order_price': 'y'})
-    df_ts['ds'] = pd.to_datetime(df_ts['ds']).dt.tz_localize(None)
+    categorical_cols = CATEGORICAL_COLS
+    numeric_cols = NUMERIC_COLS
+
+    X = df[categorical_cols + numeric_cols].copy()
+
+    print("Building preprocessing pipeline...")
+    preprocessor = make_preprocessor()
+    X_encoded = preprocessor.fit_transform(X)
+
+    return {
+        "ds": ds,
+        "y": y,
+        "X": X_encoded,
+        "preprocessor": preprocessor,
+        "columns": X.columns.tolist(),
+    }
+
+def train_agent2(n_clusters: int = 5, **model_params):
+    """
+    Trains the enhanced Transaction History Profiler using all fields from the dataset.
+    Combines Prophet (temporal forecasting) + KMeans (behavior clustering).
+    Encoded features come from the feature cache when the data and spec are unchanged.
+    """
+    features = cached_features("agent2", DATASETS.version("transaction_history"), build_features)
+
+    # ---------------------------------
+    # Step 3: Train Prophet model
+    # ---------------------------------
+    df_ts = pd.DataFrame({'ds': np.asarray(features["ds"]), 'y': np.asarray(features["y"])})
 
     print(" Training Prophet model (temporal forecasting)...")
     prophet_model = Prophet()
     prophet_model.fit(df_ts)
 
     # ---------------------------------
-    # Step 3: Prepare features for KMeans clustering
+    # Step 4: Cluster the encoded features
     # ---------------------------------
-    categorical_cols = [
-        'entity_type', 'customer_name', 'billing_city', 'billing_state',
-        'billing_zip', 'ip_address', 'product_category', 'merchant', 'is_fraud'
-    ]
-    numeric_cols = [
-        'card_bin', 'billing_latitude', 'billing_longitude', 'order_price'
-    ]
-
-    X = df[categorical_cols + numeric_cols].copy()
-
-    print("Building preprocessing and clustering pipeline...")
-    preprocessor = ColumnTransformer(
-        transformers=[
-            ('num', StandardScaler(), numeric_cols),
-            ('cat', OneHotEncoder(handle_unknown='ignore'), categorical_cols)
-        ]
-    )
-
-    kmeans = KMeans(n_clusters=n_clusters, random_state=42)
-    pipeline = Pipeline(steps=[('preprocessor', preprocessor), ('cluster', kmeans)])
-    pipeline.fit(X)
+    print("Fitting clustering model...")
+    kmeans = make_model(n_clusters=n_clusters, **model_params)
+    kmeans.fit(features["X"])
+    pipeline = Pipeline(steps=[('preprocessor', features["preprocessor"]), ('cluster', kmeans)])
 
     # ---------------------------------
-    # Step 4: Package trained models
+    # Step 5: Package trained models
     # ---------------------------------
     model_bundle = {
         "prophet": prophet_model,
         "cluster_pipeline": pipeline,
-        "columns": X.columns.tolist()
+        "columns": list(features["columns"])
     }
 
     print("Agent 2 model bundle created successfully.")
@@ -89,6 +149,40 @@ def train_agent2(n_clusters: int = 5):
     return model_bundle
 
 
+def train_incremental(model_bundle, watermark):
+    """
+    Continues the clustering of a trained bundle with mini-batch updates on
+    the rows past `watermark`, using the bundle's fitted preprocessor.
+    A KMeans from a full run is first converted to MiniBatchKMeans, seeded
+    with its centers and cluster sizes so old data keeps its weight.
+    The Prophet model is kept as is (Prophet cannot be updated incrementally).
+    Returns (bundle, new watermark, delta rows), or None when there are no new rows.
+    """
+    df = load_transaction_history(columns=DATASET_COLUMNS, newer_than=(WATERMARK_COLUMN, parse_watermark(watermark)))
+    if df.empty:
+        return None
+    new_watermark = timestamp_watermark(df[WATERMARK_COLUMN])
+    df = clean_transactions(df.copy())
+    if df.empty:
+        return None
+
+    pipeline = model_bundle["cluster_pipeline"]
+    X = pipeline.named_steps['preprocessor'].transform(df[CATEGORICAL_COLS + NUMERIC_COLS])
+
+    cluster = pipeline.named_steps['cluster']
+    if not isinstance(cluster, MiniBatchKMeans):
+        centers = cluster.cluster_centers_
+        sizes = np.bincount(cluster.labels_, minlength=len(centers))
+        cluster = MiniBatchKMeans(n_clusters=len(centers), init=centers, n_init=1,
+                                  random_state=MODEL_PARAMS["random_state"])
+        cluster.partial_fit(centers, sample_weight=np.maximum(sizes, 1).astype(np.float64))
+
+    print(f"Updating clusters with {X.shape[0]} new rows...")
+    cluster.partial_fit(X)
+    pipeline.set_params(cluster=cluster)
+    return model_bundle, new_watermark, len(df)
+
+
 # ============================================================
 # Evaluation Function
 # ============================================================
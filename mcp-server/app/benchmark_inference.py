@@ -0,0 +1,268 @@
+# app/benchmark_inference.py
+# ------------------------------------------------------------
+# Inference microbenchmarks for Agents 1, 2, 3 and the aggregator.
+#
+# - Small models are trained locally on synthetic records generated from
+#   the routers' request schemas (no S3, no datasets), then loaded the
+#   way the API loads them (Agent 1 through the shared serving layout).
+# - Each agent's batch scoring path (router score_batch) and the
+#   aggregator's stacker are timed at every BENCH_BATCH_SIZES size:
+#     throughput        rows per second
+#     latency           p50 / p99 per call (ms)
+#     allocations       peak memory allocated by one call (tracemalloc, KB)
+# - Results are written to BENCH_OUTPUT and compared against the
+#   baseline file: any case whose p50 latency or allocations grew by more
+#   than BENCH_REGRESSION_THRESHOLD (fraction), or whose throughput fell
+#   by more, fails the run (exit status 1).
+# - BENCH_UPDATE_BASELINE=1 stores the current results as the baseline.
+#   Baselines are machine-specific: compare runs on the same hardware.
+#
+# Configuration (env):
+#     BENCH_TARGETS="agent1,agent2,agent3,aggregator"  BENCH_BATCH_SIZES="1,32,512,4096"
+#     BENCH_MIN_CALLS=5  BENCH_MAX_CALLS=1000  BENCH_MIN_SECONDS=1.0
+#     BENCH_BASELINE=benchmarks/baseline.json  BENCH_OUTPUT=benchmarks/latest.json
+#     BENCH_REGRESSION_THRESHOLD=0.2  BENCH_UPDATE_BASELINE=0
+#     BENCH_STACKER_TYPE=xgboost
+# ------------------------------------------------------------
+import os
+import gc
+import json
+import time
+import platform
+import tempfile
+import importlib
+import tracemalloc
+from datetime import datetime, timezone
+
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from AgentsAPI.model_watcher import LoadedModel
+from AgentsAPI.shared_artifacts import load_shared_artifact
+from AgentsAPI.warmup import synthetic_records
+
+# ------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------
+BENCH_TARGETS = [t.strip() for t in os.getenv("BENCH_TARGETS", "agent1,agent2,agent3,aggregator").split(",") if t.strip()]
+BENCH_BATCH_SIZES = [int(b) for b in os.getenv("BENCH_BATCH_SIZES", "1,32,512,4096").split(",") if b.strip()]
+BENCH_MIN_CALLS = int(os.getenv("BENCH_MIN_CALLS", "5"))
+BENCH_MAX_CALLS = int(os.getenv("BENCH_MAX_CALLS", "1000"))
+BENCH_MIN_SECONDS = float(os.getenv("BENCH_MIN_SECONDS", "1.0"))
+BENCH_BASELINE = os.getenv("BENCH_BASELINE", os.path.join("benchmarks", "baseline.json"))
+BENCH_OUTPUT = os.getenv("BENCH_OUTPUT", os.path.join("benchmarks", "latest.json"))
+BENCH_REGRESSION_THRESHOLD = float(os.getenv("BENCH_REGRESSION_THRESHOLD", "0.2"))
+BENCH_UPDATE_BASELINE = os.getenv("BENCH_UPDATE_BASELINE", "0") == "1"
+BENCH_STACKER_TYPE = os.getenv("BENCH_STACKER_TYPE", "xgboost")
+
+# Synthetic training rows for the local models
+TRAIN_ROWS = 2000
+BENCH_SEED = 42
+
+# Router module serving each agent and its request schema
+ROUTERS = {
+    "agent1": ("AgentsAPI.context_analyser_api", "DeviceIPLog"),
+    "agent2": ("AgentsAPI.transaction_history_profiler_api", "TransactionHistory"),
+    "agent3": ("AgentsAPI.fraud_pattern_matcher_api", "MetadataText"),
+}
+
+
+# ------------------------------------------------------------
+# Local models
+# ------------------------------------------------------------
+def _snapshot(model, name: str):
+    """A LoadedModel as the routers receive it from their slot."""
+    return LoadedModel(model, {"key": f"benchmark/{name}", "etag": "local"}, 0.0, 0.0, 0.0)
+
+def _records(router, schema, n: int, seed: int):
+    return synthetic_records(schema, n, getattr(router, "WARMUP_CHOICES", None), seed=seed)
+
+def build_agent1(router, workdir: str):
+    """Small Random Forest on one-hot encoded synthetic logs, loaded via the shared layout."""
+    from agents import contextAnalyzer
+
+    df = pd.DataFrame([r.dict() for r in _records(router, router.DeviceIPLog, TRAIN_ROWS, BENCH_SEED)])
+    y = df.pop("isFraud").to_numpy()
+    X = pd.get_dummies(df.drop(columns=["isFlaggedFraud"]), columns=["type", "nameOrig", "nameDest"])
+    model = contextAnalyzer.make_model(n_estimators=50, max_depth=12).fit(X.to_numpy(np.float32), y)
+    model.feature_names_in_ = list(X.columns)
+
+    path = os.path.join(workdir, "agent1.pkl")
+    joblib.dump(model, path)
+    return load_shared_artifact(path)
+
+def build_agent2(router, workdir: str):
+    """Clustering pipeline in the published bundle layout (the parts score_batch uses; no Prophet)."""
+    from sklearn.pipeline import Pipeline
+    from agents import transactionHistoryProfiler
+
+    df = pd.DataFrame([r.dict() for r in _records(router, router.TransactionHistory, TRAIN_ROWS, BENCH_SEED)])
+    X = df[transactionHistoryProfiler.CATEGORICAL_COLS + transactionHistoryProfiler.NUMERIC_COLS]
+    pipeline = Pipeline(steps=[
+        ("preprocessor", transactionHistoryProfiler.make_preprocessor()),
+        ("cluster", transactionHistoryProfiler.make_model(n_init=1)),
+    ]).fit(X)
+    return {"prophet": None, "cluster_pipeline": pipeline, "columns": list(X.columns)}
+
+def build_agent3(router, workdir: str):
+    """TF-IDF + Logistic Regression on synthetic metadata text."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from agents import fraudPatternMatcher
+
+    texts = [r.metadata for r in _records(router, router.MetadataText, TRAIN_ROWS, BENCH_SEED)]
+    y = np.random.default_rng(BENCH_SEED).integers(0, 2, len(texts))
+    vectorizer = TfidfVectorizer(max_features=5000, ngram_range=(1, 2))
+    model = fraudPatternMatcher.make_model().fit(vectorizer.fit_transform(texts), y)
+    return {"vectorizer": vectorizer, "model": model}
+
+AGENT_BUILDERS = {"agent1": build_agent1, "agent2": build_agent2, "agent3": build_agent3}
+
+
+# ------------------------------------------------------------
+# Cases: (name, batch size) -> callable scoring one batch
+# ------------------------------------------------------------
+def agent_cases(agent: str, workdir: str):
+    module_name, schema_name = ROUTERS[agent]
+    router = importlib.import_module(module_name)
+    schema = getattr(router, schema_name)
+    active = _snapshot(AGENT_BUILDERS[agent](router, workdir), agent)
+    for batch_size in BENCH_BATCH_SIZES:
+        records = _records(router, schema, batch_size, BENCH_SEED + batch_size)
+        yield batch_size, (lambda records=records: router.score_batch(active, records))
+
+def aggregator_cases(workdir: str):
+    """The stacker's predict_proba on batches of agent scores (the /aggregate scoring step)."""
+    from agents import aggregator
+
+    rng = np.random.default_rng(BENCH_SEED)
+    X = rng.random((TRAIN_ROWS, 3))
+    model = aggregator.make_stacker(BENCH_STACKER_TYPE).fit(X, (X.sum(axis=1) > 1.5).astype(int))
+    for batch_size in BENCH_BATCH_SIZES:
+        batch = rng.random((batch_size, 3))
+        yield batch_size, (lambda batch=batch: model.predict_proba(batch))
+
+
+# ------------------------------------------------------------
+# Measurement
+# ------------------------------------------------------------
+def measure(call, batch_size: int):
+    """Latency percentiles, throughput and per-call allocations of `call`."""
+    call()  # warm: lazy initialization is not part of the steady state
+
+    gc.collect()
+    gc.disable()
+    try:
+        timings = []
+        deadline = time.perf_counter() + BENCH_MIN_SECONDS
+        while len(timings) < BENCH_MAX_CALLS and (len(timings) < BENCH_MIN_CALLS or time.perf_counter() < deadline):
+            start = time.perf_counter()
+            call()
+            timings.append(time.perf_counter() - start)
+    finally:
+        gc.enable()
+
+    # Allocations in a separate pass: tracing slows the calls down
+    tracemalloc.start()
+    peaks = []
+    for _ in range(3):
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        call()
+        peaks.append(tracemalloc.get_traced_memory()[1] - baseline)
+    tracemalloc.stop()
+
+    timings_ms = np.asarray(timings) * 1000
+    return {
+        "batch_size": batch_size,
+        "calls": len(timings),
+        "p50_ms": round(float(np.percentile(timings_ms, 50)), 4),
+        "p99_ms": round(float(np.percentile(timings_ms, 99)), 4),
+        "throughput_rows_s": round(batch_size * len(timings) / float(np.sum(timings)), 1),
+        "alloc_kb_per_call": round(float(np.median(peaks)) / 1024, 1),
+    }
+
+def run_benchmarks():
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir:
+        for target in BENCH_TARGETS:
+            print(f"\n[{target}] Building local model...")
+            cases = aggregator_cases(workdir) if target == "aggregator" else agent_cases(target, workdir)
+            for batch_size, call in cases:
+                result = measure(call, batch_size)
+                results[f"{target}/batch_{batch_size}"] = result
+                print(f"[{target}] batch {batch_size:>5}: p50 {result['p50_ms']:>10.3f} ms  "
+                      f"p99 {result['p99_ms']:>10.3f} ms  {result['throughput_rows_s']:>12.1f} rows/s  "
+                      f"{result['alloc_kb_per_call']:>10.1f} KB/call  ({result['calls']} calls)")
+    return results
+
+
+# ------------------------------------------------------------
+# Baseline comparison
+# ------------------------------------------------------------
+def environment():
+    return {
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+
+def compare(results: dict, baseline: dict, threshold: float = BENCH_REGRESSION_THRESHOLD):
+    """Regressions of `results` against `baseline` beyond `threshold` (fraction)."""
+    regressions = []
+    for case, current in results.items():
+        previous = baseline.get("results", {}).get(case)
+        if previous is None:
+            continue
+        checks = [
+            ("p50_ms", current["p50_ms"] > previous["p50_ms"] * (1 + threshold)),
+            ("alloc_kb_per_call", current["alloc_kb_per_call"] > previous["alloc_kb_per_call"] * (1 + threshold)),
+            ("throughput_rows_s", current["throughput_rows_s"] < previous["throughput_rows_s"] * (1 - threshold)),
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append({"case": case, "metric": metric,
+                                    "baseline": previous[metric], "current": current[metric]})
+    return regressions
+
+def _write_json(path: str, payload: dict):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+def main():
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "environment": environment(),
+        "results": run_benchmarks(),
+    }
+    _write_json(BENCH_OUTPUT, report)
+    print(f"\nBenchmark results written to {BENCH_OUTPUT}")
+
+    if BENCH_UPDATE_BASELINE:
+        _write_json(BENCH_BASELINE, report)
+        print(f"Baseline updated: {BENCH_BASELINE}")
+        return
+
+    if not os.path.exists(BENCH_BASELINE):
+        print(f"No baseline at {BENCH_BASELINE}; run with BENCH_UPDATE_BASELINE=1 to create one.")
+        return
+    with open(BENCH_BASELINE) as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != report["environment"]:
+        print(f"Warning: baseline environment differs: {baseline.get('environment')}")
+
+    regressions = compare(report["results"], baseline)
+    if regressions:
+        print(f"\nRegressions beyond {BENCH_REGRESSION_THRESHOLD:.0%}:")
+        for r in regressions:
+            print(f"  {r['case']:<24} {r['metric']:<18} {r['baseline']} → {r['current']}")
+        raise SystemExit(1)
+    print(f"No regressions beyond {BENCH_REGRESSION_THRESHOLD:.0%} against {BENCH_BASELINE}.")
+
+if __name__ == "__main__":
+    main()
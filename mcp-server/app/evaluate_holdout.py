@@ -0,0 +1,336 @@
+# app/evaluate_holdout.py
+# ------------------------------------------------------------
+# Holdout evaluation for Agents 1, 2 and 3.
+#
+# - Loads each agent's latest model exactly as the API serves it (the
+#   router's ModelSlot: registry, shared artifact loader, warm-up).
+# - Streams a held-out split of the agent's dataset from the columnar
+#   cache in chunks, validates rows into the router's request schema and
+#   scores them through the router's batch scoring path
+#   (score_batch, EVAL_BATCH_SIZE records per call).
+# - Metrics are accumulated in fixed-size structures, so memory stays
+#   bounded however many rows are scanned:
+#     ROC AUC            from per-class score histograms (EVAL_SCORE_BINS)
+#     precision / recall exact counts at EVAL_THRESHOLD
+#     calibration        10 reliability bins, expected calibration error, Brier score
+#     throughput         scored rows per second of scoring time
+#     latency            per-call p50/p95/p99 at EVAL_BATCH_SIZE and at batch size 1
+# - The JSON report is written to EVAL_OUTPUT_DIR and uploaded to
+#   s3://<MODEL_BUCKET>/evaluations/ (EVAL_UPLOAD=0 keeps it local).
+#
+# Holdout split (EVAL_SPLIT):
+#     tail       the last EVAL_HOLDOUT_FRACTION of rows in file order
+#     watermark  rows past the model's training watermark (see
+#                train_incremental.py): data the model has never seen
+#
+# Configuration (env):
+#     EVAL_AGENTS="agent1,agent2,agent3"  EVAL_SPLIT=tail  EVAL_HOLDOUT_FRACTION=0.2
+#     EVAL_CHUNK_ROWS=50000  EVAL_BATCH_SIZE=512  EVAL_MAX_ROWS=0 (no limit)
+#     EVAL_THRESHOLD=0.5  EVAL_SCORE_BINS=1000  EVAL_LATENCY_SAMPLES=200
+#     EVAL_OUTPUT_DIR=evaluations  EVAL_UPLOAD=1
+# ------------------------------------------------------------
+import os
+import json
+import time
+import importlib
+import traceback
+from datetime import datetime, timezone
+
+import numpy as np
+from pydantic import ValidationError
+
+from AgentsAPI.model_registry import BUCKET_NAME, get_s3, read_manifest
+from models.schema_dtypes import field_annotations
+from models.transaction_history import parse_watermark
+
+# ------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------
+EVAL_AGENTS = [a.strip() for a in os.getenv("EVAL_AGENTS", "agent1,agent2,agent3").split(",") if a.strip()]
+EVAL_SPLIT = os.getenv("EVAL_SPLIT", "tail")
+EVAL_HOLDOUT_FRACTION = float(os.getenv("EVAL_HOLDOUT_FRACTION", "0.2"))
+EVAL_CHUNK_ROWS = int(os.getenv("EVAL_CHUNK_ROWS", "50000"))
+EVAL_BATCH_SIZE = int(os.getenv("EVAL_BATCH_SIZE", "512"))
+EVAL_MAX_ROWS = int(os.getenv("EVAL_MAX_ROWS", "0"))
+EVAL_THRESHOLD = float(os.getenv("EVAL_THRESHOLD", "0.5"))
+EVAL_SCORE_BINS = int(os.getenv("EVAL_SCORE_BINS", "1000"))
+EVAL_LATENCY_SAMPLES = int(os.getenv("EVAL_LATENCY_SAMPLES", "200"))
+EVAL_OUTPUT_DIR = os.getenv("EVAL_OUTPUT_DIR", "evaluations")
+EVAL_UPLOAD = os.getenv("EVAL_UPLOAD", "1") != "0"
+
+CALIBRATION_BINS = 10
+
+# Per agent: the training module (watermark column), the serving router,
+# its request schema and dataset scanner, the label column (and its
+# positive value) and the score field of the router's responses.
+AGENTS = {
+    "agent1": {
+        "trainer": "agents.contextAnalyzer",
+        "router": "AgentsAPI.context_analyser_api",
+        "schema": ("models.device_ip_logs", "DeviceIPLog"),
+        "scan": ("models.device_ip_logs", "iter_device_ip_logs"),
+        "label": "isFraud",
+        "positive": 1,
+        "score": "anomaly_score",
+    },
+    "agent2": {
+        "trainer": "agents.transactionHistoryProfiler",
+        "router": "AgentsAPI.transaction_history_profiler_api",
+        "schema": ("models.transaction_history", "TransactionHistory"),
+        "scan": ("models.transaction_history", "iter_transaction_history"),
+        "label": "is_fraud",
+        "positive": "yes",
+        "score": "pattern_score",
+    },
+    "agent3": {
+        "trainer": "agents.fraudPatternMatcher",
+        "router": "AgentsAPI.fraud_pattern_matcher_api",
+        "schema": ("models.metadata_text", "MetadataText"),
+        "scan": ("models.transaction_history", "iter_transaction_history"),
+        "label": "is_fraud",
+        "positive": "yes",
+        "score": "fraud_probability",
+    },
+}
+
+
+def _resolve(module_name: str, attribute: str):
+    return getattr(importlib.import_module(module_name), attribute)
+
+def _percentiles(values_ms):
+    if not values_ms:
+        return None
+    p50, p95, p99 = np.percentile(values_ms, [50, 95, 99])
+    return {"p50": round(float(p50), 3), "p95": round(float(p95), 3), "p99": round(float(p99), 3),
+            "calls": len(values_ms)}
+
+
+# ------------------------------------------------------------
+# Streaming metrics
+# ------------------------------------------------------------
+class StreamingMetrics:
+    """Classification and calibration metrics accumulated chunk by chunk in constant memory."""
+
+    def __init__(self, threshold: float = EVAL_THRESHOLD, bins: int = EVAL_SCORE_BINS):
+        self.threshold = threshold
+        self.bins = bins
+        self.positive_hist = np.zeros(bins, dtype=np.int64)
+        self.negative_hist = np.zeros(bins, dtype=np.int64)
+        self.tp = self.fp = self.fn = self.tn = 0
+        self.calibration_count = np.zeros(CALIBRATION_BINS, dtype=np.int64)
+        self.calibration_score = np.zeros(CALIBRATION_BINS)
+        self.calibration_positive = np.zeros(CALIBRATION_BINS, dtype=np.int64)
+        self.brier_sum = 0.0
+        self.rows = 0
+
+    def update(self, scores, labels):
+        scores = np.clip(np.asarray(scores, dtype=np.float64), 0.0, 1.0)
+        labels = np.asarray(labels, dtype=bool)
+        score_bins = np.minimum((scores * self.bins).astype(np.int64), self.bins - 1)
+        self.positive_hist += np.bincount(score_bins[labels], minlength=self.bins)
+        self.negative_hist += np.bincount(score_bins[~labels], minlength=self.bins)
+
+        predicted = scores >= self.threshold
+        self.tp += int(np.sum(predicted & labels))
+        self.fp += int(np.sum(predicted & ~labels))
+        self.fn += int(np.sum(~predicted & labels))
+        self.tn += int(np.sum(~predicted & ~labels))
+
+        calibration_bins = np.minimum((scores * CALIBRATION_BINS).astype(np.int64), CALIBRATION_BINS - 1)
+        self.calibration_count += np.bincount(calibration_bins, minlength=CALIBRATION_BINS)
+        self.calibration_score += np.bincount(calibration_bins, weights=scores, minlength=CALIBRATION_BINS)
+        self.calibration_positive += np.bincount(calibration_bins[labels], minlength=CALIBRATION_BINS)
+        self.brier_sum += float(np.sum((scores - labels) ** 2))
+        self.rows += len(scores)
+
+    def roc_auc(self):
+        """AUC from the score histograms (scores sharing a bin count as ties)."""
+        positives, negatives = self.positive_hist.sum(), self.negative_hist.sum()
+        if positives == 0 or negatives == 0:
+            return None
+        negatives_below = np.cumsum(self.negative_hist) - self.negative_hist
+        wins = np.sum(self.positive_hist * (negatives_below + 0.5 * self.negative_hist))
+        return float(wins / (positives * negatives))
+
+    def report(self):
+        precision = self.tp / (self.tp + self.fp) if self.tp + self.fp else None
+        recall = self.tp / (self.tp + self.fn) if self.tp + self.fn else None
+        calibration, ece = [], 0.0
+        for i in range(CALIBRATION_BINS):
+            count = int(self.calibration_count[i])
+            if not count:
+                continue
+            mean_score = self.calibration_score[i] / count
+            fraud_rate = self.calibration_positive[i] / count
+            ece += count / self.rows * abs(mean_score - fraud_rate)
+            calibration.append({
+                "bin": [i / CALIBRATION_BINS, (i + 1) / CALIBRATION_BINS],
+                "rows": count,
+                "mean_score": round(float(mean_score), 5),
+                "fraud_rate": round(float(fraud_rate), 5),
+            })
+        return {
+            "rows": self.rows,
+            "positives": int(self.positive_hist.sum()),
+            "roc_auc": self.roc_auc(),
+            "threshold": self.threshold,
+            "precision": precision,
+            "recall": recall,
+            "confusion": {"tp": self.tp, "fp": self.fp, "fn": self.fn, "tn": self.tn},
+            "brier_score": self.brier_sum / self.rows if self.rows else None,
+            "expected_calibration_error": round(float(ece), 5) if self.rows else None,
+            "calibration": calibration,
+        }
+
+
+# ------------------------------------------------------------
+# Holdout scan
+# ------------------------------------------------------------
+def holdout_chunks(agent: str, spec: dict):
+    """The agent's held-out rows as pandas chunks, and a description of the split."""
+    schema = _resolve(*spec["schema"])
+    scan = _resolve(*spec["scan"])
+    if agent == "agent3":
+        from models.metadata_text import SOURCE_COLUMNS
+        columns = SOURCE_COLUMNS
+    else:
+        columns = list(field_annotations(schema))
+    columns = list(dict.fromkeys(columns + [spec["label"]]))
+
+    if EVAL_SPLIT == "watermark":
+        manifest = read_manifest(f"agents/{agent}/") or {}
+        watermark = manifest.get("watermark")
+        if watermark is None:
+            raise RuntimeError(f"No training watermark in the {agent} manifest; use EVAL_SPLIT=tail")
+        module = importlib.import_module(spec["trainer"])
+        split = {"type": "watermark", "column": module.WATERMARK_COLUMN, "after": watermark}
+        # Same comparison as train_incremental: event timestamps as UTC instants, steps as ints
+        if module.WATERMARK_COLUMN == "event_timestamp":
+            after = parse_watermark(watermark)
+        else:
+            after = int(watermark)
+        chunks = scan(columns=columns, newer_than=(module.WATERMARK_COLUMN, after), batch_rows=EVAL_CHUNK_ROWS)
+    else:
+        split = {"type": "tail", "fraction": EVAL_HOLDOUT_FRACTION}
+        chunks = scan(columns=columns, start_fraction=1.0 - EVAL_HOLDOUT_FRACTION, batch_rows=EVAL_CHUNK_ROWS)
+    return chunks, split
+
+def to_records(agent: str, schema, chunk):
+    """Validate a chunk into request records; returns (records, labels, invalid row count)."""
+    if agent == "agent3":
+        from models.metadata_text import build_metadata_text
+        chunk = build_metadata_text(chunk)
+    records, labels, invalid = [], [], 0
+    label_column = AGENTS[agent]["label"]
+    positive = AGENTS[agent]["positive"]
+    for row in chunk.to_dict("records"):
+        try:
+            records.append(schema(**row))
+        except ValidationError:
+            # Rows the API would reject (missing or malformed fields)
+            invalid += 1
+            continue
+        labels.append(row[label_column] == positive)
+    return records, labels, invalid
+
+
+# ------------------------------------------------------------
+# Evaluation
+# ------------------------------------------------------------
+def evaluate_agent(agent: str):
+    """Stream the holdout split through the agent's serving path; returns its report section."""
+    spec = AGENTS[agent]
+    router = importlib.import_module(spec["router"])
+    schema = _resolve(*spec["schema"])
+
+    # Same load path as the API: registry, artifact loader, warm-up
+    router.slot.load()
+    active = router.slot.current
+    print(f"[{agent}] Evaluating {active.key}")
+
+    chunks, split = holdout_chunks(agent, spec)
+    metrics = StreamingMetrics()
+    batch_latencies_ms, single_latencies_ms = [], []
+    scoring_seconds, invalid_rows = 0.0, 0
+    start = time.perf_counter()
+
+    for chunk in chunks:
+        if EVAL_MAX_ROWS and metrics.rows + len(chunk) > EVAL_MAX_ROWS:
+            chunk = chunk.iloc[:EVAL_MAX_ROWS - metrics.rows]
+        records, labels, invalid = to_records(agent, schema, chunk)
+        invalid_rows += invalid
+
+        # Single-request latency, sampled from the first rows
+        for record in records[:max(0, EVAL_LATENCY_SAMPLES - len(single_latencies_ms))]:
+            t0 = time.perf_counter()
+            router.score_batch(active, [record])
+            single_latencies_ms.append((time.perf_counter() - t0) * 1000)
+
+        scores = np.empty(len(records))
+        for offset in range(0, len(records), EVAL_BATCH_SIZE):
+            batch = records[offset:offset + EVAL_BATCH_SIZE]
+            t0 = time.perf_counter()
+            results = router.score_batch(active, batch)
+            elapsed = time.perf_counter() - t0
+            scoring_seconds += elapsed
+            batch_latencies_ms.append(elapsed * 1000)
+            scores[offset:offset + len(batch)] = [r[spec["score"]] for r in results]
+        metrics.update(scores, labels)
+
+        print(f"[{agent}] {metrics.rows:,} rows scored")
+        if EVAL_MAX_ROWS and metrics.rows >= EVAL_MAX_ROWS:
+            break
+
+    section = {
+        "model_key": active.key,
+        "etag": active.etag,
+        "split": split,
+        "invalid_rows": invalid_rows,
+        **metrics.report(),
+        "batch_size": EVAL_BATCH_SIZE,
+        "throughput_rows_s": round(metrics.rows / scoring_seconds, 1) if scoring_seconds else None,
+        "batch_latency_ms": _percentiles(batch_latencies_ms),
+        "single_row_latency_ms": _percentiles(single_latencies_ms),
+        "seconds": round(time.perf_counter() - start, 2),
+    }
+    print(f"[{agent}] rows={section['rows']:,} auc={section['roc_auc']} precision={section['precision']} "
+          f"recall={section['recall']} ece={section['expected_calibration_error']} "
+          f"throughput={section['throughput_rows_s']} rows/s")
+    return section
+
+
+def upload_report(local_file: str, s3_prefix: str):
+    s3_key = f"{s3_prefix.rstrip('/')}/{os.path.basename(local_file)}"
+    get_s3().upload_file(local_file, BUCKET_NAME, s3_key)
+    print(f"Uploaded evaluation report → s3://{BUCKET_NAME}/{s3_key}")
+
+
+def main(agents=None, s3_prefix: str = "evaluations"):
+    agents = agents or EVAL_AGENTS
+    timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    report = {"generated_at": datetime.now(timezone.utc).isoformat(), "agents": {}}
+    failed = []
+
+    for agent in agents:
+        try:
+            report["agents"][agent] = evaluate_agent(agent)
+        except Exception as e:
+            print(f"[{agent}] Evaluation failed:")
+            traceback.print_exc()
+            report["agents"][agent] = {"error": str(e)}
+            failed.append(agent)
+
+    os.makedirs(EVAL_OUTPUT_DIR, exist_ok=True)
+    local_file = os.path.join(EVAL_OUTPUT_DIR, f"evaluation_results_{timestamp}.json")
+    with open(local_file, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Evaluation report written to {local_file}")
+    if EVAL_UPLOAD:
+        upload_report(local_file, s3_prefix)
+
+    if failed:
+        raise SystemExit(f"Evaluation failed for: {', '.join(failed)}")
+    return report
+
+if __name__ == "__main__":
+    main()
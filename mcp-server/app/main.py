@@ -1,39 +1,146 @@
-# Updated and enhanced main.py that ensures each agent is trained
-# before evaluation. It uses FastAPI’s startup event to train models once
-# when the server launches,
-# and then uses those trained models for scoring incoming transactions.
+# app/main.py
+# ------------------------------------------------------------
+# Fraud scoring service: /score runs the three agents and the aggregator
+# in one process, on prebuilt models.
 #
-# - Trains agents once at startup using FastAPI’s @on_event("startup").
+# - Nothing is trained at startup. Models are resolved through the model
+#   registry into the same hot-reloaded ModelSlots the AgentsAPI routers
+#   use, loaded and warmed in a background thread after the port is
+#   bound; /ready answers 503 until every agent model is loaded.
+# - /score is async and never runs model code on the event loop: the
+#   whole request (three agents, then the aggregator) runs as one call
+#   on the inference pool (AgentsAPI/inference_pool.py: sized thread or
+#   process pool, bounded queue, 429 + Retry-After when full).
+# - Training is separate from serving:
+#       python train_all_agents.py      train and publish every agent once
+#       BACKGROUND_TRAINING_HOURS=24    while serving, retrain in a child
+#                                       process every N hours (0 = off); the
+#                                       published models are hot-swapped in
+#       BACKGROUND_TRAINING_SCRIPT=train_all_agents.py  (or train_incremental.py)
 #
-# - Stores trained models and graph in global variables.
-#
-# - Removes Agent 4 (Fraud Pattern Matcher) since it was deprecated.
-#
-# - Ensures consistent and efficient scoring pipeline.
+# Serve:  uvicorn main:app --host 0.0.0.0 --port 8000
+# ------------------------------------------------------------
+import os
+import sys
+import subprocess
+import threading
+import time
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import JSONResponse
+
+from AgentsAPI import aggregator_api, context_analyser_api, fraud_pattern_matcher_api, transaction_history_profiler_api
+from AgentsAPI.inference_pool import INFERENCE_POOL, active_model
+from AgentsAPI.model_watcher import load_all
+from AgentsAPI.orchestrator_api import FraudInput
+
+# ------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------
+BACKGROUND_TRAINING_HOURS = float(os.getenv("BACKGROUND_TRAINING_HOURS", "0"))
+BACKGROUND_TRAINING_SCRIPT = os.getenv("BACKGROUND_TRAINING_SCRIPT", "train_all_agents.py")
+
+# Agent router, its request schema and the score it returns, in aggregator order
+AGENTS = [
+    ("agent1", context_analyser_api, context_analyser_api.DeviceIPLog, "anomaly_score"),
+    ("agent2", transaction_history_profiler_api, transaction_history_profiler_api.TransactionHistory, "pattern_score"),
+    ("agent3", fraud_pattern_matcher_api, fraud_pattern_matcher_api.MetadataText, "fraud_probability"),
+]
+
+MODEL_SLOTS = [router.slot for _, router, _, _ in AGENTS] + [aggregator_api.slot]
 
+app = FastAPI(title="Fraud Scoring Service")
 
-from fastapi import FastAPI
-from agents import agent1, agent2, agent3, aggregator
-from models.schemas import TransactionInput
+# ------------------------------------------------------------
+# Model loading (background) and optional background training
+# ------------------------------------------------------------
+STARTUP = {"started_at": None, "finished": False, "load_seconds": None}
+TRAINING = {"runs": 0, "last_started_at": None, "last_exit_code": None, "last_seconds": None}
 
-app = FastAPI()
+def load_models_and_watch():
+    STARTUP["started_at"] = time.time()
+    STARTUP["load_seconds"] = round(load_all(MODEL_SLOTS), 3)
+    STARTUP["finished"] = True
+    for slot in MODEL_SLOTS:
+        slot.start_watcher()
 
-# Global models for agents
-agent1_model = None
-agent2_model = None
-agent3_model = None
+def train_periodically(interval_seconds: float):
+    """Run the training script in a child process every interval (CPU-heavy: kept out of this process)."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), BACKGROUND_TRAINING_SCRIPT)
+    while True:
+        time.sleep(interval_seconds)
+        TRAINING["last_started_at"] = time.time()
+        print(f"Background training: running {BACKGROUND_TRAINING_SCRIPT}...")
+        start = time.perf_counter()
+        exit_code = subprocess.call([sys.executable, script], cwd=os.path.dirname(script))
+        TRAINING.update(runs=TRAINING["runs"] + 1, last_exit_code=exit_code,
+                        last_seconds=round(time.perf_counter() - start, 1))
+        print(f"Background training finished with exit code {exit_code} in {TRAINING['last_seconds']}s")
 
 @app.on_event("startup")
-def train_agents():
-    global agent1_model, agent2_model, agent3_model
-    agent1_model = agent1.train_agent1()
-    agent2_model = agent2.train_agent2()
-    agent3_model = agent3.train_agent3()
+def start_model_loading():
+    threading.Thread(target=load_models_and_watch, name="model-startup", daemon=True).start()
+    if BACKGROUND_TRAINING_HOURS > 0:
+        threading.Thread(target=train_periodically, args=(BACKGROUND_TRAINING_HOURS * 3600,),
+                         name="background-training", daemon=True).start()
+
+@app.on_event("shutdown")
+def stop_model_watchers():
+    for slot in MODEL_SLOTS:
+        slot.stop_watcher()
+    INFERENCE_POOL.shutdown()
+
+# ------------------------------------------------------------
+# Scoring
+# ------------------------------------------------------------
+def score(tx: FraudInput):
+    """All three agents on one model snapshot each, then the aggregator (runs on the inference pool)."""
+    payload = tx.dict()
+    scores, model_keys = [], {}
+    for agent, router, schema, score_field in AGENTS:
+        active = active_model(router.slot)
+        # Each schema keeps only its own fields of the combined record
+        result = router.score_transaction(active, schema(**payload))
+        scores.append(result[score_field])
+        model_keys[agent] = active.key
+
+    # Optional stacker (weighted ensemble without it)
+    active_model(aggregator_api.slot)
+    aggregated = aggregator_api.aggregate(aggregator_api.ScoresInput(scores=scores))
+    if aggregated.get("model_key"):
+        model_keys["aggregator"] = aggregated["model_key"]
+    return {
+        "score": aggregated["final_score"],
+        "agent_scores": dict(zip([agent for agent, _, _, _ in AGENTS], scores)),
+        "explanation": aggregated["explanation"],
+        "model_keys": model_keys,
+    }
 
 @app.post("/score")
-async def score_transaction(tx: TransactionInput):
-    s1 = agent1.evaluate_agent1(agent1_model, tx)
-    s2 = agent2.evaluate_agent2(agent2_model, tx)
-    s3 = agent3.evaluate_agent3(agent3_model, tx)
-    final_score, explanation = aggregator.aggregate([s1, s2, s3])
-    return {"score": final_score, "explanation": explanation}
+async def score_transaction(tx: FraudInput):
+    try:
+        return await INFERENCE_POOL.run(score, tx)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# ------------------------------------------------------------
+# Liveness / readiness
+# ------------------------------------------------------------
+@app.get("/")
+def root():
+    return {"message": "Fraud scoring service is running. POST transactions to /score."}
+
+@app.get("/ready")
+def ready():
+    is_ready = STARTUP["finished"] and all(slot.ready for slot in MODEL_SLOTS)
+    body = {
+        "ready": is_ready,
+        "startup_load_seconds": STARTUP["load_seconds"],
+        "models": {slot.agent_prefix: slot.current.key if slot.current else None for slot in MODEL_SLOTS},
+        "background_training": TRAINING if BACKGROUND_TRAINING_HOURS > 0 else None,
+        "inference_pool": INFERENCE_POOL.status(),
+    }
+    return JSONResponse(status_code=200 if is_ready else 503, content=body)
+
@@ -0,0 +1,30 @@
+from pydantic import BaseModel
+import os
+import pyarrow as pa
+from models.dataset_cache import load_csv_cached
+from models.schema_dtypes import arrow_dtypes
+
+# Held-out agent scores used to fit the stacking aggregator
+LOCAL_PATH = "/app/data/agent_scores.csv"
+INPUT_S3_PATH = os.getenv(
+    "AGENT_SCORES_S3_PATH",
+    "s3://dav-fraud-detection-bucket/AggregatorScores/agent_scores_holdout.csv"
+)
+
+
+class AgentScores(BaseModel):
+    agent1_score: float
+    agent2_score: float
+    agent3_score: float
+    is_fraud: int
+
+
+# Compact column types derived from the schema above
+DTYPES = arrow_dtypes(
+    AgentScores,
+    overrides={"is_fraud": pa.int8()},
+)
+
+def load_agent_scores(columns=None):
+    """Load held-out agent scores and fraud labels from local file (preferred) or S3."""
+    return load_csv_cached(LOCAL_PATH, INPUT_S3_PATH, columns=columns, dtypes=DTYPES)
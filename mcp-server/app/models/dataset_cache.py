@@ -0,0 +1,302 @@
+# models/dataset_cache.py
+# ------------------------------------------------------------
+# Columnar on-disk cache for the training datasets.
+#
+# The first read of a CSV converts it to an uncompressed Arrow IPC
+# (Feather v2) file. Later reads memory-map that file and only
+# materialize the requested columns, skipping CSV parsing entirely.
+#
+# Cache entries are keyed by the source identity:
+#   - local files: absolute path + size + mtime
+#   - S3 objects:  bucket/key + size + ETag
+# so a changed source transparently produces a new entry.
+#
+# S3 sources are never decoded into a Python string: small objects
+# stream straight from the response body into the chunked Arrow CSV
+# reader; large objects are fetched with concurrent ranged GETs into
+# a temporary file first. Set S3_ENDPOINT_URL to point at a local S3
+# stand-in (moto server, MinIO, LocalStack).
+#
+# Loaders pass a declared Arrow type map (see models/schema_dtypes.py)
+# so columns are parsed straight into compact types; the type map is
+# part of the cache key. Declared narrow integers are stored at 64 bits
+# and narrowed on read when the data fits them.
+#
+# Each compact load prints its memory next to pandas' default inference:
+# an estimate by default, or a measured plain `pd.read_csv` of the same
+# columns (once per source per process) with DATASET_MEMORY_BASELINE=measure.
+# ------------------------------------------------------------
+import hashlib
+import os
+import tempfile
+from urllib.parse import urlparse
+
+import boto3
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pacsv
+from boto3.s3.transfer import TransferConfig
+
+from models.schema_dtypes import (
+    cast_columns, dtypes_signature, narrow_frame, narrowed_types, pandas_dtypes, parse_dtypes, report_memory,
+)
+
+DATASET_CACHE_DIR = os.getenv("DATASET_CACHE_DIR", "/app/data/cache")
+# "estimate" or "measure" (re-reads the source once with plain pandas)
+DATASET_MEMORY_BASELINE = os.getenv("DATASET_MEMORY_BASELINE", "estimate")
+
+# Streaming / transfer tuning
+CSV_BLOCK_SIZE = int(os.getenv("CSV_BLOCK_SIZE_MB", "16")) * 1024 * 1024
+S3_RANGED_GET_THRESHOLD = int(os.getenv("S3_RANGED_GET_THRESHOLD_MB", "64")) * 1024 * 1024
+S3_RANGED_GET_CHUNKSIZE = int(os.getenv("S3_RANGED_GET_CHUNKSIZE_MB", "16")) * 1024 * 1024
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "8"))
+
+
+# ------------------------------------------------------------
+# S3 client
+# ------------------------------------------------------------
+def get_s3_client():
+    """S3 client, optionally pointed at a local stand-in through S3_ENDPOINT_URL."""
+    return boto3.client("s3", endpoint_url=os.getenv("S3_ENDPOINT_URL") or None)
+
+def transfer_config():
+    """Concurrent ranged-GET settings for large dataset objects."""
+    return TransferConfig(
+        multipart_threshold=S3_RANGED_GET_THRESHOLD,
+        multipart_chunksize=S3_RANGED_GET_CHUNKSIZE,
+        max_concurrency=S3_MAX_CONCURRENCY,
+    )
+
+
+# ------------------------------------------------------------
+# Cache keys
+# ------------------------------------------------------------
+def local_fingerprint(path: str):
+    """Identity of a local file: absolute path, size and mtime."""
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}:{st.st_size}:{st.st_mtime_ns}"
+
+def s3_fingerprint(head: dict, bucket: str, key: str):
+    """Identity of an S3 object from its HEAD response: location, size and ETag."""
+    etag = head["ETag"].strip('"')
+    return f"s3://{bucket}/{key}:{head['ContentLength']}:{etag}"
+
+def source_fingerprint(local_path: str, s3_path: str, dtypes=None, s3=None):
+    """
+    Version of a dataset without reading it: the cache key of its current
+    source (local file preferred, as in load_csv_cached).
+    """
+    signature = dtypes_signature(dtypes or {})
+    if os.path.exists(local_path):
+        return f"{local_fingerprint(local_path)}|{signature}"
+    parsed = urlparse(s3_path)
+    if parsed.scheme == "s3":
+        bucket, key = parsed.netloc, parsed.path.lstrip("/")
+        head = (s3 or get_s3_client()).head_object(Bucket=bucket, Key=key)
+        return f"{s3_fingerprint(head, bucket, key)}|{signature}"
+    # Other URLs have no cheap identity; key on the location only
+    return f"{s3_path}|{signature}"
+
+def cache_path(fingerprint: str, cache_dir: str = None):
+    """Cache file location for a source fingerprint."""
+    cache_dir = cache_dir or DATASET_CACHE_DIR
+    digest = hashlib.sha1(fingerprint.encode("utf-8")).hexdigest()[:20]
+    return os.path.join(cache_dir, f"{digest}.arrow")
+
+
+# ------------------------------------------------------------
+# Read / write
+# ------------------------------------------------------------
+def csv_to_cache(open_source, path: str, dtypes=None):
+    """
+    Convert a CSV to an uncompressed Arrow IPC file, one record batch at a time.
+    `open_source` returns a path or binary file-like object (e.g. an S3 body);
+    it is called again if type inference on the first block turns out wrong.
+    Columns listed in `dtypes` are parsed as the declared Arrow types.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    read_options = pacsv.ReadOptions(block_size=CSV_BLOCK_SIZE)
+    convert_options = pacsv.ConvertOptions(column_types=parse_dtypes(dtypes or {}))
+    try:
+        reader = pacsv.open_csv(open_source(), read_options=read_options, convert_options=convert_options)
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, reader.schema) as writer:
+            for batch in reader:
+                writer.write_batch(batch)
+    except pa.ArrowInvalid as e:
+        # A later block did not fit the types inferred from the first one
+        print(f"Streaming CSV conversion failed ({e}); re-reading with whole-file inference")
+        table = pacsv.read_csv(open_source(), read_options=read_options, convert_options=convert_options)
+        with pa.OSFile(tmp_path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    # Atomic publish: concurrent readers never see a partial file
+    os.replace(tmp_path, path)
+
+def parse_timestamps(values):
+    """ISO-8601 strings (any offset or precision; naive means UTC) as UTC timestamps, NaT if unparseable."""
+    return pd.to_datetime(pd.Series(values), utc=True, format="ISO8601", errors="coerce")
+
+def newer_than_mask(column, value):
+    """
+    column > value, as an Arrow boolean mask. A pd.Timestamp `value`
+    compares a column of ISO-8601 strings as UTC instants, not as text.
+    """
+    if isinstance(value, pd.Timestamp):
+        parsed = parse_timestamps(column.to_pandas())
+        return pa.array((parsed > value).to_numpy())
+    threshold = pa.scalar(value).cast(column.type)
+    return pc.greater(column, threshold)
+
+def read_cache(path: str, columns=None, newer_than=None, dtypes=None):
+    """
+    Memory-map a cached dataset and materialize only the requested columns.
+    `newer_than=(column, value)` keeps only rows where column > value;
+    declared narrow integer `dtypes` are applied where the values fit.
+    """
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        if newer_than is not None:
+            column, value = newer_than
+            # Filter in Arrow: only the delta rows are ever converted to pandas
+            table = table.filter(newer_than_mask(table[column], value))
+        if columns is not None:
+            table = table.select(list(columns))
+        return cast_columns(table, narrowed_types(table, dtypes or {})).to_pandas()
+
+
+# ------------------------------------------------------------
+# Cached loader
+# ------------------------------------------------------------
+def load_csv_cached(local_path: str, s3_path: str, columns=None, dtypes=None, cache_dir: str = None, s3=None,
+                    newer_than=None):
+    """
+    Load a CSV dataset from local file (preferred) or S3 through the columnar cache.
+    Only `columns` are materialized when given; `dtypes` is the declared Arrow type map.
+    `newer_than=(column, value)` loads only rows past a watermark.
+    """
+    df = _load_csv_cached(local_path, s3_path, columns, dtypes, cache_dir, s3, newer_than)
+    if dtypes:
+        measured = None
+        if DATASET_MEMORY_BASELINE == "measure" and newer_than is None:
+            measured = default_load_bytes(local_path, s3_path, columns, s3)
+        report_memory(df, f"Dataset {os.path.basename(local_path)}", measured)
+    return df
+
+def _load_csv_cached(local_path, s3_path, columns, dtypes, cache_dir, s3, newer_than=None):
+    path = ensure_cache(local_path, s3_path, dtypes, cache_dir, s3)
+    if path is not None:
+        return read_cache(path, columns, newer_than, dtypes)
+
+    dtype = pandas_dtypes(parse_dtypes(dtypes or {}))
+    if columns is not None:
+        dtype = {name: t for name, t in dtype.items() if name in columns}
+    usecols = None if columns is None else list(dict.fromkeys(
+        list(columns) + ([newer_than[0]] if newer_than is not None else [])))
+    df = pd.read_csv(s3_path, usecols=usecols, dtype=dtype or None)
+    if newer_than is not None:
+        column, value = newer_than
+        df = df[(parse_timestamps(df[column]) if isinstance(value, pd.Timestamp) else df[column]) > value]
+    df = narrow_frame(df, dtypes or {})
+    return df if columns is None else df[list(columns)]
+
+# Plain pd.read_csv footprint per (source, columns), measured once per process
+_DEFAULT_LOAD_BYTES = {}
+
+def default_load_bytes(local_path: str, s3_path: str, columns=None, s3=None):
+    """Memory of the same columns loaded with a plain `pd.read_csv` (pandas' default type inference)."""
+    usecols = None if columns is None else list(columns)
+    key = (source_fingerprint(local_path, s3_path, s3=s3), tuple(usecols or ()))
+    if key not in _DEFAULT_LOAD_BYTES:
+        source = local_path
+        if not os.path.exists(local_path):
+            parsed = urlparse(s3_path)
+            source = s3_path
+            if parsed.scheme == "s3":
+                source = (s3 or get_s3_client()).get_object(Bucket=parsed.netloc, Key=parsed.path.lstrip("/"))["Body"]
+        df = pd.read_csv(source, usecols=usecols)
+        _DEFAULT_LOAD_BYTES[key] = int(df.memory_usage(deep=True, index=False).sum())
+    return _DEFAULT_LOAD_BYTES[key]
+
+def ensure_cache(local_path: str, s3_path: str, dtypes=None, cache_dir: str = None, s3=None):
+    """
+    Path of the cache file for the current source (local file preferred),
+    converting the CSV on first use. None for sources without a stable
+    identity (plain URLs), which are read directly with pandas.
+    """
+    signature = dtypes_signature(dtypes or {})
+
+    if os.path.exists(local_path):
+        path = cache_path(f"{local_fingerprint(local_path)}|{signature}", cache_dir)
+        if os.path.exists(path):
+            print(f"Loading cached dataset {path} (source {local_path})")
+            return path
+        print(f"Loading local dataset from {local_path}")
+        csv_to_cache(lambda: local_path, path, dtypes)
+        print(f"Cached dataset → {path}")
+        return path
+
+    print("Local dataset not found. Falling back to S3...")
+    parsed = urlparse(s3_path)
+    if parsed.scheme != "s3":
+        return None
+    bucket = parsed.netloc
+    key = parsed.path.lstrip("/")
+    s3 = s3 or get_s3_client()
+    head = s3.head_object(Bucket=bucket, Key=key)
+    path = cache_path(f"{s3_fingerprint(head, bucket, key)}|{signature}", cache_dir)
+    if os.path.exists(path):
+        print(f"Loading cached dataset {path} (source {s3_path})")
+        return path
+
+    if head["ContentLength"] >= S3_RANGED_GET_THRESHOLD:
+        # Large object: concurrent ranged GETs to disk, then convert
+        print(f"Downloading {s3_path} ({head['ContentLength'] / 1e6:.1f} MB) with ranged GETs...")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".csv") as tmp:
+            s3.download_fileobj(bucket, key, tmp, Config=transfer_config())
+            tmp.flush()
+            csv_to_cache(lambda: tmp.name, path, dtypes)
+    else:
+        # Small object: stream the response body straight into the CSV reader
+        csv_to_cache(lambda: s3.get_object(Bucket=bucket, Key=key)["Body"], path, dtypes)
+    print(f"Cached dataset → {path}")
+    return path
+
+
+# ------------------------------------------------------------
+# Chunked scans
+# ------------------------------------------------------------
+def iter_cache(path: str, columns=None, newer_than=None, start_fraction: float = 0.0, batch_rows: int = 50000,
+               dtypes=None):
+    """
+    Yield a cached dataset as pandas chunks of at most `batch_rows` rows.
+    Only the current chunk is materialized; the file stays memory-mapped.
+    `start_fraction` skips the leading share of rows (e.g. 0.8 yields the
+    last 20% in file order); `newer_than` is applied per chunk, `dtypes`
+    as in read_cache.
+    """
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+        # Decided on the whole dataset so every chunk has the same types
+        types = narrowed_types(table, dtypes or {})
+        table = table.slice(int(table.num_rows * start_fraction))
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            if newer_than is not None:
+                column, value = newer_than
+                batch = batch.filter(newer_than_mask(batch.column(column), value))
+            if columns is not None:
+                batch = batch.select(list(columns))
+            if batch.num_rows:
+                yield cast_columns(batch, types).to_pandas()
+
+def scan_csv_cached(local_path: str, s3_path: str, columns=None, dtypes=None, newer_than=None,
+                    start_fraction: float = 0.0, batch_rows: int = 50000, cache_dir: str = None, s3=None):
+    """
+    Stream a CSV dataset through the columnar cache in chunks (bounded memory);
+    see iter_cache for the arguments.
+    """
+    path = ensure_cache(local_path, s3_path, dtypes, cache_dir, s3)
+    if path is None:
+        raise ValueError(f"Chunked scans need a cacheable source (local file or s3:// URL), got {s3_path}")
+    return iter_cache(path, columns, newer_than, start_fraction, batch_rows, dtypes)
@@ -0,0 +1,148 @@
+# models/dataset_registry.py
+# ------------------------------------------------------------
+# Process-wide registry of training datasets.
+#
+# Each source is loaded once, on first use, and shared read-only
+# between the agent trainers of the same process. Trainers declare
+# themselves as consumers; when the last consumer releases a
+# dataset the registry drops its reference so memory can be freed.
+#
+# Usage:
+#     DATASETS.expect("transaction_history", "agent2", columns)   # optional, planning
+#     df = DATASETS.acquire("transaction_history", "agent2", columns)
+#     ...                                                          # never mutate df in place
+#     DATASETS.release("transaction_history", "agent2")
+# ------------------------------------------------------------
+import threading
+import time
+
+import pandas as pd
+
+from models import device_ip_logs, transaction_history
+
+
+class _Entry:
+    def __init__(self, loader, version=None):
+        self.loader = loader
+        self.version = version
+        self.consumers = set()
+        self.columns = set()
+        self.all_columns = False
+        self.frame = None
+        self.frame_has_all_columns = False
+        self.load_seconds = 0.0
+        self.memory_bytes = 0
+        self.loads = 0
+
+
+class DatasetRegistry:
+    """Memoized, lazily loaded datasets shared between trainers."""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, loader, version=None):
+        """
+        Register a loader callable accepting a `columns` keyword, and
+        optionally a callable returning the current version of the source.
+        """
+        with self._lock:
+            self._entries[name] = _Entry(loader, version)
+
+    def _entry(self, name: str):
+        if name not in self._entries:
+            raise KeyError(f"Unknown dataset: {name}")
+        return self._entries[name]
+
+    def version(self, name: str):
+        """Current version of a dataset's source, without loading it."""
+        entry = self._entry(name)
+        if entry.version is None:
+            raise ValueError(f"Dataset {name} has no version function")
+        return entry.version()
+
+    def expect(self, name: str, consumer: str, columns=None):
+        """
+        Declare a future consumer so the dataset stays loaded until it is done,
+        and so the first load already covers the columns it needs.
+        """
+        with self._lock:
+            entry = self._entry(name)
+            entry.consumers.add(consumer)
+            if columns is None:
+                entry.all_columns = True
+            else:
+                entry.columns.update(columns)
+
+    def acquire(self, name: str, consumer: str, columns=None):
+        """
+        Return the shared frame (loading it on first use), restricted to `columns`.
+        The result is shared: callers must copy before modifying it.
+        """
+        with self._lock:
+            self.expect(name, consumer, columns)
+            entry = self._entry(name)
+
+            if entry.frame is None or (entry.all_columns and not entry.frame_has_all_columns):
+                self._load(name, entry, None if entry.all_columns else sorted(entry.columns))
+            elif columns is not None:
+                missing = [c for c in columns if c not in entry.frame.columns]
+                if missing:
+                    extra = self._timed_load(name, entry, missing)
+                    entry.frame = pd.concat([entry.frame, extra], axis=1)
+                    entry.memory_bytes = int(entry.frame.memory_usage(deep=True).sum())
+
+            return entry.frame if columns is None else entry.frame[list(columns)]
+
+    def release(self, name: str, consumer: str):
+        """Drop the consumer; the dataset is freed once no consumer remains."""
+        with self._lock:
+            entry = self._entry(name)
+            entry.consumers.discard(consumer)
+            if not entry.consumers and entry.frame is not None:
+                print(f"Releasing dataset '{name}' ({entry.memory_bytes / 1e6:.1f} MB)")
+                entry.frame = None
+                entry.frame_has_all_columns = False
+                entry.columns = set()
+                entry.all_columns = False
+
+    def _timed_load(self, name: str, entry: _Entry, columns):
+        start = time.perf_counter()
+        frame = entry.loader(columns=columns)
+        elapsed = time.perf_counter() - start
+        entry.load_seconds += elapsed
+        entry.loads += 1
+        print(f"Loaded dataset '{name}' in {elapsed:.2f}s")
+        return frame
+
+    def _load(self, name: str, entry: _Entry, columns):
+        entry.frame = self._timed_load(name, entry, columns)
+        entry.frame_has_all_columns = columns is None
+        entry.memory_bytes = int(entry.frame.memory_usage(deep=True).sum())
+        print(f"Dataset '{name}': {len(entry.frame)} rows, "
+              f"{entry.frame.shape[1]} columns, {entry.memory_bytes / 1e6:.1f} MB")
+
+    def report(self):
+        """Load time and memory footprint of every dataset seen by this process."""
+        with self._lock:
+            return [
+                {
+                    "dataset": name,
+                    "loaded": entry.frame is not None,
+                    "loads": entry.loads,
+                    "load_seconds": round(entry.load_seconds, 3),
+                    "memory_mb": round(entry.memory_bytes / 1e6, 2),
+                    "consumers": sorted(entry.consumers),
+                }
+                for name, entry in self._entries.items()
+            ]
+
+
+# ------------------------------------------------------------
+# Default process-wide registry
+# ------------------------------------------------------------
+DATASETS = DatasetRegistry()
+DATASETS.register("device_ip_logs", device_ip_logs.load_device_ip_logs, device_ip_logs.dataset_version)
+DATASETS.register("transaction_history", transaction_history.load_transaction_history,
+                  transaction_history.dataset_version)
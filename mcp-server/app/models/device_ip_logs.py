@@ -1,9 +1,8 @@
 from pydantic import BaseModel
-import pandas as pd
-import boto3
-from io import StringIO
-from urllib.parse import urlparse
 import os
+import pyarrow as pa
+from models.dataset_cache import load_csv_cached, scan_csv_cached, source_fingerprint
+from models.schema_dtypes import arrow_dtypes
 # Local dataset path
 LOCAL_PATH = "/app/data/device_ip_logs.csv"
 INPUT_S3_PATH = os.getenv(
@@ -24,19 +23,35 @@ class DeviceIPLog(BaseModel):
     isFraud: int
     isFlaggedFraud: int
 
-def load_device_ip_logs():
-    """Load Device/IP logs from local file (preferred) or S3."""
-    if os.path.exists(LOCAL_PATH):
-        print(f"Loading local dataset from {LOCAL_PATH}")
-        return pd.read_csv(LOCAL_PATH)
+# Compact column types derived from the schema above (narrow integers
+# are only applied when the loaded values fit, see schema_dtypes)
+DTYPES = arrow_dtypes(
+    DeviceIPLog,
+    categorical=['type'],
+    overrides={
+        "step": pa.int16(),
+        "isFraud": pa.int8(),
+        "isFlaggedFraud": pa.int8(),
+    },
+)
+
+def load_device_ip_logs(columns=None, newer_than=None):
+    """
+    Load Device/IP logs from local file (preferred) or S3.
+    Reads go through the columnar dataset cache; pass `columns` to
+    materialize only the fields a given agent needs, and `newer_than`
+    (column, value) to load only rows past an incremental-training watermark.
+    """
+    return load_csv_cached(LOCAL_PATH, INPUT_S3_PATH, columns=columns, dtypes=DTYPES, newer_than=newer_than)
+
+def iter_device_ip_logs(columns=None, newer_than=None, start_fraction: float = 0.0, batch_rows: int = 50000):
+    """
+    Stream Device/IP logs in pandas chunks of at most `batch_rows` rows
+    (bounded memory; see dataset_cache.iter_cache for the arguments).
+    """
+    return scan_csv_cached(LOCAL_PATH, INPUT_S3_PATH, columns=columns, dtypes=DTYPES, newer_than=newer_than,
+                           start_fraction=start_fraction, batch_rows=batch_rows)
 
-    print("Local dataset not found. Falling back to S3...")
-    parsed = urlparse(INPUT_S3_PATH)
-    if parsed.scheme == "s3":
-        bucket = parsed.netloc
-        key = parsed.path.lstrip("/")
-        s3 = boto3.client("s3")
-        obj = s3.get_object(Bucket=bucket, Key=key)
-        return pd.read_csv(StringIO(obj["Body"].read().decode("utf-8")))
-    else:
-        return pd.read_csv(INPUT_S3_PATH)
+def dataset_version():
+    """Identity of the current source data (changes when the file or object changes)."""
+    return source_fingerprint(LOCAL_PATH, INPUT_S3_PATH, DTYPES)
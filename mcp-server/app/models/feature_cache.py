@@ -0,0 +1,166 @@
+# models/feature_cache.py
+# ------------------------------------------------------------
+# Persistent cache of preprocessed training features.
+#
+# Agent trainers wrap their feature engineering (one-hot encoding,
+# ColumnTransformer, TF-IDF fit, ...) in a build function and call
+# `cached_features`. The result is stored on disk under a key made of:
+#   - the dataset version(s) (source fingerprints, see dataset_cache)
+#   - the source code of the build function and its same-module helpers,
+#     the module constants it references (column lists) and its parameters
+#   - the pandas / scikit-learn versions
+# so changing the data or the feature spec produces a new entry, while
+# changing only model hyperparameters reuses the stored features.
+#
+# Layout of one entry (<FEATURE_CACHE_DIR>/<name>-<key>/):
+#     <field>.npy                          dense arrays
+#     <field>.data|indices|indptr.npy      CSR sparse matrices
+#     objects.joblib                       fitted transformers, column names, ...
+#     meta.json                            field kinds and shapes
+# Arrays are memory-mapped read-only on later runs, so a cache hit costs
+# almost nothing until the model actually touches the data.
+# ------------------------------------------------------------
+import errno
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import threading
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+import sklearn
+
+from models.dataset_cache import DATASET_CACHE_DIR
+
+FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", os.path.join(DATASET_CACHE_DIR, "features"))
+
+# Set FEATURE_CACHE=0 to always rebuild features
+FEATURE_CACHE_ENABLED = os.getenv("FEATURE_CACHE", "1") != "0"
+
+
+# ------------------------------------------------------------
+# Keys
+# ------------------------------------------------------------
+def _spec_constants(build):
+    """Module-level constants (column lists, ...) referenced by the build function."""
+    return {
+        name: build.__globals__[name]
+        for name in build.__code__.co_names
+        if isinstance(build.__globals__.get(name), (str, int, float, list, tuple, dict))
+    }
+
+def _spec_code(build):
+    """Source of the build function and of the same-module helpers it calls."""
+    sources = [inspect.getsource(build)]
+    for name in build.__code__.co_names:
+        helper = build.__globals__.get(name)
+        if inspect.isfunction(helper) and helper.__module__ == build.__module__ and helper is not build:
+            sources.append(inspect.getsource(helper))
+    return "\n".join(sources)
+
+def feature_key(name: str, dataset_version, build, params: dict):
+    """Hash of dataset version, feature-spec code and parameters."""
+    spec = {
+        "name": name,
+        "dataset_version": dataset_version,
+        "code": _spec_code(build),
+        "constants": _spec_constants(build),
+        "params": params,
+        "pandas": pd.__version__,
+        "sklearn": sklearn.__version__,
+    }
+    payload = json.dumps(spec, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:20]
+
+def entry_path(name: str, key: str, cache_dir: str = None):
+    return os.path.join(cache_dir or FEATURE_CACHE_DIR, f"{name}-{key}")
+
+
+# ------------------------------------------------------------
+# Read / write
+# ------------------------------------------------------------
+def save_features(path: str, features: dict):
+    """
+    Write a feature dict atomically: arrays as .npy, everything else pickled.
+    When another process publishes the same entry first, its copy is kept.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    try:
+        os.makedirs(tmp_path)
+        meta, objects = {}, {}
+        for field, value in features.items():
+            if sp.issparse(value):
+                csr = value.tocsr()
+                for part in ("data", "indices", "indptr"):
+                    np.save(os.path.join(tmp_path, f"{field}.{part}.npy"), getattr(csr, part))
+                meta[field] = {"kind": "csr", "shape": list(csr.shape)}
+            elif isinstance(value, np.ndarray) and value.dtype != object:
+                np.save(os.path.join(tmp_path, f"{field}.npy"), np.ascontiguousarray(value))
+                meta[field] = {"kind": "dense", "shape": list(value.shape)}
+            else:
+                objects[field] = value
+                meta[field] = {"kind": "object"}
+
+        joblib.dump(objects, os.path.join(tmp_path, "objects.joblib"))
+        with open(os.path.join(tmp_path, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        try:
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Renaming onto a non-empty directory fails: another process published it first
+            if e.errno not in (errno.ENOTEMPTY, errno.EEXIST):
+                raise
+    finally:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+def load_features(path: str):
+    """Load a feature dict, memory-mapping every array."""
+    with open(os.path.join(path, "meta.json")) as f:
+        meta = json.load(f)
+    objects = joblib.load(os.path.join(path, "objects.joblib"))
+
+    features = {}
+    for field, info in meta.items():
+        if info["kind"] == "csr":
+            parts = [np.load(os.path.join(path, f"{field}.{part}.npy"), mmap_mode="r")
+                     for part in ("data", "indices", "indptr")]
+            features[field] = sp.csr_matrix(tuple(parts), shape=tuple(info["shape"]), copy=False)
+        elif info["kind"] == "dense":
+            features[field] = np.load(os.path.join(path, f"{field}.npy"), mmap_mode="r")
+        else:
+            features[field] = objects[field]
+    return features
+
+
+# ------------------------------------------------------------
+# Cached build
+# ------------------------------------------------------------
+def cached_features(name: str, dataset_version, build, cache_dir: str = None, **params):
+    """
+    Return `build(**params)`, materialized once per dataset version and
+    feature spec. `build` returns a dict of arrays, sparse matrices and
+    picklable objects (fitted transformers, column names).
+    """
+    if not FEATURE_CACHE_ENABLED:
+        return build(**params)
+
+    key = feature_key(name, dataset_version, build, params)
+    path = entry_path(name, key, cache_dir)
+    if os.path.exists(os.path.join(path, "meta.json")):
+        print(f"Using cached features {path}")
+        return load_features(path)
+
+    start = time.perf_counter()
+    features = build(**params)
+    print(f"Built features for {name} in {time.perf_counter() - start:.2f}s")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    save_features(path, features)
+    print(f"Cached features → {path}")
+    return load_features(path)
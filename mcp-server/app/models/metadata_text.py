@@ -1,8 +1,10 @@
 
 from pydantic import BaseModel
 import pandas as pd
-from models.device_ip_logs import load_device_ip_logs
-from models.transaction_history import load_transaction_history
+from models.dataset_registry import DATASETS
+
+# Transaction history fields needed to build the metadata text
+SOURCE_COLUMNS = ['ip_address', 'user_agent', 'merchant', 'product_category', 'is_fraud']
 
 class MetadataText(BaseModel):
     ip_address: str
@@ -11,16 +13,20 @@ class MetadataText(BaseModel):
     product_category: str
     metadata: str  # Composite field for embedding
 
-def load_metadata_text():
+def load_metadata_text(consumer: str = "agent3"):
     """
-    Loads and merges metadata from device/IP logs and transaction history.
+    Builds metadata text from the transaction history (shared via the dataset registry).
     Returns a DataFrame with enriched metadata for Agent 4.
     """
-    df_device = load_device_ip_logs()
-    df_tx = load_transaction_history()
+    df_tx = DATASETS.acquire("transaction_history", consumer, columns=SOURCE_COLUMNS)
+    df_tx_meta = build_metadata_text(df_tx)
+    DATASETS.release("transaction_history", consumer)
+    return df_tx_meta
 
+def build_metadata_text(df_tx: pd.DataFrame):
+    """Metadata text for transaction history rows (a new DataFrame; the input is not modified)."""
     # Select relevant fields from transaction history
-    df_tx_meta = df_tx[['ip_address', 'user_agent', 'merchant', 'product_category', 'is_fraud']].copy()
+    df_tx_meta = df_tx[SOURCE_COLUMNS].copy()
 
     # Create a composite metadata field for embedding
     df_tx_meta['metadata'] = (
@@ -0,0 +1,152 @@
+# models/schema_dtypes.py
+# ------------------------------------------------------------
+# Compact column types derived from the pydantic data models.
+#
+# The pydantic schemas already declare every column's type. This
+# module turns them into an Arrow type map for the CSV readers:
+#   - str   -> string, or dictionary (pandas categorical) for
+#              low-cardinality, high-repeat columns
+#   - float -> float64: amounts and balances reach 1e7-1e8, where
+#              float32 cannot hold whole units (and balance deltas are
+#              fraud signals)
+#   - int   -> int64, or a smaller integer type declared as an override.
+#              Narrow integers are parsed as int64 and only narrowed when
+#              every loaded value fits (narrowed_types), so a dataset
+#              outside the declared range keeps int64 instead of failing
+#              to parse or overflowing.
+# It also reports frame memory against pandas' default inference.
+# ------------------------------------------------------------
+import sys
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Arrow dictionary type; becomes a pandas categorical on to_pandas()
+CATEGORY = pa.dictionary(pa.int32(), pa.string())
+
+# Arrow type per pydantic field annotation (anything else is read as a string)
+ARROW_TYPES = {
+    int: pa.int64(),
+    float: pa.float64(),
+    str: pa.string(),
+    bool: pa.bool_(),
+}
+
+
+def field_annotations(model):
+    """Field name -> annotation, for pydantic v2 and v1 models."""
+    if hasattr(model, "model_fields"):
+        return {name: field.annotation for name, field in model.model_fields.items()}
+    return {name: field.outer_type_ for name, field in model.__fields__.items()}
+
+
+def arrow_dtypes(model, categorical=(), overrides=None):
+    """
+    Arrow column types for a pydantic model.
+    `categorical` names low-cardinality string columns; `overrides` maps
+    column -> Arrow type for narrower ints or columns outside the model.
+    """
+    dtypes = {}
+    for name, annotation in field_annotations(model).items():
+        dtypes[name] = ARROW_TYPES.get(annotation, pa.string())
+    for name in categorical:
+        dtypes[name] = CATEGORY
+    dtypes.update(overrides or {})
+    return dtypes
+
+
+def _is_narrow_int(t):
+    return pa.types.is_integer(t) and t.bit_width < 64
+
+def _wide(t):
+    if not _is_narrow_int(t):
+        return t
+    return pa.int64() if pa.types.is_signed_integer(t) else pa.uint64()
+
+def parse_dtypes(dtypes):
+    """The type map to parse with: declared narrow integers are read at 64 bits, then checked."""
+    return {name: _wide(t) for name, t in dtypes.items()}
+
+def narrowed_types(table: pa.Table, dtypes):
+    """
+    Declared narrow integer types for the columns of `table` whose values
+    all fit them. Columns that do not fit are reported and left at 64 bits.
+    """
+    types = {}
+    for name, t in dtypes.items():
+        if not _is_narrow_int(t) or name not in table.column_names or table.schema.field(name).type == t:
+            continue
+        bounds = pc.min_max(table[name]).as_py()
+        info = np.iinfo(t.to_pandas_dtype())
+        if bounds["min"] is None or (info.min <= bounds["min"] and bounds["max"] <= info.max):
+            types[name] = t
+        else:
+            print(f"Column {name} has values in [{bounds['min']}, {bounds['max']}], outside {t}; keeping {_wide(t)}")
+    return types
+
+def cast_columns(data, types):
+    """`data` (Arrow table or record batch) with the given columns cast."""
+    if not types:
+        return data
+    schema = pa.schema([pa.field(f.name, types.get(f.name, f.type)) for f in data.schema])
+    return data.cast(schema)
+
+def narrow_frame(df: pd.DataFrame, dtypes):
+    """narrowed_types for a pandas frame: cast the narrow integer columns that fit."""
+    columns = [name for name, t in dtypes.items() if _is_narrow_int(t) and name in df.columns]
+    types = narrowed_types(pa.Table.from_pandas(df[columns], preserve_index=False), dtypes) if columns else {}
+    return df.astype({name: t.to_pandas_dtype() for name, t in types.items()}) if types else df
+
+def pandas_dtypes(dtypes):
+    """The same type map expressed as pandas `read_csv` dtypes."""
+    return {
+        name: "category" if pa.types.is_dictionary(t) else (object if pa.types.is_string(t) else t.to_pandas_dtype())
+        for name, t in dtypes.items()
+    }
+
+
+def dtypes_signature(dtypes):
+    """Stable text form of a type map (part of the dataset cache key)."""
+    return ";".join(f"{name}={t}" for name, t in sorted(dtypes.items()))
+
+
+# ------------------------------------------------------------
+# Memory reporting
+# ------------------------------------------------------------
+def default_inference_bytes(df: pd.DataFrame):
+    """
+    Estimated footprint of `df` had pandas inferred its types:
+    8 bytes per numeric value, and one Python str object per string value.
+    An estimate only; report_memory prefers a measured default load.
+    """
+    total = 0
+    for name in df.columns:
+        col = df[name]
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            sizes = pd.Series([sys.getsizeof(str(c)) for c in col.cat.categories])
+            counts = col.cat.codes.value_counts()
+            counts = counts[counts.index >= 0]
+            total += 8 * len(col) + int((sizes.iloc[counts.index].to_numpy() * counts.to_numpy()).sum())
+        elif pd.api.types.is_numeric_dtype(col.dtype) or pd.api.types.is_bool_dtype(col.dtype):
+            total += 8 * len(col)
+        else:
+            total += int(col.memory_usage(deep=True, index=False))
+    return total
+
+
+def report_memory(df: pd.DataFrame, label: str, measured_default_bytes: int = None):
+    """
+    Print compact vs. default-inference memory for a loaded frame.
+    `measured_default_bytes` is the footprint of the same columns from a
+    plain `pd.read_csv`; without it the default figure is an estimate.
+    """
+    compact = int(df.memory_usage(deep=True, index=False).sum())
+    measured = measured_default_bytes is not None
+    default = measured_default_bytes if measured else default_inference_bytes(df)
+    ratio = default / compact if compact else 1.0
+    kind = "measured default read_csv" if measured else "estimated default inference"
+    print(f"{label}: {compact / 1e6:.1f} MB with declared dtypes "
+          f"({kind}: {default / 1e6:.1f} MB, {ratio:.1f}x smaller)")
+    return {"compact_bytes": compact, "default_bytes": default, "default_measured": measured}
@@ -1,9 +1,9 @@
 from pydantic import BaseModel
-import pandas as pd
-import boto3
-from io import StringIO
-from urllib.parse import urlparse
 import os
+import pandas as pd
+import pyarrow as pa
+from models.dataset_cache import load_csv_cached, parse_timestamps, scan_csv_cached, source_fingerprint
+from models.schema_dtypes import CATEGORY, arrow_dtypes
 
 # Default path or environment override
 LOCAL_PATH = "/app/data/transaction_history.csv"
@@ -31,19 +31,52 @@ class TransactionHistory(BaseModel):
     merchant: str
     is_fraud: str
 
-def load_transaction_history():
-    """Load transaction history from local or S3."""
-    if os.path.exists(LOCAL_PATH):
-        print(f"Loading local dataset from {LOCAL_PATH}")
-        return pd.read_csv(LOCAL_PATH)
-
-    print("Local dataset not found. Falling back to S3...")
-    parsed = urlparse(INPUT_S3_PATH)
-    if parsed.scheme == "s3":
-        bucket = parsed.netloc
-        key = parsed.path.lstrip("/")
-        s3 = boto3.client("s3")
-        obj = s3.get_object(Bucket=bucket, Key=key)
-        return pd.read_csv(StringIO(obj["Body"].read().decode("utf-8")))
-    else:
-        return pd.read_csv(INPUT_S3_PATH)
+# Compact column types derived from the schema above
+DTYPES = arrow_dtypes(
+    TransactionHistory,
+    categorical=[
+        'entity_type', 'billing_city', 'billing_state', 'product_category', 'merchant', 'is_fraud'
+    ],
+    overrides={
+        "card_bin": pa.int32(),
+        # Not part of the model, but used by Agent 3's metadata text
+        "user_agent": CATEGORY,
+    },
+)
+
+def load_transaction_history(columns=None, newer_than=None):
+    """
+    Load transaction history from local or S3.
+    Reads go through the columnar dataset cache; pass `columns` to
+    materialize only the fields a given agent needs, and `newer_than`
+    (column, value) to load only rows past an incremental-training watermark.
+    """
+    return load_csv_cached(LOCAL_PATH, INPUT_S3_PATH, columns=columns, dtypes=DTYPES, newer_than=newer_than)
+
+def iter_transaction_history(columns=None, newer_than=None, start_fraction: float = 0.0, batch_rows: int = 50000):
+    """
+    Stream transaction history in pandas chunks of at most `batch_rows` rows
+    (bounded memory; see dataset_cache.iter_cache for the arguments).
+    """
+    return scan_csv_cached(LOCAL_PATH, INPUT_S3_PATH, columns=columns, dtypes=DTYPES, newer_than=newer_than,
+                           start_fraction=start_fraction, batch_rows=batch_rows)
+
+# ------------------------------------------------------------
+# Event-timestamp watermarks (incremental training)
+#
+# event_timestamp holds ISO-8601 strings whose offsets and precision may
+# differ, so watermarks are compared as instants: stored as normalized
+# UTC strings, loaded with newer_than=(column, parse_watermark(w)).
+# ------------------------------------------------------------
+def timestamp_watermark(values):
+    """Latest of `values` (event timestamps) as a normalized UTC ISO-8601 string, or None."""
+    latest = parse_timestamps(values).max()
+    return None if pd.isna(latest) else latest.isoformat()
+
+def parse_watermark(watermark: str):
+    """A stored watermark (any ISO-8601 form; naive means UTC) as a UTC Timestamp."""
+    return pd.to_datetime(watermark, utc=True)
+
+def dataset_version():
+    """Identity of the current source data (changes when the file or object changes)."""
+    return source_fingerprint(LOCAL_PATH, INPUT_S3_PATH, DTYPES)
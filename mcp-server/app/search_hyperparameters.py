@@ -0,0 +1,250 @@
+# app/search_hyperparameters.py
+# ------------------------------------------------------------
+# Parallel hyperparameter search for Agents 1, 2 and 3.
+#
+# - Candidates come from a grid or a random sample of SEARCH_SPACES.
+# - Each candidate is cross-validated on the cached feature matrices
+#   (models/feature_cache.py): features are built once per feature
+#   configuration and every fold in every worker memory-maps them.
+# - (candidate, fold) jobs run in a process pool across all cores.
+# - Losing configurations stop early (successive halving over folds):
+#   after each fold only the best SEARCH_KEEP_FRACTION of the candidates
+#   go on to the next one.
+# - The leaderboard reports quality metrics and measured inference
+#   latency (single-row p50/p99, batch throughput) per candidate, and is
+#   written to SEARCH_OUTPUT_DIR as JSON.
+#
+# Configuration (env):
+#     SEARCH_AGENTS="agent1,agent2,agent3"  SEARCH_MODE=grid|random
+#     SEARCH_N_ITER=12  SEARCH_FOLDS=3  SEARCH_KEEP_FRACTION=0.5
+#     SEARCH_WORKERS=<cpu count>  SEARCH_OUTPUT_DIR=models/search
+# ------------------------------------------------------------
+import os
+import json
+import math
+import time
+import random
+import itertools
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sklearn.metrics import average_precision_score, roc_auc_score, silhouette_score
+from sklearn.model_selection import KFold, StratifiedKFold
+from threadpoolctl import threadpool_limits
+
+from agents import contextAnalyzer, transactionHistoryProfiler, fraudPatternMatcher
+from models.dataset_registry import DATASETS
+from models.feature_cache import cached_features
+
+# ------------------------------------------------------------
+# Configuration
+# ------------------------------------------------------------
+SEARCH_AGENTS = [a.strip() for a in os.getenv("SEARCH_AGENTS", "agent1,agent2,agent3").split(",") if a.strip()]
+SEARCH_MODE = os.getenv("SEARCH_MODE", "random")
+SEARCH_N_ITER = int(os.getenv("SEARCH_N_ITER", "12"))
+SEARCH_FOLDS = int(os.getenv("SEARCH_FOLDS", "3"))
+SEARCH_KEEP_FRACTION = float(os.getenv("SEARCH_KEEP_FRACTION", "0.5"))
+SEARCH_WORKERS = int(os.getenv("SEARCH_WORKERS", str(os.cpu_count() or 1)))
+SEARCH_OUTPUT_DIR = os.getenv("SEARCH_OUTPUT_DIR", os.path.join("models", "search"))
+SEARCH_SEED = 42
+
+# Single-row calls timed per candidate and fold
+LATENCY_SAMPLES = 50
+
+# Per agent: the module, its dataset, the metric to maximize and the
+# search space ("features" params are part of the feature cache key).
+AGENTS = {
+    "agent1": (contextAnalyzer, "device_ip_logs", "roc_auc"),
+    "agent2": (transactionHistoryProfiler, "transaction_history", "silhouette"),
+    "agent3": (fraudPatternMatcher, "transaction_history", "roc_auc"),
+}
+
+SEARCH_SPACES = {
+    "agent1": {
+        "features": {},
+        "model": {
+            "n_estimators": [50, 100, 200, 400],
+            "max_depth": [None, 10, 20],
+            "min_samples_leaf": [1, 2, 5],
+            "max_features": ["sqrt", 0.3],
+        },
+    },
+    "agent2": {
+        "features": {},
+        "model": {"n_clusters": [3, 5, 8, 12, 16]},
+    },
+    "agent3": {
+        "features": {"max_features": [2000, 5000, 10000]},
+        "model": {"C": [0.1, 1.0, 10.0], "max_iter": [500, 1000]},
+    },
+}
+
+
+# ------------------------------------------------------------
+# Candidates
+# ------------------------------------------------------------
+def candidates(space: dict, mode: str = SEARCH_MODE, n_iter: int = SEARCH_N_ITER, seed: int = SEARCH_SEED):
+    """All grid points, or `n_iter` of them drawn at random without replacement."""
+    names = [("features", k) for k in space["features"]] + [("model", k) for k in space["model"]]
+    values = [space[group][k] for group, k in names]
+    grid = []
+    for combo in itertools.product(*values):
+        candidate = {"features": {}, "model": {}}
+        for (group, k), v in zip(names, combo):
+            candidate[group][k] = v
+        grid.append(candidate)
+    if mode == "random" and n_iter < len(grid):
+        grid = random.Random(seed).sample(grid, n_iter)
+    return grid
+
+
+# ------------------------------------------------------------
+# Worker side
+# ------------------------------------------------------------
+_FEATURES = {}
+
+def _features(agent: str, feature_params: dict):
+    """Cached features, memory-mapped once per worker process."""
+    key = (agent, json.dumps(feature_params, sort_keys=True))
+    if key not in _FEATURES:
+        module, dataset, _ = AGENTS[agent]
+        _FEATURES[key] = cached_features(agent, DATASETS.version(dataset), module.build_features, **feature_params)
+    return _FEATURES[key]
+
+def _latency(predict, X_val):
+    """Single-row p50/p99 (ms) and batch throughput (rows/s) of `predict`."""
+    rows = [X_val[i:i + 1] for i in range(min(LATENCY_SAMPLES, X_val.shape[0]))]
+    timings = []
+    for row in rows:
+        start = time.perf_counter()
+        predict(row)
+        timings.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    predict(X_val)
+    batch_seconds = time.perf_counter() - start
+    return {
+        "latency_p50_ms": float(np.percentile(timings, 50)),
+        "latency_p99_ms": float(np.percentile(timings, 99)),
+        "throughput_rows_s": float(X_val.shape[0] / batch_seconds) if batch_seconds > 0 else float("inf"),
+    }
+
+def evaluate_fold(agent: str, candidate: dict, fold: int, n_folds: int):
+    """Fit one candidate on one CV fold; returns its metrics."""
+    module, _, _ = AGENTS[agent]
+    features = _features(agent, candidate["features"])
+    X, y = features["X"], features.get("y")
+
+    with threadpool_limits(limits=1):
+        if agent == "agent2":
+            splits = KFold(n_splits=n_folds, shuffle=True, random_state=SEARCH_SEED).split(np.arange(X.shape[0]))
+        else:
+            splits = StratifiedKFold(n_splits=n_folds, shuffle=True, random_state=SEARCH_SEED).split(np.zeros(len(y)), y)
+        train_idx, val_idx = next(itertools.islice(splits, fold, None))
+        X_train, X_val = X[train_idx], X[val_idx]
+
+        model = module.make_model(**candidate["model"])
+        start = time.perf_counter()
+        if agent == "agent2":
+            model.fit(X_train)
+        else:
+            model.fit(X_train, y[train_idx])
+        metrics = {"fit_seconds": time.perf_counter() - start}
+
+        if agent == "agent2":
+            labels = model.predict(X_val)
+            metrics["silhouette"] = float(
+                silhouette_score(X_val, labels, sample_size=min(2000, X_val.shape[0]), random_state=SEARCH_SEED)
+            ) if len(set(labels)) > 1 else -1.0
+            metrics.update(_latency(model.predict, X_val))
+        else:
+            proba = model.predict_proba(X_val)[:, 1]
+            metrics["roc_auc"] = float(roc_auc_score(y[val_idx], proba))
+            metrics["average_precision"] = float(average_precision_score(y[val_idx], proba))
+            metrics.update(_latency(model.predict_proba, X_val))
+    return metrics
+
+
+# ------------------------------------------------------------
+# Orchestrator
+# ------------------------------------------------------------
+def search_agent(agent: str, pool, n_folds: int = SEARCH_FOLDS):
+    """Successive halving over CV folds; returns the leaderboard rows."""
+    module, dataset, metric = AGENTS[agent]
+    pool_candidates = candidates(SEARCH_SPACES[agent])
+    print(f"\n[{agent}] {len(pool_candidates)} candidates ({SEARCH_MODE}), {n_folds} folds, metric {metric}")
+
+    # Materialize every feature configuration once before the workers start
+    for feature_params in {json.dumps(c["features"], sort_keys=True) for c in pool_candidates}:
+        cached_features(agent, DATASETS.version(dataset), module.build_features, **json.loads(feature_params))
+
+    results = [{"candidate": c, "folds": []} for c in pool_candidates]
+    alive = list(range(len(results)))
+    for fold in range(n_folds):
+        futures = {i: pool.submit(evaluate_fold, agent, results[i]["candidate"], fold, n_folds) for i in alive}
+        for i, future in futures.items():
+            try:
+                results[i]["folds"].append(future.result())
+            except Exception as e:
+                results[i]["error"] = str(e)
+        alive = [i for i in alive if "error" not in results[i]]
+
+        # Keep the best fraction for the next fold (never prune on the last one)
+        if fold < n_folds - 1 and len(alive) > 1:
+            alive.sort(key=lambda i: -np.mean([f[metric] for f in results[i]["folds"]]))
+            keep = max(1, math.ceil(len(alive) * SEARCH_KEEP_FRACTION))
+            for i in alive[keep:]:
+                results[i]["stopped_after_fold"] = fold + 1
+            alive = alive[:keep]
+        print(f"[{agent}] fold {fold + 1}/{n_folds}: {len(alive)} candidate(s) continue")
+
+    leaderboard = []
+    for r in results:
+        row = {"params": r["candidate"], "folds_completed": len(r["folds"])}
+        if r["folds"]:
+            for key in r["folds"][0]:
+                row[key] = round(float(np.mean([f[key] for f in r["folds"]])), 5)
+        if "stopped_after_fold" in r:
+            row["stopped_after_fold"] = r["stopped_after_fold"]
+        if "error" in r:
+            row["error"] = r["error"]
+        leaderboard.append(row)
+    leaderboard.sort(key=lambda row: (-row["folds_completed"], -row.get(metric, float("-inf"))))
+    return leaderboard
+
+def print_leaderboard(agent: str, leaderboard):
+    metric = AGENTS[agent][2]
+    print(f"\n[{agent}] Leaderboard ({metric}, higher is better)")
+    print(f"  {'rank':>4} {metric:>10} {'folds':>5} {'fit_s':>7} {'p50_ms':>7} {'p99_ms':>7} {'rows/s':>10}  params")
+    for rank, row in enumerate(leaderboard, 1):
+        params = {**row["params"]["features"], **row["params"]["model"]}
+        print(f"  {rank:>4} {row.get(metric, float('nan')):>10.4f} {row['folds_completed']:>5} "
+              f"{row.get('fit_seconds', float('nan')):>7.2f} {row.get('latency_p50_ms', float('nan')):>7.2f} "
+              f"{row.get('latency_p99_ms', float('nan')):>7.2f} {row.get('throughput_rows_s', float('nan')):>10.0f}  {params}")
+
+def main():
+    timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    os.makedirs(SEARCH_OUTPUT_DIR, exist_ok=True)
+
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=SEARCH_WORKERS, mp_context=context) as pool:
+        for agent in SEARCH_AGENTS:
+            start = time.perf_counter()
+            leaderboard = search_agent(agent, pool)
+            print_leaderboard(agent, leaderboard)
+
+            output_path = os.path.join(SEARCH_OUTPUT_DIR, f"{agent}_{timestamp}.json")
+            with open(output_path, "w") as f:
+                json.dump({
+                    "agent": agent,
+                    "mode": SEARCH_MODE,
+                    "folds": SEARCH_FOLDS,
+                    "metric": AGENTS[agent][2],
+                    "seconds": round(time.perf_counter() - start, 2),
+                    "leaderboard": leaderboard,
+                }, f, indent=2)
+            print(f"[{agent}] Leaderboard written to {output_path}")
+
+if __name__ == "__main__":
+    main()
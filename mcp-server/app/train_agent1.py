@@ -2,30 +2,15 @@
 import os 
 import time
 import joblib
-import boto3
-import traceback
 from datetime import datetime
 
 from agents import contextAnalyzer
-
-# S3 configuration
-REGION = "ca-central-1"
-BUCKET_NAME = os.getenv("MODEL_BUCKET", "dav-fraud-detection-models")
-s3 = boto3.client("s3", region_name=REGION)
+from AgentsAPI.artifact_publisher import publish_artifact
 
 # Local model output directory
 LOCAL_MODEL_DIR = "models"
 os.makedirs(LOCAL_MODEL_DIR, exist_ok=True)
 
-def upload_model_to_s3(local_path: str, s3_key: str):
-    """Uploads a model file to S3."""
-    try:
-        s3.upload_file(local_path, BUCKET_NAME, s3_key)
-        print(f" Uploaded {s3_key} to S3 bucket {BUCKET_NAME}.")
-    except Exception as e:
-        print(f" Failed to upload {local_path} to S3: {e}")
-        traceback.print_exc()
-
 # -----------------------------
 # Main Training
 # -----------------------------
@@ -34,21 +19,25 @@ def main():
 
     print(" Training Agent 1: Context Analyzer (Random Forest)...")
     
+    # Rows up to here are covered by this model; incremental runs continue from it
+    watermark = contextAnalyzer.current_watermark()
+
     # Train model
+    start = time.perf_counter()
     model1 = contextAnalyzer.train_agent1()
+    train_seconds = time.perf_counter() - start
     
     # Save locally
     model1_path = os.path.join(LOCAL_MODEL_DIR, f"agent1_{timestamp}.pkl")
     joblib.dump(model1, model1_path)
     
-    # Upload to S3
+    # Upload to S3 (verified), then update the manifest
     s3_key = f"agents/agent1/{os.path.basename(model1_path)}"
-    upload_model_to_s3(model1_path, s3_key)
+    publish_artifact(model1_path, s3_key, timestamp=timestamp,
+                     metrics={"train_seconds": round(train_seconds, 2)},
+                     mode="full", generation=0, watermark=watermark)
     
     print(f"Agent 1: Context Analyzer trained and uploaded successfully as {s3_key}.")
-    
-    # Give S3 some time to finalize uploads
-    time.sleep(5)
 
 if __name__ == "__main__":
     main()
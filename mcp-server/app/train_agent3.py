@@ -13,44 +13,34 @@
 
 
 import os
-import boto3
 import joblib
 import pandas as pd
 import numpy as np
 import time
-import traceback
 from datetime import datetime
 
 from models.metadata_text import load_metadata_text, MetadataText
 from agents import fraudPatternMatcher
+from AgentsAPI.artifact_publisher import publish_artifact
 
 # Training Function
 
-# S3 configuration
-REGION = "ca-central-1"
-BUCKET_NAME = os.getenv("MODEL_BUCKET", "dav-fraud-detection-models")
-s3 = boto3.client("s3", region_name=REGION)
-
 # Local model output directory
 LOCAL_MODEL_DIR = "models"
 os.makedirs(LOCAL_MODEL_DIR, exist_ok=True)
 
-def upload_model_to_s3(local_path: str, s3_key: str):
-    """Uploads a model file to S3."""
-    try:
-        s3.upload_file(local_path, BUCKET_NAME, s3_key)
-        print(f" Uploaded {s3_key} to S3 bucket {BUCKET_NAME}.")
-    except Exception as e:
-        print(f" Failed to upload {local_path} to S3: {e}")
-        traceback.print_exc()
-
 def main():
     timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
 
     print(" Training Agent 3: Fraud Pattern Matcher...")
 
+    # Rows up to here are covered by this model; incremental runs continue from it
+    watermark = fraudPatternMatcher.current_watermark()
+
     # Train Agent 3 
+    start = time.perf_counter()
     model3 = fraudPatternMatcher.train_agent3()
+    train_seconds = time.perf_counter() - start
     
     # saved localy to S3 bucket
     model3_path = os.path.join(LOCAL_MODEL_DIR, f"agent3_{timestamp}.pkl")
@@ -58,9 +48,10 @@ def main():
     print(f" Model saved locally at {model3_path}")
     # Upload to S3 bucket
     s3_key = f"agents/agent3/{os.path.basename(model3_path)}"
-    upload_model_to_s3(model3_path, s3_key)
+    publish_artifact(model3_path, s3_key, timestamp=timestamp,
+                     metrics={"train_seconds": round(train_seconds, 2)},
+                     mode="full", generation=0, watermark=watermark)
     print("Agent 3 : Fraud Pattern Matcher trained and uploaded successfully.")
-    time.sleep(5)  # ensure uploads complete before Pod exits
 
 if __name__ == "__main__":
     main()
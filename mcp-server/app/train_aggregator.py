@@ -0,0 +1,31 @@
+# app/train_aggregator.py
+import os
+import joblib
+from datetime import datetime
+
+from agents import aggregator
+from AgentsAPI.artifact_publisher import publish_artifact
+
+# Local model output directory
+LOCAL_MODEL_DIR = "models"
+os.makedirs(LOCAL_MODEL_DIR, exist_ok=True)
+
+# Stacker type: "xgboost" (TreeSHAP) or "logistic" (LinearSHAP)
+STACKER_MODEL_TYPE = os.getenv("STACKER_MODEL_TYPE", "xgboost")
+
+def main():
+    timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+
+    print(f" Training Aggregator: stacking ensemble ({STACKER_MODEL_TYPE})...")
+    stacker = aggregator.train_aggregator(model_type=STACKER_MODEL_TYPE)
+
+    stacker_path = os.path.join(LOCAL_MODEL_DIR, f"aggregator_{timestamp}.pkl")
+    joblib.dump(stacker, stacker_path)
+
+    s3_key = f"agents/aggregator/{os.path.basename(stacker_path)}"
+    publish_artifact(stacker_path, s3_key, timestamp=timestamp, metrics=stacker["metrics"])
+
+    print(f"Aggregator trained and uploaded successfully as {s3_key}.")
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,208 @@
-# ==== app/train_all_agents.py  
+# ==== app/train_all_agents.py
+# ------------------------------------------------------------
+# Trains Agent 1, 2 and 3 concurrently, one process per agent.
+#
+# - Each trainer runs in a fresh process pinned to its own set of cores
+#   (TRAIN_CORES, e.g. "agent1=4,agent2=2,agent3=2"); native thread pools
+#   (BLAS / OpenMP) and the forest's n_jobs are limited to that share.
+# - Datasets are prefetched once into the columnar cache, so the trainer
+#   processes memory-map them instead of each parsing the CSVs.
+# - Each artifact is uploaded as soon as its trainer finishes, while the
+#   other agents are still training.
+# - Wall time and peak memory (RSS high-water mark) of every stage are
+#   reported at the end.
+# ------------------------------------------------------------
 import os
 import time
 import joblib
-import boto3
+import resource
 import traceback
+import multiprocessing
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 
-from agents import contextAnalyzer, transactionHistoryProfiler, fraudPatternMatcher
+from threadpoolctl import threadpool_limits
 
-# S3 configuration 
-REGION = "ca-central-1"
-BUCKET_NAME = os.getenv("MODEL_BUCKET", "dav-fraud-detection-models")
-s3 = boto3.client("s3", region_name=REGION)
+from agents import contextAnalyzer, transactionHistoryProfiler, fraudPatternMatcher
+from AgentsAPI.artifact_publisher import publish_artifact
+from models.dataset_registry import DATASETS
+from models.device_ip_logs import load_device_ip_logs
+from models.transaction_history import load_transaction_history
 
 # Local model output directory
 LOCAL_MODEL_DIR = "models"
 os.makedirs(LOCAL_MODEL_DIR, exist_ok=True)
 
-def upload_model_to_s3(local_path: str, s3_key: str):
-    """Uploads a model file to S3."""
+# Per-agent core allocation, e.g. "agent1=4,agent2=2,agent3=2"
+# (agents not listed share the available cores evenly)
+TRAIN_CORES = os.getenv("TRAIN_CORES", "")
+
+# Number of agents trained at the same time
+TRAIN_PARALLELISM = int(os.getenv("TRAIN_PARALLELISM", "3"))
+
+AGENTS = ["agent1", "agent2", "agent3"]
+
+MODULES = {"agent1": contextAnalyzer, "agent2": transactionHistoryProfiler, "agent3": fraudPatternMatcher}
+
+# ------------------------------------------------------------
+# Stage measurement
+# ------------------------------------------------------------
+def _peak_rss_mb():
+    """RSS high-water mark of this process in MB."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _reset_peak_rss():
+    # Linux: writing "5" to clear_refs resets VmHWM to the current RSS
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+@contextmanager
+def stage(report: dict, name: str):
+    """Record the wall time and peak RSS of a block under `report[name]`."""
+    _reset_peak_rss()
+    start = time.perf_counter()
     try:
-        s3.upload_file(local_path, BUCKET_NAME, s3_key)
-        print(f" Uploaded {s3_key} to S3 bucket {BUCKET_NAME}.")
-    except Exception as e:
-        print(f" Failed to upload {local_path} to S3: {e}")
-        traceback.print_exc()
+        yield
+    finally:
+        report[name] = {
+            "seconds": round(time.perf_counter() - start, 2),
+            "peak_rss_mb": round(_peak_rss_mb(), 1),
+        }
 
+# ------------------------------------------------------------
+# Core allocation
+# ------------------------------------------------------------
+def core_allocation(agents, spec: str = TRAIN_CORES):
+    """Map each agent to a list of CPU ids, disjoint while cores last."""
+    available = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") \
+        else list(range(os.cpu_count() or 1))
+
+    requested = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, count = item.split("=")
+        requested[name.strip()] = max(1, int(count))
+
+    unlisted = [a for a in agents if a not in requested]
+    if unlisted:
+        remaining = max(len(available) - sum(requested.values()), len(unlisted))
+        for agent in unlisted:
+            requested[agent] = max(1, remaining // len(unlisted))
+
+    allocation, cursor = {}, 0
+    for agent in agents:
+        # Wrap around when more cores are requested than exist
+        allocation[agent] = [available[(cursor + i) % len(available)] for i in range(requested[agent])]
+        cursor += requested[agent]
+    return allocation
+
+# ------------------------------------------------------------
+# Trainer process
+# ------------------------------------------------------------
+def train_agent(agent: str, timestamp: str, cpus):
+    """Train and serialize one agent; runs in its own process."""
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    n_jobs = len(cpus)
+
+    stages = {}
+    # Rows up to here are covered by this model; incremental runs continue from it
+    watermark = MODULES[agent].current_watermark()
+    with threadpool_limits(limits=n_jobs):
+        with stage(stages, "train"):
+            if agent == "agent1":
+                print(f" Training Agent 1: Context Analyzer on {n_jobs} core(s)...")
+                model = contextAnalyzer.train_agent1(n_jobs=n_jobs)
+            elif agent == "agent2":
+                print(f" Training Agent 2: Transaction History Profiler on {n_jobs} core(s)...")
+                model = transactionHistoryProfiler.train_agent2()
+            else:
+                print(f"Training Agent 3: Fraud Pattern Matcher on {n_jobs} core(s)...")
+                model = fraudPatternMatcher.train_agent3()
+
+        with stage(stages, "serialize"):
+            model_path = os.path.join(LOCAL_MODEL_DIR, f"{agent}_{timestamp}.pkl")
+            joblib.dump(model, model_path)
+
+    return agent, model_path, watermark, stages, DATASETS.report()
+
+def upload_agent(agent: str, model_path: str, watermark, timestamp: str, stages: dict):
+    metrics = {f"{name}_seconds": stats["seconds"] for name, stats in stages.items()}
+    with stage(stages, "upload"):
+        publish_artifact(model_path, f"agents/{agent}/{os.path.basename(model_path)}",
+                         agent=agent, timestamp=timestamp, metrics=metrics,
+                         mode="full", generation=0, watermark=watermark)
+
+# ------------------------------------------------------------
+# Orchestrator
+# ------------------------------------------------------------
 def main():
     timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    report = {agent: {} for agent in AGENTS}
+    failed = []
+    start = time.perf_counter()
+
+    # Parse each dataset once into the columnar cache (no columns are
+    # materialized here); the trainer processes memory-map the cache files.
+    prefetch = {}
+    with stage(prefetch, "prefetch"):
+        load_device_ip_logs(columns=[])
+        load_transaction_history(columns=[])
 
-    print(" Training Agent 1: Context Analyzer...")
-    model1 = contextAnalyzer.train_agent1()
-    model1_path = os.path.join(LOCAL_MODEL_DIR, f"agent1_{timestamp}.pkl")
-    joblib.dump(model1, model1_path)
-    upload_model_to_s3(model1_path, f"agents/agent1/{os.path.basename(model1_path)}")
+    allocation = core_allocation(AGENTS)
+    print(f"Core allocation: {allocation}")
 
-    print(" Training Agent 2: Transaction History Profiler...")
-    model2 = transactionHistoryProfiler.train_agent2()
-    model2_path = os.path.join(LOCAL_MODEL_DIR, f"agent2_{timestamp}.pkl")
-    joblib.dump(model2, model2_path)
-    upload_model_to_s3(model2_path, f"agents/agent2/{os.path.basename(model2_path)}")
+    # Fresh process per agent: clean peak-memory accounting and no state
+    # (e.g. Stan / OpenMP threads) inherited from the parent.
+    context = multiprocessing.get_context("spawn")
+    with ThreadPoolExecutor(max_workers=len(AGENTS), thread_name_prefix="upload") as uploads, \
+            ProcessPoolExecutor(max_workers=TRAIN_PARALLELISM, mp_context=context, max_tasks_per_child=1) as pool:
+        futures = {pool.submit(train_agent, agent, timestamp, allocation[agent]): agent for agent in AGENTS}
+        pending_uploads = []
+        for future in as_completed(futures):
+            agent = futures[future]
+            try:
+                agent, model_path, watermark, stages, datasets = future.result()
+            except Exception:
+                print(f" Training failed for {agent}:")
+                traceback.print_exc()
+                failed.append(agent)
+                continue
+            report[agent].update(stages)
+            for stats in (s for s in datasets if s["loads"]):
+                print(f"[{agent}] Dataset {stats['dataset']}: loaded {stats['loads']}x in "
+                      f"{stats['load_seconds']}s, {stats['memory_mb']} MB")
+            # Pipeline: upload now, while the other agents keep training
+            pending_uploads.append((agent, uploads.submit(upload_agent, agent, model_path, watermark, timestamp, report[agent])))
+        for agent, upload in pending_uploads:
+            try:
+                upload.result()
+            except Exception:
+                print(f" Upload failed for {agent}:")
+                traceback.print_exc()
+                failed.append(agent)
 
-    print("Training Agent 3: Fraud Pattern Matcher...")
-    model3 = fraudPatternMatcher.train_agent3()
-    model3_path = os.path.join(LOCAL_MODEL_DIR, f"agent3_{timestamp}.pkl")
-    joblib.dump(model3, model3_path)
-    upload_model_to_s3(model3_path, f"agents/agent3/{os.path.basename(model3_path)}")
+    print("\nStage report (wall time / peak RSS):")
+    rows = [("prefetch", prefetch["prefetch"])]
+    rows += [(f"{agent}:{name}", stats) for agent in AGENTS for name, stats in report[agent].items()]
+    for label, stats in rows:
+        print(f"  {label:<18} {stats['seconds']:>8.2f}s {stats['peak_rss_mb']:>9.1f} MB")
+    print(f"  {'total':<18} {time.perf_counter() - start:>8.2f}s")
+    print("  (upload peak RSS is the orchestrator process, shared by concurrent uploads)")
 
+    if failed:
+        raise SystemExit(f"Training or upload failed for: {', '.join(failed)}")
     print("All models trained and uploaded successfully.")
-    time.sleep(5)  # ensure uploads complete before Pod exits
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,100 @@
+# app/train_incremental.py
+# ------------------------------------------------------------
+# Incremental retraining: continue each agent's latest model on the rows
+# that arrived since it was trained, instead of retraining from scratch.
+#
+# - The parent artifact is resolved through the registry manifest, which
+#   also holds the watermark (last step / event timestamp it has seen).
+# - Only rows past the watermark are read from the dataset cache.
+#     Agent 1: new trees are added to the forest (warm_start)
+#     Agent 2: the clusters take mini-batch updates (MiniBatchKMeans)
+#     Agent 3: the text classifier is updated with partial_fit
+# - The result is published as a new version whose manifest records the
+#   new watermark and its lineage: parent key / ETag / hash and generation.
+# - Agents without new rows (or without a watermarked parent: run a full
+#   training first) are skipped, as is Agent 1 while its new rows have a
+#   single class (they are retried on the next run).
+#
+# Configuration (env):
+#     INCREMENTAL_AGENTS="agent1,agent2,agent3"
+#     INCREMENTAL_TREES=20      trees added to Agent 1's forest per run
+# ------------------------------------------------------------
+import os
+import time
+import joblib
+import traceback
+from datetime import datetime
+
+from agents import contextAnalyzer, transactionHistoryProfiler, fraudPatternMatcher
+from AgentsAPI.artifact_publisher import publish_artifact
+from AgentsAPI.model_registry import download_model, read_manifest
+
+# Local model output directory
+LOCAL_MODEL_DIR = "models"
+os.makedirs(LOCAL_MODEL_DIR, exist_ok=True)
+
+INCREMENTAL_AGENTS = [a.strip() for a in os.getenv("INCREMENTAL_AGENTS", "agent1,agent2,agent3").split(",") if a.strip()]
+INCREMENTAL_TREES = int(os.getenv("INCREMENTAL_TREES", "20"))
+
+MODULES = {"agent1": contextAnalyzer, "agent2": transactionHistoryProfiler, "agent3": fraudPatternMatcher}
+
+
+def update_agent(agent: str, timestamp: str):
+    """Continue the latest model of one agent; returns the new manifest, or None if skipped."""
+    manifest = read_manifest(f"agents/{agent}/")
+    if manifest is None or manifest.get("watermark") is None:
+        print(f"[{agent}] No watermarked model in the registry; run a full training first.")
+        return None
+    parent = manifest["latest"]
+    watermark = manifest["watermark"]
+
+    print(f"[{agent}] Continuing {parent['key']} from watermark {watermark}...")
+    model = joblib.load(download_model(parent))
+
+    start = time.perf_counter()
+    if agent == "agent1":
+        result = contextAnalyzer.train_incremental(model, watermark, n_estimators=INCREMENTAL_TREES)
+    else:
+        result = MODULES[agent].train_incremental(model, watermark)
+    train_seconds = time.perf_counter() - start
+    if result is None:
+        print(f"[{agent}] No new rows past {watermark}; nothing to publish.")
+        return None
+    if isinstance(result, str):
+        # New rows exist but cannot be learned from yet; the watermark is kept
+        print(f"[{agent}] Skipped: {result} (watermark {watermark} kept); nothing to publish.")
+        return None
+    model, new_watermark, rows = result
+
+    model_path = os.path.join(LOCAL_MODEL_DIR, f"{agent}_{timestamp}.pkl")
+    joblib.dump(model, model_path)
+    print(f"[{agent}] Trained on {rows} new rows in {train_seconds:.2f}s (watermark {watermark} → {new_watermark})")
+
+    return publish_artifact(
+        model_path, f"agents/{agent}/{os.path.basename(model_path)}",
+        agent=agent, timestamp=timestamp,
+        metrics={"train_seconds": round(train_seconds, 2), "delta_rows": rows},
+        mode="incremental",
+        generation=manifest.get("generation", 0) + 1,
+        watermark=new_watermark,
+        parent={"key": parent["key"], "etag": parent["etag"], "sha256": parent.get("sha256")},
+    )
+
+
+def main():
+    timestamp = datetime.utcnow().strftime("%Y%m%d-%H%M%S")
+    failed = []
+    for agent in INCREMENTAL_AGENTS:
+        try:
+            update_agent(agent, timestamp)
+        except Exception:
+            print(f"[{agent}] Incremental training failed:")
+            traceback.print_exc()
+            failed.append(agent)
+
+    if failed:
+        raise SystemExit(f"Incremental training failed for: {', '.join(failed)}")
+    print("Incremental training complete.")
+
+if __name__ == "__main__":
+    main()